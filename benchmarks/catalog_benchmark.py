@@ -0,0 +1,126 @@
+"""
+Benchmark the mode and domain catalogs: pydantic models built per call (the
+previous registry) against the shared, slotted named tuples.
+
+Measures, for both representations:
+  - construction: building the full mode and domain lists once,
+  - lookup: finding one mode and one domain by name,
+  - memory: bytes retained by one copy of the catalogs (tracemalloc), and the
+    peak RSS of a fresh process that keeps `--copies` copies alive, as
+    a worker handling that many requests at once would.
+
+Usage:
+    python benchmarks/catalog_benchmark.py [--repeat 2000] [--copies 200]
+"""
+
+import argparse
+import gc
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from isoprompt.catalog import to_dict
+from isoprompt.domains import get_available_domains, get_domain
+from isoprompt.models import IsoPromptDomain, IsoPromptMode
+from isoprompt.modes import get_available_modes, get_mode
+
+LOOKUP_MODE = "redundancy_verification"
+LOOKUP_DOMAIN = "general_knowledge"
+
+# The catalogs as the dict literals the previous registry was built from.
+ISOPROMPT_MODES = [to_dict(mode) for mode in get_available_modes()]
+ISOPROMPT_DOMAINS = [to_dict(domain) for domain in get_available_domains()]
+
+
+def build_pydantic() -> List[Any]:
+    """Build the catalogs as the previous registry did on every call."""
+    return [IsoPromptMode.model_validate(m) for m in ISOPROMPT_MODES] + [
+        IsoPromptDomain.model_validate(d) for d in ISOPROMPT_DOMAINS
+    ]
+
+
+def build_slotted() -> List[Any]:
+    """Get the catalogs from the shared registry."""
+    return list(get_available_modes()) + list(get_available_domains())
+
+
+def lookup_pydantic() -> Any:
+    """Look up by scanning freshly built models, as the previous registry did."""
+    modes = [IsoPromptMode.model_validate(m) for m in ISOPROMPT_MODES]
+    domains = [IsoPromptDomain.model_validate(d) for d in ISOPROMPT_DOMAINS]
+    mode = next(m for m in modes if m.mode == LOOKUP_MODE)
+    domain = next(d for d in domains if d.domain == LOOKUP_DOMAIN)
+    return mode, domain
+
+
+def lookup_slotted() -> Any:
+    """Look up in the registry."""
+    return get_mode(LOOKUP_MODE), get_domain(LOOKUP_DOMAIN)
+
+
+VARIANTS: Dict[str, Dict[str, Callable[[], Any]]] = {
+    "pydantic": {"build": build_pydantic, "lookup": lookup_pydantic},
+    "slotted": {"build": build_slotted, "lookup": lookup_slotted},
+}
+
+
+def per_call_microseconds(function: Callable[[], Any], repeat: int) -> float:
+    """The best mean time of one call over five runs, in microseconds."""
+    return min(timeit.repeat(function, number=repeat, repeat=5)) / repeat * 1e6
+
+
+def retained_bytes(build: Callable[[], Any]) -> int:
+    """Bytes allocated and still referenced after building one copy."""
+    build()  # Warm up caches so only the copy itself is measured.
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    copy = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copy
+    return after - before
+
+
+def peak_rss_kib(variant: str, copies: int) -> int:
+    """The peak RSS, in KiB, of a process keeping `copies` copies alive."""
+    code = (
+        "import resource, sys\n"
+        "sys.path.insert(0, %r)\n"
+        "import catalog_benchmark as b\n"
+        "copies = [b.VARIANTS[%r]['build']() for _ in range(%d)]\n"
+        "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    ) % (sys.path[0], variant, copies)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return int(output.stdout.strip())
+
+
+def main() -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--copies", type=int, default=200)
+    args = parser.parse_args()
+
+    print(
+        f"{len(ISOPROMPT_MODES)} modes, {len(ISOPROMPT_DOMAINS)} domains, "
+        f"{args.copies} copies per process\n"
+    )
+    print(
+        f"{'variant':<10} {'build (us)':>12} {'lookup (us)':>12} "
+        f"{'bytes/copy':>12} {'peak RSS (MiB)':>15}"
+    )
+    for name, functions in VARIANTS.items():
+        build = per_call_microseconds(functions["build"], args.repeat)
+        lookup = per_call_microseconds(functions["lookup"], args.repeat)
+        retained = retained_bytes(functions["build"])
+        rss = peak_rss_kib(name, args.copies) / 1024
+        print(f"{name:<10} {build:>12.2f} {lookup:>12.2f} {retained:>12} {rss:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark writing batch results: one JSONL file written at the end of the
+batch against the SQLite and Parquet result sinks fed as results complete.
+
+Measures, for each output, the seconds until the file is complete and
+closed, the results written per second, and the file size. A batch only
+waits for its output when it produces results faster than that rate.
+
+Usage:
+    python benchmarks/sink_benchmark.py [--results 200000] [--prompt-chars 600]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+from isoprompt.batch import write_batch_results
+from isoprompt.models import BatchItemResult, BatchRecord
+from isoprompt.sinks import (
+    ParquetResultSink,
+    ResultSink,
+    SqliteResultSink,
+    pyarrow,
+)
+
+Batch = Tuple[List[BatchRecord], List[BatchItemResult]]
+
+
+def make_batch(count: int, prompt_chars: int) -> Batch:
+    """Build records and results of about the given prompt size."""
+    text = ("Summarize the quarterly report and list the key risks. " * 50)[
+        :prompt_chars
+    ]
+    records = [BatchRecord(id=str(i), prompt=f"{i} {text}") for i in range(count)]
+    results = [
+        BatchItemResult(
+            id=str(i),
+            optimized_prompt=f"You are an analyst. {text} {i}",
+            prompt_tokens=120,
+            completion_tokens=180,
+            latency_seconds=0.8,
+        )
+        for i in range(count)
+    ]
+    return records, results
+
+
+def run_jsonl(path: str, batch: Batch) -> None:
+    """Write all results at the end of the batch, as `isoprompt batch` does."""
+    write_batch_results(path, batch[1])
+
+
+def run_sink(factory: Callable[..., ResultSink], path: str, batch: Batch) -> None:
+    """Feed results to a sink one at a time, as `on_result` does."""
+    records, results = batch
+    with factory(path, records=records) as sink:
+        for result in results:
+            sink.write(result)
+
+
+def run_sqlite_per_row(path: str, batch: Batch) -> None:
+    """Insert each result in its own transaction, the naive way."""
+    records, results = batch
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE results (id TEXT PRIMARY KEY, prompt TEXT, "
+        "optimized_prompt TEXT, prompt_tokens INTEGER, completion_tokens INTEGER, "
+        "latency_seconds REAL)"
+    )
+    for record, result in zip(records, results):
+        with connection:
+            connection.execute(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    result.id,
+                    record.prompt,
+                    result.optimized_prompt,
+                    result.prompt_tokens,
+                    result.completion_tokens,
+                    result.latency_seconds,
+                ),
+            )
+    connection.close()
+
+
+def main() -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--results", type=int, default=200000)
+    parser.add_argument("--prompt-chars", type=int, default=600)
+    parser.add_argument(
+        "--per-row-results",
+        type=int,
+        default=5000,
+        help="Results of the per-row SQLite baseline, which is much slower.",
+    )
+    args = parser.parse_args()
+
+    batch = make_batch(args.results, args.prompt_chars)
+    variants = [
+        ("jsonl (at end)", "out.jsonl", run_jsonl),
+        (
+            "sqlite sink",
+            "out.sqlite",
+            lambda p, b: run_sink(SqliteResultSink, p, b),
+        ),
+    ]
+    if pyarrow is not None:
+        variants.append(
+            (
+                "parquet sink",
+                "out.parquet",
+                lambda p, b: run_sink(ParquetResultSink, p, b),
+            )
+        )
+
+    directory = tempfile.mkdtemp()
+    try:
+        print(f"{args.results} results, {args.prompt_chars}-character prompts\n")
+        print(f"{'output':<22} {'total (s)':>10} {'results/s':>10} {'size (MiB)':>11}")
+        for name, filename, run in variants:
+            path = os.path.join(directory, filename)
+            started = time.perf_counter()
+            run(path, batch)
+            total = time.perf_counter() - started
+            size = os.path.getsize(path) / 2**20
+            rate = args.results / total
+            print(f"{name:<22} {total:>10.2f} {rate:>10.0f} {size:>11.1f}")
+
+        count = min(args.per_row_results, args.results)
+        path = os.path.join(directory, "per_row.sqlite")
+        started = time.perf_counter()
+        run_sqlite_per_row(path, (batch[0][:count], batch[1][:count]))
+        rate = count / (time.perf_counter() - started)
+        total = args.results / rate
+        print(f"{'sqlite per row (est.)':<22} {total:>10.2f} {rate:>10.0f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
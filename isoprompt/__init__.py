@@ -1,15 +1,58 @@
 """IsoPrompt - AI-powered prompt optimization tool."""
 
-from .domains import get_available_domain_names, get_available_domains
-from .modes import get_available_mode_names, get_available_modes
-from .optimizer import optimize_prompt
+from .catalog import load_catalog_overlay
+from .deadline import CancelToken, Deadline
+from .domains import get_available_domain_names, get_available_domains, register_domain
+from .errors import (
+    EmptyResponseError,
+    IsoPromptError,
+    OptimizationCancelledError,
+    OptimizationTimeoutError,
+    RateLimitedError,
+    UpstreamError,
+)
+from .modes import get_available_mode_names, get_available_modes, register_mode
+from .optimizer import (
+    optimize_chunked,
+    optimize_chunked_async,
+    optimize_prompt,
+    optimize_prompt_async,
+    reoptimize_prompt,
+    reoptimize_prompt_async,
+    stream_optimize_prompt_async,
+)
+from .refine import refine_prompt, refine_prompt_async
+from .usage import UsageMeter
+from .variants import optimize_variants, optimize_variants_async
 
 __version__ = "1.0.4"
 
 __all__ = [
     "optimize_prompt",
+    "optimize_prompt_async",
+    "stream_optimize_prompt_async",
+    "optimize_chunked",
+    "optimize_chunked_async",
+    "reoptimize_prompt",
+    "reoptimize_prompt_async",
+    "refine_prompt",
+    "refine_prompt_async",
+    "optimize_variants",
+    "optimize_variants_async",
     "get_available_domains",
     "get_available_domain_names",
     "get_available_modes",
     "get_available_mode_names",
+    "register_mode",
+    "register_domain",
+    "load_catalog_overlay",
+    "CancelToken",
+    "Deadline",
+    "IsoPromptError",
+    "OptimizationTimeoutError",
+    "OptimizationCancelledError",
+    "RateLimitedError",
+    "UpstreamError",
+    "EmptyResponseError",
+    "UsageMeter",
 ]
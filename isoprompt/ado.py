@@ -0,0 +1,446 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Token-compact encoding of data embedded in prompts (ADO).
+
+Data passed as `data=` (a dict, a list of records, or a JSON, JSONL or CSV
+string) is embedded after the optimized prompt instead of being sent to the
+optimizer, which only sees a one-line summary of it. With `ado=` the data is
+first pruned of empty fields, fields shared by every row of a table are
+listed once, and it is encoded as CSV, compact JSON or `key: value` lines,
+whichever measures the fewest tokens. Tokens are counted with `tiktoken` when
+it is installed (`pip install 'isoprompt[tokens]'`) and estimated otherwise.
+Candidate encodings are generated and counted piece by piece, and a candidate
+is abandoned as soon as it costs more than the best one so far, so only the
+chosen encoding is ever built in full.
+"""
+
+import csv
+import io
+import json
+import re
+import sys
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from .constants import (
+    AUTO,
+    DATA_COUNT_CHUNK,
+    DATA_FORMATS,
+    DEFAULT_TOKEN_ENCODING,
+    MAX_SUMMARY_FIELDS,
+)
+from .models import DataOptions, EncodedData
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Roughly one BPE token each: a short run of letters, up to three digits, a
+# line break or another symbol. Spaces merge into the following token.
+_TOKEN_ESTIMATE = re.compile(r"[^\W\d_]{1,8}|\d{1,3}|\n+|[^\w\s]|_")
+
+FORMAT_ALIASES = {"table": "csv", "key_value": "kv", "compact_json": "json"}
+FORMAT_LABELS = {
+    "csv": "CSV",
+    "json": "JSON",
+    "kv": "key: value lines",
+    "text": "text",
+}
+SHARED_HEADING = "Every row has:"
+_EMPTY: List[Any] = [None, "", [], {}]
+
+Table = List[Dict[str, Any]]
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: Optional[str]) -> Any:
+    """Get the tiktoken encoding of a model, or the default one."""
+    try:
+        return tiktoken.encoding_for_model(model or "")
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_TOKEN_ENCODING)
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens of a text.
+
+    Args:
+        text: The text.
+        model: The model whose tokenizer to use; unknown models use the
+               `o200k_base` encoding.
+
+    Returns:
+        The exact count with `tiktoken`, or an estimate without it.
+    """
+    if tiktoken is not None:
+        return len(_get_encoding(model).encode(text, disallowed_special=()))
+    return len(_TOKEN_ESTIMATE.findall(text))
+
+
+def _count_stream(
+    chunks: Iterable[str], model: Optional[str], limit: Optional[int] = None
+) -> Optional[int]:
+    """
+    Count the tokens of a stream of text in pieces of about
+    `DATA_COUNT_CHUNK` characters, cut after a line break or comma.
+
+    Returns:
+        The count, or None as soon as it exceeds `limit`.
+    """
+    total = 0
+    pending: List[str] = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size < DATA_COUNT_CHUNK:
+            continue
+        text = "".join(pending)
+        cut = max(text.rfind("\n"), text.rfind(",")) + 1 or len(text)
+        total += count_tokens(text[:cut], model)
+        pending, size = [text[cut:]], len(text) - cut
+        if limit is not None and total > limit:
+            return None
+    total += count_tokens("".join(pending), model)
+    return None if limit is not None and total > limit else total
+
+
+def load_data(data: Any) -> Any:
+    """
+    Parse data given as a string; other values are returned as they are.
+
+    Strings are read as JSON, then JSONL, then CSV with a header row, and are
+    otherwise kept as plain text.
+
+    Args:
+        data: A dict, a list, or a JSON, JSONL, CSV or plain-text string.
+
+    Returns:
+        The parsed value.
+    """
+    if not isinstance(data, str):
+        return data
+    text = data.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    except ValueError:
+        pass
+    rows = _parse_csv(text)
+    return rows if rows is not None else text
+
+
+def _parse_csv(text: str) -> Optional[Table]:
+    """Parse CSV with a header row, or None if the text is not such a table."""
+    if "\n" not in text:
+        return None
+    try:
+        dialect = csv.Sniffer().sniff(text[:DATA_COUNT_CHUNK], delimiters=",;\t|")
+    except csv.Error:
+        return None
+    reader = csv.reader(io.StringIO(text), dialect)
+    header = next(reader)
+    rows = [row for row in reader if row]
+    if len(header) < 2 or any(len(row) != len(header) for row in rows):
+        return None
+    return [dict(zip(header, row)) for row in rows]
+
+
+def _is_table(value: Any) -> bool:
+    """Whether a value is a non-empty list of records."""
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(row, dict) for row in value)
+    )
+
+
+def _prune(value: Any) -> Any:
+    """Drop null and empty values, including values left empty by pruning."""
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in _EMPTY}
+    if isinstance(value, list):
+        return [item for item in map(_prune, value) if item not in _EMPTY]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _split_shared(rows: Table) -> Dict[str, Any]:
+    """Find the fields that every row has with the same value."""
+    if len(rows) < 2:
+        return {}
+    first = rows[0]
+    return {
+        key: value
+        for key, value in first.items()
+        if all(key in row and row[key] == value for row in rows[1:])
+    }
+
+
+def _flatten(value: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested records, joining keys with dots."""
+    flat: Dict[str, Any] = {}
+    for key, item in value.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(item, dict) and item:
+            flat.update(_flatten(item, path))
+        else:
+            flat[path] = item
+    return flat
+
+
+def _columns(rows: Iterable[Dict[str, Any]]) -> List[str]:
+    """The fields of a table, in order of first appearance."""
+    columns: Dict[str, None] = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    return list(columns)
+
+
+def _plain(value: Any) -> str:
+    """Render a value for CSV cells and `key: value` lines."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list) and not any(isinstance(v, (dict, list)) for v in value):
+        return ", ".join(_plain(v) for v in value)
+    if isinstance(value, (dict, list, bool)) or value is None:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return str(value)
+
+
+def _iter_kv(value: Dict[str, Any]) -> Iterator[str]:
+    """Encode a record as `key: value` lines, nesting keys with dots."""
+    for key, item in _flatten(value).items():
+        yield f"{key}: {_plain(item)}\n"
+
+
+def _iter_csv(rows: Table, shared: Dict[str, Any]) -> Iterator[str]:
+    """Encode a table as CSV, after the fields shared by every row."""
+    if shared:
+        yield SHARED_HEADING + "\n"
+        yield from _iter_kv(shared)
+        yield "\n"
+    columns = _columns(_flatten(row) for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for row in rows:
+        flat = _flatten(row)
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([_plain(flat[c]) if c in flat else "" for c in columns])
+        yield buffer.getvalue()
+
+
+def _iter_table_kv(rows: Table, shared: Dict[str, Any]) -> Iterator[str]:
+    """Encode a table as blocks of `key: value` lines, one block per row."""
+    if shared:
+        yield SHARED_HEADING + "\n"
+        yield from _iter_kv(shared)
+    for i, row in enumerate(rows):
+        if i or shared:
+            yield "\n"
+        yield from _iter_kv(row)
+
+
+def _iter_json(value: Any, indent: Optional[int] = None) -> Iterator[str]:
+    """Encode a value as JSON, compact unless `indent` is given."""
+    separators = (",", ":") if indent is None else (",", ": ")
+    encoder = json.JSONEncoder(
+        separators=separators, indent=indent, ensure_ascii=False, default=str
+    )
+    return encoder.iterencode(value)
+
+
+def _candidates(value: Any, content: bool) -> Dict[str, Callable[[], Iterator[str]]]:
+    """The encodings that fit a value, each as a generator factory."""
+    if _is_table(value):
+        rows: Table = value
+        shared = _split_shared(rows) if content else {}
+        if shared:
+            rows = [{k: v for k, v in row.items() if k not in shared} for row in rows]
+            document: Any = {"every_row": shared, "rows": rows}
+        else:
+            document = rows
+        return {
+            "csv": lambda: _iter_csv(rows, shared),
+            "kv": lambda: _iter_table_kv(rows, shared),
+            "json": lambda: _iter_json(document),
+        }
+    if isinstance(value, dict):
+        return {"kv": lambda: _iter_kv(value), "json": lambda: _iter_json(value)}
+    return {"json": lambda: _iter_json(value)}
+
+
+def _summarize(value: Any, data_format: str) -> str:
+    """Describe encoded data in one line for the optimizer."""
+    label = FORMAT_LABELS[data_format]
+    if _is_table(value):
+        fields = _columns(value)
+        shape = f"{len(value)} row" + ("" if len(value) == 1 else "s")
+    elif isinstance(value, dict):
+        fields = list(value)
+        shape = "a record"
+    else:
+        return f"{label} data"
+    names = ", ".join(fields[:MAX_SUMMARY_FIELDS])
+    if len(fields) > MAX_SUMMARY_FIELDS:
+        names += f" and {len(fields) - MAX_SUMMARY_FIELDS} more"
+    return f"{label} data, {shape} with fields: {names}"
+
+
+def _encode_as_given(data: Any, value: Any, model: Optional[str]) -> EncodedData:
+    """Encode data as given: strings unchanged, other values as indented JSON."""
+    if isinstance(data, str):
+        text, data_format = data.strip(), "text"
+    else:
+        text, data_format = "".join(_iter_json(data, indent=2)), "json"
+    tokens = count_tokens(text, model)
+    return EncodedData(
+        text=text,
+        format=data_format,
+        tokens=tokens,
+        original_tokens=tokens,
+        summary=_summarize(value, data_format),
+    )
+
+
+def encode_data(
+    data: Any, options: Optional[DataOptions] = None, model: Optional[str] = None
+) -> EncodedData:
+    """
+    Encode data to embed in a prompt.
+
+    Args:
+        data: A dict, a list, or a JSON, JSONL, CSV or plain-text string.
+        options: The data optimization options, or None to embed the data as
+                 given: strings unchanged and other values as indented JSON.
+        model: The model whose tokenizer measures the encodings.
+
+    Returns:
+        The encoded data with its token count and the count of the data as
+        given. The data is kept as given when no encoding is smaller.
+    """
+    value = load_data(data)
+    if options is None or isinstance(value, str):
+        return _encode_as_given(data, value, model)
+
+    if options.content:
+        value = _prune(value)
+    candidates = _candidates(value, options.content)
+    requested = FORMAT_ALIASES.get(options.format, options.format)
+    if requested in candidates:
+        candidates = {requested: candidates[requested]}
+
+    best_format, best_tokens = "", None
+    for data_format, encode in candidates.items():
+        count = _count_stream(encode(), model, best_tokens)
+        if count is not None:
+            best_format, best_tokens = data_format, count
+
+    if isinstance(data, str):
+        original_tokens = count_tokens(data, model)
+    else:
+        original_tokens = _count_stream(_iter_json(data, indent=2), model) or 0
+    if best_tokens is None or best_tokens >= original_tokens:
+        return _encode_as_given(data, load_data(data), model)
+    return EncodedData(
+        text="".join(candidates[best_format]()).strip(),
+        format=best_format,
+        tokens=best_tokens or 0,
+        original_tokens=original_tokens,
+        summary=_summarize(value, best_format),
+    )
+
+
+def resolve_data_options(
+    ado: Union[bool, Dict[str, Any], DataOptions],
+) -> Optional[DataOptions]:
+    """
+    Get the data optimization options of an `ado=` argument.
+
+    Args:
+        ado: False to embed data as given, True for the default options, or
+             a dict or `DataOptions` of custom options.
+
+    Returns:
+        The options, or None if data optimization is off.
+    """
+    if isinstance(ado, DataOptions):
+        options = ado
+    elif isinstance(ado, dict):
+        options = DataOptions.model_validate(ado)
+    elif ado:
+        options = DataOptions()
+    else:
+        return None
+    if options.format not in DATA_FORMATS and options.format not in FORMAT_ALIASES:
+        # Unsupported targets such as "xml" fall back to the cheapest encoding.
+        options = options.model_copy(update={"format": "auto"})
+    return options
+
+
+def prepare_data(
+    data: Any,
+    ado: Union[bool, Dict[str, Any], DataOptions],
+    model: Optional[str] = None,
+    verbose: bool = False,
+) -> Optional[EncodedData]:
+    """
+    Encode the `data=` of an optimization, or None if there is no data.
+
+    If data optimization fails, the data is embedded as given.
+
+    Args:
+        data: The data to embed.
+        ado: The `ado=` argument, see `resolve_data_options`.
+        model: The optimization model, whose tokenizer measures encodings.
+        verbose: Whether to print what was done.
+
+    Returns:
+        The encoded data, or None if `data` is empty.
+    """
+    if data in _EMPTY or isinstance(data, str) and not data.strip():
+        if verbose:
+            print("🔧 Ignoring empty data.")
+        return None
+    tokenizer_model = None if model == AUTO else model
+    options = resolve_data_options(ado)
+    try:
+        encoded = encode_data(data, options, tokenizer_model)
+    except (TypeError, ValueError, RecursionError) as e:
+        print(
+            f"Warning: Data optimization failed, using the data as given: {e}",
+            file=sys.stderr,
+        )
+        encoded = encode_data(data, None, tokenizer_model)
+    if verbose:
+        print(
+            f"🔧 Data encoded as {encoded.format}: {encoded.tokens} tokens "
+            f"(given: {encoded.original_tokens})."
+        )
+    return encoded
+
+
+def describe_data(user_input: str, encoded: EncodedData) -> str:
+    """Tell the optimizer about the data that will follow the prompt."""
+    return (
+        f"{user_input.rstrip()}\n\n"
+        f"(The prompt will be followed by {encoded.summary}. Refer to it; "
+        "do not repeat or invent it.)"
+    )
+
+
+def attach_data(prompt: str, encoded: EncodedData) -> str:
+    """Append encoded data to an optimized prompt."""
+    return (
+        f"{prompt.rstrip()}\n\nData ({FORMAT_LABELS[encoded.format]}):\n{encoded.text}"
+    )
@@ -0,0 +1,341 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Pluggable optimization backends.
+
+A backend is the OpenAI API, any inference server speaking its wire protocol
+(vLLM, llama.cpp, Ollama, LM Studio...) or the offline heuristic optimizer.
+Each OpenAI-compatible backend owns its clients, and so its connection pool,
+and can cap its in-flight requests so a small local server is not flooded.
+Routing rules send traffic to a backend by mode, domain or model; otherwise
+the backend serving the requested model is used, then the default backend.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import openai
+
+from .constants import (
+    BACKEND_SLOT_POLL_INTERVAL,
+    BACKENDS_CONFIG_ENV,
+    HEURISTIC_BACKEND,
+    OPENAI_BACKEND,
+    SUPPORTED_LLM_MODELS,
+)
+from .deadline import CancelToken, Deadline
+from .errors import OptimizationTimeoutError
+from .models import BackendConfig, BackendRoute, BackendsConfig
+
+BACKEND_TYPES = [OPENAI_BACKEND, HEURISTIC_BACKEND]
+
+# Sent to servers that do not authenticate; the SDK refuses to run without a key.
+_NO_API_KEY = "EMPTY"
+
+
+def _http_limits(max_connections: int) -> Any:
+    """Build connection pool limits for the SDK's HTTP client."""
+    import httpx  # Installed with openai.
+
+    return httpx.Limits(
+        max_connections=max_connections, max_keepalive_connections=max_connections
+    )
+
+
+class Backend:
+    """
+    One configured backend, with its lazily created clients and limits.
+    """
+
+    def __init__(self, config: BackendConfig) -> None:
+        """
+        Create a backend.
+
+        Args:
+            config: The backend's configuration.
+        """
+        if config.type not in BACKEND_TYPES:
+            raise ValueError(f"Invalid backend type. Available: {BACKEND_TYPES}.")
+        self.config = config
+        self._lock = threading.Lock()
+        self._client: Optional[openai.OpenAI] = None
+        self._async_client: Optional[openai.AsyncOpenAI] = None
+        self._semaphore = (
+            threading.BoundedSemaphore(config.max_concurrency)
+            if config.max_concurrency
+            else None
+        )
+        # asyncio semaphores are bound to the loop they are first used on.
+        self._async_semaphores: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def name(self) -> str:
+        """The backend's name."""
+        return self.config.name
+
+    @property
+    def is_heuristic(self) -> bool:
+        """Whether the backend optimizes offline, without a client."""
+        return self.config.type == HEURISTIC_BACKEND
+
+    @property
+    def models(self) -> List[str]:
+        """The models the backend serves."""
+        if not self.config.models and self.name == OPENAI_BACKEND:
+            return SUPPORTED_LLM_MODELS
+        return self.config.models
+
+    def _api_key(self) -> str:
+        """Read the backend's API key from the environment."""
+        if self.config.api_key_env is None:
+            return _NO_API_KEY
+        api_key = os.getenv(self.config.api_key_env)
+        if not api_key:
+            raise ValueError(
+                f"{self.config.api_key_env} environment variable not set. "
+                f"Please set the API key of the {self.name} backend: "
+                f"export {self.config.api_key_env}='your-api-key'"
+            )
+        return api_key
+
+    def _client_options(self, async_client: bool) -> Dict[str, Any]:
+        """Build the keyword arguments of the backend's SDK clients."""
+        # SDK retries are disabled: IsoPrompt retries within the deadline.
+        options: Dict[str, Any] = {"api_key": self._api_key(), "max_retries": 0}
+        if self.config.base_url:
+            options["base_url"] = self.config.base_url
+        if self.config.max_connections:
+            http_client = (
+                openai.DefaultAsyncHttpxClient
+                if async_client
+                else openai.DefaultHttpxClient
+            )
+            options["http_client"] = http_client(
+                limits=_http_limits(self.config.max_connections)
+            )
+        return options
+
+    def client(self) -> openai.OpenAI:
+        """Get the backend's shared client, created on first use."""
+        with self._lock:
+            if self._client is None:
+                self._client = openai.OpenAI(**self._client_options(False))
+            return self._client
+
+    def async_client(self) -> openai.AsyncOpenAI:
+        """Get the backend's shared async client, created on first use."""
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = openai.AsyncOpenAI(**self._client_options(True))
+            return self._async_client
+
+    @contextmanager
+    def slot(
+        self,
+        deadline: Optional[Deadline] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Iterator[None]:
+        """
+        Hold one of the backend's concurrency slots.
+
+        Args:
+            deadline: Optional deadline bounding the wait for a slot.
+            cancel_token: Optional token that aborts the wait.
+
+        Raises:
+            OptimizationTimeoutError: If the deadline passes first.
+            OptimizationCancelledError: If the token is cancelled first.
+        """
+        if self._semaphore is None:
+            yield
+            return
+        deadline = deadline or Deadline(None)
+        while True:
+            if cancel_token is not None:
+                cancel_token.check()
+            remaining = deadline.remaining()
+            if cancel_token is not None:
+                # A semaphore cannot be woken by the token, so wait in slices.
+                wait = BACKEND_SLOT_POLL_INTERVAL
+                remaining = wait if remaining is None else min(remaining, wait)
+            if self._semaphore.acquire(timeout=remaining):
+                break
+            if deadline.expired():
+                raise OptimizationTimeoutError("Optimization deadline exceeded.")
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[None]:
+        """Hold one of the backend's concurrency slots from async code."""
+        limit = self.config.max_concurrency
+        if not limit:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(limit)
+                self._async_semaphores[loop] = semaphore
+        async with semaphore:
+            yield
+
+
+def _matches(route: BackendRoute, mode: str, domain: Optional[str], model: str) -> bool:
+    """Whether a routing rule applies to a request."""
+    return (
+        (route.mode is None or route.mode == mode)
+        and (route.domain is None or route.domain == domain)
+        and (route.model is None or route.model == model)
+    )
+
+
+class BackendRegistry:
+    """
+    The configured backends and the rules routing requests to them.
+
+    The built-in "openai" and "heuristic" backends are always available and
+    may be overridden by configuring a backend with the same name.
+    """
+
+    def __init__(self, config: Optional[BackendsConfig] = None) -> None:
+        """
+        Create a registry.
+
+        Args:
+            config: The backends and routes; None for the built-ins only.
+        """
+        config = config or BackendsConfig()
+        self._backends: Dict[str, Backend] = {
+            OPENAI_BACKEND: Backend(BackendConfig(name=OPENAI_BACKEND)),
+            HEURISTIC_BACKEND: Backend(
+                BackendConfig(name=HEURISTIC_BACKEND, type=HEURISTIC_BACKEND)
+            ),
+        }
+        for backend_config in config.backends:
+            self._backends[backend_config.name] = Backend(backend_config)
+        self.routes = config.routes
+        self.default = config.default
+        for name in [route.backend for route in self.routes] + [self.default]:
+            self.get(name)
+
+    @property
+    def names(self) -> List[str]:
+        """The names of the available backends."""
+        return list(self._backends)
+
+    def get(self, name: str) -> Backend:
+        """
+        Look up a backend by name.
+
+        Raises:
+            ValueError: If there is no such backend.
+        """
+        backend = self._backends.get(name)
+        if backend is None:
+            raise ValueError(f"Invalid backend. Available: {self.names}.")
+        return backend
+
+    def select(self, mode: str, domain: Optional[str], model: str) -> Backend:
+        """
+        Pick the backend of a request.
+
+        The first matching routing rule wins. Otherwise the default backend
+        is used if it serves the model, then the first backend serving it,
+        then the default backend anyway.
+
+        Args:
+            mode: The request's (resolved) mode.
+            domain: The request's (resolved) domain.
+            model: The requested model.
+
+        Returns:
+            The selected backend.
+        """
+        for route in self.routes:
+            if _matches(route, mode, domain, model):
+                return self.get(route.backend)
+        default = self.get(self.default)
+        if model in default.models:
+            return default
+        for backend in self._backends.values():
+            if model in backend.models:
+                return backend
+        return default
+
+    def resolve(
+        self, name: Optional[str], mode: str, domain: Optional[str], model: str
+    ) -> Backend:
+        """Get the named backend, or select one when no name is given."""
+        return self.get(name) if name else self.select(mode, domain, model)
+
+    def is_model_supported(self, model: str) -> bool:
+        """Whether any backend serves a model."""
+        return any(model in backend.models for backend in self._backends.values())
+
+    @property
+    def models(self) -> List[str]:
+        """Every model served by some backend, without repeats."""
+        models: List[str] = []
+        for backend in self._backends.values():
+            models += [m for m in backend.models if m not in models]
+        return models
+
+
+def load_backends_config(path: str) -> BackendsConfig:
+    """
+    Load a backends configuration from a JSON file.
+
+    Args:
+        path: The file, holding a `BackendsConfig` object.
+
+    Returns:
+        The validated configuration.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return BackendsConfig.model_validate(json.load(f))
+
+
+_registry: Optional[BackendRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_backend_registry() -> BackendRegistry:
+    """
+    Get the process-wide backend registry.
+
+    It is built on first use from the file named by the `ISOPROMPT_BACKENDS`
+    environment variable, or with the built-in backends only.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            path = os.getenv(BACKENDS_CONFIG_ENV)
+            _registry = BackendRegistry(load_backends_config(path) if path else None)
+        return _registry
+
+
+def configure_backends(config: Optional[BackendsConfig] = None) -> BackendRegistry:
+    """
+    Replace the process-wide backend registry.
+
+    Args:
+        config: The backends and routes; None for the built-ins only.
+
+    Returns:
+        The new registry.
+    """
+    global _registry
+    registry = BackendRegistry(config)
+    with _registry_lock:
+        _registry = registry
+    return registry
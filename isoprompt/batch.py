@@ -0,0 +1,707 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Batch optimization of many prompts.
+
+Before dispatch, records are normalized and hashed so that prompts differing
+only in whitespace, casing or trailing punctuation share one upstream call.
+The result of that call is then fanned back out to every original record.
+
+With refinement enabled, each record runs its whole pass chain in its own
+slot of the pool, so passes of different records overlap instead of the batch
+waiting for every record to finish one pass before starting the next.
+
+`optimize_stream` handles inputs of unknown length, such as a pipe: it reads
+records as they arrive, keeps a bounded number in flight and yields each
+result as soon as it is ready.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import re
+import string
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .backends import get_backend_registry
+from .constants import AUTO, DEFAULT_BATCH_CONCURRENCY, DEFAULT_MAX_RETRIES
+from .deadline import CancelToken, Deadline
+from .errors import OptimizationCancelledError, OptimizationTimeoutError
+from .models import (
+    BatchItemResult,
+    BatchRecord,
+    BatchReport,
+    BatchResult,
+    NormalizationOptions,
+    RefinementOptions,
+)
+from .optimizer import optimize_prompt, optimize_prompt_async
+from .refine import refine_prompt, refine_prompt_async
+from .routing import route_domains, route_modes
+from .usage import UsageMeter
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = string.punctuation + "…。！？"
+
+
+def normalize_prompt(prompt: str, options: NormalizationOptions) -> str:
+    """
+    Normalize a prompt for duplicate detection.
+
+    Args:
+        prompt: The prompt to normalize.
+        options: Which normalizations to apply.
+
+    Returns:
+        The normalized prompt.
+    """
+    text = prompt.strip()
+    if options.collapse_whitespace:
+        text = _WHITESPACE.sub(" ", text)
+    if options.casefold:
+        text = text.casefold()
+    if options.strip_trailing_punctuation:
+        text = text.rstrip(_TRAILING_PUNCTUATION).rstrip()
+    return text
+
+
+def dedup_key(record: BatchRecord, options: NormalizationOptions) -> str:
+    """
+    Hash a record's normalized prompt together with its optimization options.
+
+    Args:
+        record: The batch record.
+        options: Which normalizations to apply.
+
+    Returns:
+        A hex digest shared by all records that can reuse the same result.
+    """
+    payload = json.dumps(
+        [
+            normalize_prompt(record.prompt, options),
+            record.mode,
+            record.domain,
+            record.model,
+            record.temperature,
+        ]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def group_duplicates(
+    records: Sequence[BatchRecord], options: Optional[NormalizationOptions]
+) -> List[List[int]]:
+    """
+    Group record indices that can share one optimization.
+
+    Args:
+        records: The batch records.
+        options: Normalization options, or None to disable deduplication.
+
+    Returns:
+        Groups of indices in order of first appearance. The first index of each
+        group is the record whose prompt is sent upstream.
+    """
+    if options is None:
+        return [[i] for i in range(len(records))]
+
+    groups: Dict[str, List[int]] = {}
+    for i, record in enumerate(records):
+        groups.setdefault(dedup_key(record, options), []).append(i)
+    return list(groups.values())
+
+
+def resolve_auto_records(records: Sequence[BatchRecord]) -> List[BatchRecord]:
+    """
+    Route every "auto" mode and domain of a batch in one scoring pass each.
+
+    Args:
+        records: The batch records.
+
+    Returns:
+        The records with concrete modes and domains.
+    """
+    resolved = list(records)
+    mode_rows = [i for i, record in enumerate(records) if record.mode == AUTO]
+    if mode_rows:
+        modes = route_modes([records[i].prompt for i in mode_rows])
+        for i, mode in zip(mode_rows, modes):
+            resolved[i] = resolved[i].model_copy(update={"mode": mode})
+    domain_rows = [i for i, record in enumerate(records) if record.domain == AUTO]
+    if domain_rows:
+        domains = route_domains([records[i].prompt for i in domain_rows])
+        for i, domain in zip(domain_rows, domains):
+            resolved[i] = resolved[i].model_copy(update={"domain": domain})
+    return resolved
+
+
+def _check_refinement_backend(
+    refinement: Optional[RefinementOptions], backend: Optional[str]
+) -> None:
+    """Raise `ValueError` if refinement is requested from an offline backend."""
+    if (
+        refinement is not None
+        and backend is not None
+        and get_backend_registry().get(backend).is_heuristic
+    ):
+        raise ValueError("Refinement needs a model backend, not the heuristic one.")
+
+
+def _failure(record_id: str, error: BaseException) -> BatchItemResult:
+    """Build the result of a record whose optimization failed."""
+    return BatchItemResult(
+        id=record_id, error=str(error), error_type=type(error).__name__
+    )
+
+
+def _metered(
+    result: BatchItemResult, usage: UsageMeter, started: float
+) -> BatchItemResult:
+    """Add the tokens and latency of a record's optimization to its result."""
+    result.prompt_tokens = usage.prompt_tokens
+    result.completion_tokens = usage.completion_tokens
+    result.latency_seconds = time.monotonic() - started
+    return result
+
+
+def _optimize_record(
+    record: BatchRecord,
+    refinement: Optional[RefinementOptions],
+    use_cache: bool,
+    backend: Optional[str],
+    deadline: Deadline,
+    cancel_token: Optional[CancelToken],
+    offline_fallback: bool,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    ensemble_size: Optional[int] = None,
+) -> BatchItemResult:
+    """Optimize one record, reporting any error, its tokens and its latency."""
+    usage = UsageMeter()
+    started = time.monotonic()
+    try:
+        if cancel_token is not None:
+            cancel_token.check()
+        if refinement is not None:
+            refined = refine_prompt(
+                user_input=record.prompt,
+                mode=record.mode,
+                domain=record.domain,
+                model=record.model,
+                temperature=record.temperature,
+                options=refinement,
+                use_cache=use_cache,
+                backend=backend,
+                deadline=deadline,
+                max_retries=max_retries,
+                cancel_token=cancel_token,
+                usage=usage,
+                ensemble_size=ensemble_size,
+                offline_fallback=offline_fallback,
+            )
+            result = BatchItemResult(
+                id=record.id,
+                optimized_prompt=refined.optimized_prompt,
+                passes=refined.passes,
+            )
+        else:
+            optimized = optimize_prompt(
+                user_input=record.prompt,
+                mode=record.mode,
+                domain=record.domain,
+                model=record.model,
+                temperature=record.temperature,
+                use_cache=use_cache,
+                deadline=deadline,
+                max_retries=max_retries,
+                cancel_token=cancel_token,
+                ensemble_size=ensemble_size,
+                backend=backend,
+                offline_fallback=offline_fallback,
+                usage=usage,
+            )
+            result = BatchItemResult(id=record.id, optimized_prompt=optimized)
+    except Exception as e:
+        result = _failure(record.id, e)
+    return _metered(result, usage, started)
+
+
+def outcome_usage(outcome: BatchItemResult) -> Dict[str, Any]:
+    """The token and latency fields of an outcome."""
+    return {
+        "prompt_tokens": outcome.prompt_tokens,
+        "completion_tokens": outcome.completion_tokens,
+        "latency_seconds": outcome.latency_seconds,
+    }
+
+
+def duplicate_usage(outcome: BatchItemResult) -> Dict[str, Any]:
+    """
+    The token and latency fields of a duplicate served by another record's
+    call: it waited as long, but spent no tokens of its own.
+    """
+    fields = outcome_usage(outcome)
+    for key in ("prompt_tokens", "completion_tokens"):
+        if fields[key] is not None:
+            fields[key] = 0
+    return fields
+
+
+def _group_results(
+    records: Sequence[BatchRecord], group: List[int], outcome: BatchItemResult
+) -> List[BatchItemResult]:
+    """Copy a group's outcome to each of its records."""
+    leader = records[group[0]]
+    return [
+        BatchItemResult(
+            id=records[i].id,
+            optimized_prompt=outcome.optimized_prompt,
+            error=outcome.error,
+            error_type=outcome.error_type,
+            duplicate_of=leader.id if i != group[0] else None,
+            passes=outcome.passes,
+            **(outcome_usage(outcome) if i == group[0] else duplicate_usage(outcome)),
+        )
+        for i in group
+    ]
+
+
+def _fan_out(
+    records: Sequence[BatchRecord],
+    groups: List[List[int]],
+    outcomes: List[BatchItemResult],
+    started: float,
+) -> BatchResult:
+    """Copy each group's outcome to all of its records and build the report."""
+    results: List[Optional[BatchItemResult]] = [None] * len(records)
+    for group, outcome in zip(groups, outcomes):
+        for i, result in zip(group, _group_results(records, group, outcome)):
+            results[i] = result
+
+    final = [r for r in results if r is not None]
+    succeeded = sum(1 for r in final if r.error is None)
+    report = BatchReport(
+        total=len(records),
+        unique=len(groups),
+        duplicates=len(records) - len(groups),
+        succeeded=succeeded,
+        failed=len(final) - succeeded,
+        cancelled=sum(
+            1 for r in final if r.error_type == OptimizationCancelledError.__name__
+        ),
+        duration_seconds=time.time() - started,
+    )
+    return BatchResult(results=final, report=report)
+
+
+def optimize_batch(
+    records: Sequence[BatchRecord],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    normalization: Optional[NormalizationOptions] = NormalizationOptions(),
+    use_cache: bool = False,
+    verbose: bool = False,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancelToken] = None,
+    refinement: Optional[RefinementOptions] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+    on_result: Optional[Callable[[BatchItemResult], None]] = None,
+) -> BatchResult:
+    """
+    Optimize a batch of records using a thread pool.
+
+    Args:
+        records: The batch records.
+        max_concurrency: The maximum number of concurrent upstream calls.
+        normalization: Normalization used to collapse duplicates, or None to
+                       send every record upstream.
+        use_cache: Whether to reuse results from the shared result cache.
+        verbose: Whether to print verbose output.
+        timeout: Optional time budget, in seconds, for the whole batch.
+        cancel_token: Optional token that stops the batch. Records not yet
+                      finished are reported as cancelled.
+        refinement: Optional multi-pass refinement applied to every record.
+        backend: The name of the backend to use, or None to route each
+                 record by the configured rules.
+        offline_fallback: Whether records whose upstream call times out or
+                          fails transiently get a heuristic result instead.
+        on_result: Optional callback receiving each record's result as soon
+                   as it is known, for example to checkpoint progress.
+
+    Returns:
+        One result per record, in input order, and the batch report.
+    """
+    _check_refinement_backend(refinement, backend)
+    started = time.time()
+    records = resolve_auto_records(records)
+    groups = group_duplicates(records, normalization)
+    deadline = Deadline(timeout)
+
+    if verbose:
+        print(
+            f"🔧 Batch of {len(records)} records, {len(groups)} unique after normalization."
+        )
+
+    def run(group: List[int]) -> BatchItemResult:
+        return _optimize_record(
+            records[group[0]],
+            refinement,
+            use_cache,
+            backend,
+            deadline,
+            cancel_token,
+            offline_fallback,
+        )
+
+    # Resolved on cancellation, so waiting below wakes up immediately.
+    stop: "Future[None]" = Future()
+
+    def on_cancel() -> None:
+        if not stop.done():
+            stop.set_result(None)
+
+    if cancel_token is not None:
+        cancel_token.add_callback(on_cancel)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+    futures = {executor.submit(run, group): i for i, group in enumerate(groups)}
+    outcomes: List[Optional[BatchItemResult]] = [None] * len(groups)
+    try:
+        waiting: "Set[Future[Any]]" = set(futures)
+        while waiting and not stop.done():
+            done, _ = wait(
+                waiting | {stop},
+                timeout=deadline.remaining(),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                break  # The batch deadline passed.
+            for future in done:
+                if future is not stop:
+                    index = futures[future]
+                    outcomes[index] = future.result()
+                    waiting.discard(future)
+                    if on_result is not None:
+                        for result in _group_results(
+                            records, groups[index], future.result()
+                        ):
+                            on_result(result)
+    finally:
+        if cancel_token is not None:
+            cancel_token.remove_callback(on_cancel)
+        for future in futures:
+            future.cancel()
+        # Calls already in flight cannot be interrupted; don't wait for them.
+        executor.shutdown(wait=False)
+
+    for i, outcome in enumerate(outcomes):
+        if outcome is None:
+            error: Exception = (
+                OptimizationCancelledError("Optimization cancelled.")
+                if stop.done()
+                else OptimizationTimeoutError("Optimization deadline exceeded.")
+            )
+            failure = _failure(records[groups[i][0]].id, error)
+            outcomes[i] = failure
+            if on_result is not None:
+                for result in _group_results(records, groups[i], failure):
+                    on_result(result)
+
+    return _fan_out(records, groups, [o for o in outcomes if o], started)
+
+
+async def optimize_batch_async(
+    records: Sequence[BatchRecord],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    normalization: Optional[NormalizationOptions] = NormalizationOptions(),
+    use_cache: bool = False,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancelToken] = None,
+    refinement: Optional[RefinementOptions] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+    on_result: Optional[Callable[[BatchItemResult], None]] = None,
+) -> BatchResult:
+    """
+    Async version of `optimize_batch`.
+
+    Cancelling `cancel_token` (from any thread) stops dispatching and aborts
+    the upstream calls in flight.
+
+    Args:
+        records: The batch records.
+        max_concurrency: The maximum number of concurrent upstream calls.
+        normalization: Normalization used to collapse duplicates, or None to
+                       send every record upstream.
+        use_cache: Whether to reuse results from the shared result cache.
+        timeout: Optional time budget, in seconds, for the whole batch.
+        cancel_token: Optional token that stops the batch.
+        refinement: Optional multi-pass refinement applied to every record.
+        backend: The name of the backend to use, or None to route each
+                 record by the configured rules.
+        offline_fallback: Whether records whose upstream call times out or
+                          fails transiently get a heuristic result instead.
+        on_result: Optional callback receiving each record's result as soon
+                   as it is known, for example to checkpoint progress.
+
+    Returns:
+        One result per record, in input order, and the batch report.
+    """
+    _check_refinement_backend(refinement, backend)
+    started = time.time()
+    records = resolve_auto_records(records)
+    groups = group_duplicates(records, normalization)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    deadline = Deadline(timeout)
+
+    async def run(group: List[int]) -> BatchItemResult:
+        record = records[group[0]]
+        async with semaphore:
+            usage = UsageMeter()
+            started = time.monotonic()
+            try:
+                if refinement is not None:
+                    refined = await refine_prompt_async(
+                        user_input=record.prompt,
+                        mode=record.mode,
+                        domain=record.domain,
+                        model=record.model,
+                        temperature=record.temperature,
+                        options=refinement,
+                        use_cache=use_cache,
+                        backend=backend,
+                        offline_fallback=offline_fallback,
+                        deadline=deadline,
+                        usage=usage,
+                    )
+                    result = BatchItemResult(
+                        id=record.id,
+                        optimized_prompt=refined.optimized_prompt,
+                        passes=refined.passes,
+                    )
+                else:
+                    optimized = await optimize_prompt_async(
+                        user_input=record.prompt,
+                        mode=record.mode,
+                        domain=record.domain,
+                        model=record.model,
+                        temperature=record.temperature,
+                        use_cache=use_cache,
+                        deadline=deadline,
+                        backend=backend,
+                        offline_fallback=offline_fallback,
+                        usage=usage,
+                    )
+                    result = BatchItemResult(id=record.id, optimized_prompt=optimized)
+            except Exception as e:
+                result = _failure(record.id, e)
+            return _metered(result, usage, started)
+
+    async def run_and_report(group: List[int]) -> BatchItemResult:
+        outcome = await run(group)
+        if on_result is not None:
+            for result in _group_results(records, group, outcome):
+                on_result(result)
+        return outcome
+
+    tasks = [asyncio.ensure_future(run_and_report(group)) for group in groups]
+    loop = asyncio.get_running_loop()
+
+    def on_cancel() -> None:
+        loop.call_soon_threadsafe(lambda: [task.cancel() for task in tasks])
+
+    if cancel_token is not None:
+        cancel_token.add_callback(on_cancel)
+    try:
+        settled = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        if cancel_token is not None:
+            cancel_token.remove_callback(on_cancel)
+
+    outcomes: List[BatchItemResult] = []
+    for group, outcome in zip(groups, settled):
+        if not isinstance(outcome, BatchItemResult):
+            outcome = _failure(
+                records[group[0]].id,
+                OptimizationCancelledError("Optimization cancelled."),
+            )
+            if on_result is not None:
+                for result in _group_results(records, group, outcome):
+                    on_result(result)
+        outcomes.append(outcome)
+    return _fan_out(records, groups, outcomes, started)
+
+
+def optimize_stream(
+    records: Iterable[BatchRecord],
+    max_in_flight: int = DEFAULT_BATCH_CONCURRENCY,
+    ordered: bool = True,
+    use_cache: bool = False,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancelToken] = None,
+    refinement: Optional[RefinementOptions] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    ensemble_size: Optional[int] = None,
+) -> Iterator[BatchItemResult]:
+    """
+    Optimize a stream of records, yielding each result as soon as it is ready.
+
+    Records are read on a background thread as they arrive, so a slow
+    producer such as a pipe never delays results already finished. At most
+    `max_in_flight` records are being optimized or waiting to be yielded at
+    any time, which bounds memory on endless inputs; with `ordered`, a slow
+    record therefore holds back the ones after it.
+
+    Args:
+        records: The records, possibly lazy and unbounded.
+        max_in_flight: The maximum records in flight at once.
+        ordered: Whether to yield results in input order, rather than in
+                 order of completion.
+        use_cache: Whether to reuse results from the shared result cache.
+        timeout: Optional time budget, in seconds, for each record.
+        cancel_token: Optional token that stops reading new records.
+        refinement: Optional multi-pass refinement applied to every record.
+        backend: The name of the backend to use, or None to route each
+                 record by the configured rules.
+        offline_fallback: Whether records whose upstream call times out or
+                          fails transiently get a heuristic result instead.
+        max_retries: Retries per record for transient upstream failures.
+        ensemble_size: Candidates generated per record, keeping the
+                       consensus; defaults to each mode's ensemble size.
+
+    Yields:
+        One result per record.
+    """
+    _check_refinement_backend(refinement, backend)
+    slots = threading.Semaphore(max(1, max_in_flight))
+    # (index, result) pairs; a None result ends the stream after `index` records.
+    finished: "queue.Queue[Tuple[int, Optional[BatchItemResult]]]" = queue.Queue()
+    stop = threading.Event()
+    read_errors: List[BaseException] = []
+    executor = ThreadPoolExecutor(max_workers=max(1, max_in_flight))
+
+    def run(index: int, record: BatchRecord) -> None:
+        result = _optimize_record(
+            record,
+            refinement,
+            use_cache,
+            backend,
+            Deadline(timeout),
+            cancel_token,
+            offline_fallback,
+            max_retries,
+            ensemble_size,
+        )
+        finished.put((index, result))
+
+    def read() -> None:
+        count = 0
+        try:
+            for record in records:
+                slots.acquire()
+                if stop.is_set() or (
+                    cancel_token is not None and cancel_token.cancelled
+                ):
+                    break
+                executor.submit(run, count, record)
+                count += 1
+        except BaseException as e:
+            read_errors.append(e)
+        finally:
+            finished.put((count, None))
+
+    # A daemon, since reading may block forever on an idle pipe.
+    threading.Thread(target=read, name="isoprompt-stream-reader", daemon=True).start()
+
+    total: Optional[int] = None
+    received = 0
+    pending: Dict[int, BatchItemResult] = {}
+    next_index = 0
+    try:
+        while total is None or received < total:
+            index, result = finished.get()
+            if result is None:
+                total = index
+                continue
+            received += 1
+            if not ordered:
+                slots.release()
+                yield result
+                continue
+            pending[index] = result
+            while next_index in pending:
+                slots.release()
+                yield pending.pop(next_index)
+                next_index += 1
+    finally:
+        stop.set()
+        slots.release()  # Wake the reader if it waits for a slot.
+        executor.shutdown(wait=False)
+
+    if read_errors:
+        raise read_errors[0]
+
+
+def load_batch_records(
+    file_path: str, defaults: Optional[Dict[str, object]] = None
+) -> List[BatchRecord]:
+    """
+    Load batch records from a file.
+
+    `.jsonl` files hold one JSON object per line with at least `prompt` and
+    optionally `id`, `mode`, `domain`, `model` and `temperature`. Any other file
+    is read as one prompt per non-empty line. Records without an ID are given
+    their line number.
+
+    Args:
+        file_path: The path to the batch file.
+        defaults: Options applied to records that do not set them.
+
+    Returns:
+        The batch records.
+    """
+    is_jsonl = os.path.splitext(file_path)[1].lower() == ".jsonl"
+    records: List[BatchRecord] = []
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            fields: Dict[str, object] = dict(defaults or {})
+            if is_jsonl:
+                fields.update(json.loads(line))
+            else:
+                fields["prompt"] = line.rstrip("\n")
+            fields["id"] = str(fields.get("id", line_number))
+            records.append(BatchRecord.model_validate(fields))
+    return records
+
+
+def write_batch_results(file_path: str, results: Sequence[BatchItemResult]) -> None:
+    """
+    Write batch results to a JSONL file, one result per line.
+
+    Args:
+        file_path: The path to the output file.
+        results: The batch results.
+    """
+    output_path = os.path.abspath(file_path)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(result.model_dump_json(exclude_none=True) + "\n")
@@ -0,0 +1,483 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Offline batch jobs through the OpenAI Batch API.
+
+For large non-interactive corpora the Batch API is cheaper than synchronous
+calls and does not count against their rate limits. Records are deduplicated
+as in `optimize_batch`, rendered through the optimization templates into
+Batch API JSONL files of at most 50,000 requests, uploaded and submitted.
+Their status is polled with exponential backoff, then the output files are
+streamed back and every result is written under the IDs of the records that
+share it.
+
+Progress is saved to a small JSON state file after every step. Running the
+same job again resumes it: uploaded files and submitted batches are reused
+instead of being paid for twice.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import openai
+
+from .backends import get_backend_registry
+from .batch import duplicate_usage, group_duplicates, resolve_auto_records
+from .constants import (
+    AUTO,
+    BATCH_API_COMPLETION_WINDOW,
+    BATCH_API_ENDPOINT,
+    BATCH_API_MAX_REQUESTS,
+    DEFAULT_BATCH_POLL_INTERVAL,
+    DEFAULT_MAX_TOKENS,
+    MAX_BATCH_POLL_INTERVAL,
+    OPENAI_BACKEND,
+)
+from .deadline import CancelToken, Deadline
+from .errors import IsoPromptError
+from .model_selection import plan_models
+from .models import (
+    BatchApiJob,
+    BatchApiState,
+    BatchItemResult,
+    BatchRecord,
+    BatchReport,
+    NormalizationOptions,
+)
+from .optimizer import build_messages, resolve_ensemble_size, translate_error
+from .similarity import consensus
+from .sinks import ResultSink
+
+BATCH_API_TERMINAL_STATUSES = ["completed", "failed", "expired", "cancelled"]
+
+
+def render_batch_request(custom_id: str, record: BatchRecord) -> Dict[str, Any]:
+    """
+    Render one record as a Batch API request line.
+
+    Args:
+        custom_id: The ID the result will carry.
+        record: The record, with a concrete mode, domain and model.
+
+    Returns:
+        The request object.
+    """
+    body: Dict[str, Any] = {
+        "model": record.model,
+        "messages": build_messages(record.prompt, record.mode, record.domain),
+        "temperature": record.temperature,
+        "max_tokens": DEFAULT_MAX_TOKENS,
+    }
+    n_candidates = resolve_ensemble_size(record.mode)
+    if n_candidates > 1:
+        body["n"] = n_candidates
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_API_ENDPOINT,
+        "body": body,
+    }
+
+
+def _concrete_records(records: Sequence[BatchRecord]) -> List[BatchRecord]:
+    """Resolve "auto" modes, domains and models before rendering."""
+    resolved = resolve_auto_records(records)
+    return [
+        (
+            r.model_copy(update={"model": plan_models(r.prompt, r.mode)[0]})
+            if r.model == AUTO
+            else r
+        )
+        for r in resolved
+    ]
+
+
+def prepare_batch_api_state(
+    records: Sequence[BatchRecord],
+    normalization: Optional[NormalizationOptions] = NormalizationOptions(),
+    max_requests: int = BATCH_API_MAX_REQUESTS,
+) -> Tuple[BatchApiState, List[str]]:
+    """
+    Render the requests of a job and plan its Batch API files.
+
+    Args:
+        records: The batch records.
+        normalization: Normalization used to collapse duplicates, or None to
+                       send every record.
+        max_requests: The maximum requests per Batch API file.
+
+    Returns:
+        A fresh state, and the rendered request lines in custom ID order.
+    """
+    records = _concrete_records(records)
+    groups = group_duplicates(records, normalization)
+
+    lines: List[str] = []
+    digest = hashlib.sha256()
+    for index, group in enumerate(groups):
+        line = json.dumps(render_batch_request(str(index), records[group[0]]))
+        lines.append(line)
+        digest.update(line.encode("utf-8"))
+
+    custom_ids = [str(index) for index in range(len(groups))]
+    state = BatchApiState(
+        fingerprint=digest.hexdigest(),
+        groups={
+            custom_id: [records[i].id for i in group]
+            for custom_id, group in zip(custom_ids, groups)
+        },
+        jobs=[
+            BatchApiJob(custom_ids=custom_ids[start : start + max_requests])
+            for start in range(0, len(custom_ids), max_requests)
+        ],
+    )
+    return state, lines
+
+
+def load_batch_api_state(path: str) -> Optional[BatchApiState]:
+    """Load a saved state, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return BatchApiState.model_validate_json(f.read())
+
+
+def save_batch_api_state(path: str, state: BatchApiState) -> None:
+    """Save a state, replacing the file atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(state.model_dump_json())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _call(fn: Any, *args: Any, **kwargs: Any) -> Any:
+    """Call the API, translating SDK errors into IsoPrompt errors."""
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        raise translate_error(e) from e
+
+
+def _update_job(job: BatchApiJob, batch: Any) -> None:
+    """Copy the status, result files and errors of a batch to its job."""
+    job.status = batch.status
+    job.output_file_id = batch.output_file_id
+    job.error_file_id = batch.error_file_id
+    errors = getattr(batch.errors, "data", None) or []
+    job.errors = [error.message for error in errors if error.message]
+
+
+def submit_batch_api_jobs(
+    client: openai.OpenAI,
+    state: BatchApiState,
+    lines: Sequence[str],
+    state_path: str,
+    verbose: bool = False,
+) -> None:
+    """
+    Upload and submit every job of a state that has not been submitted yet.
+
+    Args:
+        client: The client of the backend running the batches.
+        state: The state to advance; saved after every step.
+        lines: The rendered request lines, indexed by custom ID.
+        state_path: Where to save the state.
+        verbose: Whether to print progress.
+    """
+    for job in state.jobs:
+        if job.input_file_id is None:
+            content = "".join(lines[int(c)] + "\n" for c in job.custom_ids)
+            uploaded = _call(
+                client.files.create,
+                file=("isoprompt-batch.jsonl", content.encode("utf-8")),
+                purpose="batch",
+            )
+            job.input_file_id = uploaded.id
+            save_batch_api_state(state_path, state)
+        if job.batch_id is None:
+            batch = _call(
+                client.batches.create,
+                input_file_id=job.input_file_id,
+                endpoint=BATCH_API_ENDPOINT,
+                completion_window=BATCH_API_COMPLETION_WINDOW,
+            )
+            job.batch_id = batch.id
+            # A batch can already be terminal, e.g. failed validation, and
+            # is then never polled.
+            _update_job(job, batch)
+            save_batch_api_state(state_path, state)
+            if verbose:
+                print(
+                    f"🔧 Submitted batch {batch.id} ({len(job.custom_ids)} requests)."
+                )
+
+
+def wait_for_batch_api_jobs(
+    client: openai.OpenAI,
+    state: BatchApiState,
+    state_path: str,
+    poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+    max_poll_interval: float = MAX_BATCH_POLL_INTERVAL,
+    deadline: Optional[Deadline] = None,
+    cancel_token: Optional[CancelToken] = None,
+    verbose: bool = False,
+) -> None:
+    """
+    Poll the submitted jobs until they all reach a terminal status.
+
+    The interval doubles after every poll without progress, up to
+    `max_poll_interval`, and polls that fail transiently are retried on the
+    next round.
+
+    Args:
+        client: The client of the backend running the batches.
+        state: The state to advance; saved whenever a job changes.
+        state_path: Where to save the state.
+        poll_interval: Seconds before the first poll.
+        max_poll_interval: The longest wait between polls.
+        deadline: Optional time limit; the state stays resumable when it
+                  passes.
+        cancel_token: Optional token that stops waiting.
+        verbose: Whether to print progress.
+    """
+    deadline = deadline or Deadline(None)
+    interval = poll_interval
+    while True:
+        pending = [
+            job for job in state.jobs if job.status not in BATCH_API_TERMINAL_STATUSES
+        ]
+        if not pending:
+            return
+
+        progressed = False
+        for job in pending:
+            try:
+                batch = _call(client.batches.retrieve, job.batch_id)
+            except IsoPromptError as e:
+                if not e.retryable:
+                    raise
+                continue
+            if batch.status != job.status:
+                _update_job(job, batch)
+                progressed = True
+                if verbose:
+                    print(f"🔧 Batch {job.batch_id}: {batch.status}.")
+        if progressed:
+            save_batch_api_state(state_path, state)
+            interval = poll_interval
+            continue
+
+        deadline.check()
+        remaining = deadline.remaining()
+        delay = interval * random.uniform(0.8, 1.2)
+        if remaining is not None:
+            delay = min(delay, remaining)
+        if cancel_token is not None:
+            cancel_token.sleep(delay)
+        else:
+            time.sleep(delay)
+        interval = min(interval * 2.0, max_poll_interval)
+
+
+def _iter_file_lines(client: openai.OpenAI, file_id: str) -> Iterator[Dict[str, Any]]:
+    """Stream the JSON lines of an output or error file."""
+    try:
+        with client.files.with_streaming_response.content(file_id) as response:
+            for line in response.iter_lines():
+                if line.strip():
+                    yield json.loads(line)
+    except (IsoPromptError, ValueError):
+        raise
+    except Exception as e:
+        raise translate_error(e) from e
+
+
+def _parse_result_line(line: Dict[str, Any]) -> BatchItemResult:
+    """Turn one output or error line into the result of its request."""
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    error = line.get("error") or body.get("error")
+    if error or response.get("status_code", 200) >= 400:
+        message = (error or {}).get("message") or "Batch request failed"
+        return BatchItemResult(
+            id=line["custom_id"], error=message, error_type="UpstreamError"
+        )
+
+    candidates = [
+        (choice.get("message") or {}).get("content", "").strip()
+        for choice in body.get("choices") or []
+    ]
+    candidates = [c for c in candidates if c]
+    if not candidates:
+        return BatchItemResult(
+            id=line["custom_id"],
+            error="No content in OpenAI response",
+            error_type="EmptyResponseError",
+        )
+    best, _ = consensus(candidates)
+    usage = body.get("usage") or {}
+    return BatchItemResult(
+        id=line["custom_id"],
+        optimized_prompt=candidates[best],
+        prompt_tokens=usage.get("prompt_tokens"),
+        completion_tokens=usage.get("completion_tokens"),
+    )
+
+
+def iter_batch_api_results(
+    client: openai.OpenAI, state: BatchApiState
+) -> Iterator[BatchItemResult]:
+    """
+    Stream the results of finished jobs, one per input record.
+
+    Requests without a result (for example in a failed or expired batch)
+    are reported as failed.
+
+    Args:
+        client: The client of the backend that ran the batches.
+        state: A state whose jobs have all finished.
+
+    Yields:
+        Results under the record IDs, duplicates pointing to their leader.
+    """
+    for job in state.jobs:
+        missing = set(job.custom_ids)
+        for file_id in (job.output_file_id, job.error_file_id):
+            if not file_id:
+                continue
+            for line in _iter_file_lines(client, file_id):
+                outcome = _parse_result_line(line)
+                if outcome.id not in missing:
+                    continue
+                missing.discard(outcome.id)
+                yield from _fan_out(state, outcome)
+
+        message = f"Batch {job.batch_id} {job.status} without a result"
+        if job.errors:
+            message += ": " + "; ".join(job.errors)
+        for custom_id in job.custom_ids:
+            if custom_id in missing:
+                failure = BatchItemResult(
+                    id=custom_id, error=message, error_type="UpstreamError"
+                )
+                yield from _fan_out(state, failure)
+
+
+def _fan_out(
+    state: BatchApiState, outcome: BatchItemResult
+) -> Iterator[BatchItemResult]:
+    """Copy the outcome of a request to every record sharing it."""
+    record_ids = state.groups[outcome.id]
+    yield outcome.model_copy(update={"id": record_ids[0]})
+    for record_id in record_ids[1:]:
+        yield outcome.model_copy(
+            update={
+                "id": record_id,
+                "duplicate_of": record_ids[0],
+                **duplicate_usage(outcome),
+            }
+        )
+
+
+def _write_result(f: TextIO, result: BatchItemResult) -> None:
+    """Append one result to a JSONL file."""
+    f.write(result.model_dump_json(exclude_none=True) + "\n")
+
+
+def run_batch_api_job(
+    records: Sequence[BatchRecord],
+    output_path: str,
+    state_path: Optional[str] = None,
+    normalization: Optional[NormalizationOptions] = NormalizationOptions(),
+    backend: Optional[str] = None,
+    poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+    max_poll_interval: float = MAX_BATCH_POLL_INTERVAL,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancelToken] = None,
+    verbose: bool = False,
+    sink: Optional[ResultSink] = None,
+) -> BatchReport:
+    """
+    Optimize a batch of records through the Batch API, resuming if possible.
+
+    Args:
+        records: The batch records.
+        output_path: The JSONL file for the results, unless `sink` is given.
+        state_path: The resumable state file; defaults to the output path
+                    with a `.state.json` suffix.
+        normalization: Normalization used to collapse duplicates, or None to
+                       send every record.
+        backend: The name of the backend to submit to; defaults to "openai".
+                 Point a configured backend's `base_url` at a stub server to
+                 test without the API.
+        poll_interval: Seconds before the first status poll.
+        max_poll_interval: The longest wait between polls.
+        timeout: Optional time to wait for the batches. When it passes,
+                 `OptimizationTimeoutError` is raised and running the job
+                 again resumes it.
+        cancel_token: Optional token that stops waiting, leaving the job
+                      resumable.
+        verbose: Whether to print progress.
+        sink: Optional sink that receives the results, with their records,
+              instead of the JSONL file; the caller closes it.
+
+    Returns:
+        The batch report.
+    """
+    started = time.time()
+    state_path = state_path or f"{output_path}.state.json"
+    client = get_backend_registry().get(backend or OPENAI_BACKEND).client()
+
+    state, lines = prepare_batch_api_state(records, normalization)
+    saved = load_batch_api_state(state_path)
+    if saved is not None and saved.fingerprint == state.fingerprint:
+        state = saved
+        if verbose:
+            print(f"🔧 Resuming batch job from {state_path}.")
+    save_batch_api_state(state_path, state)
+
+    submit_batch_api_jobs(client, state, lines, state_path, verbose)
+    wait_for_batch_api_jobs(
+        client,
+        state,
+        state_path,
+        poll_interval=poll_interval,
+        max_poll_interval=max_poll_interval,
+        deadline=Deadline(timeout),
+        cancel_token=cancel_token,
+        verbose=verbose,
+    )
+
+    report = BatchReport(
+        total=len(records),
+        unique=len(state.groups),
+        duplicates=len(records) - len(state.groups),
+    )
+    by_id = {record.id: record for record in records}
+    output = os.path.abspath(output_path)
+    with contextlib.ExitStack() as stack:
+        if sink is None:
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            f = stack.enter_context(open(output, "w", encoding="utf-8"))
+        for result in iter_batch_api_results(client, state):
+            if sink is None:
+                _write_result(f, result)
+            else:
+                sink.write(result, by_id.get(result.id))
+            if result.error is None:
+                report.succeeded += 1
+            else:
+                report.failed += 1
+    report.duration_seconds = time.time() - started
+    return report
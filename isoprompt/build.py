@@ -0,0 +1,227 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Incremental builds of optimized prompts from a manifest.
+
+A build manifest maps source prompts to outputs, each with its mode, domain,
+model, temperature and optional guideline files. Every output is stored with
+a fingerprint of what produced it: the source text, the rendered optimization
+template, the parameters and the content of each guideline file. A build only
+re-optimizes the outputs whose fingerprint changed, like `make`, and runs
+them in parallel. Editing the built-in guidelines changes every rendered
+template and so rebuilds everything; editing a guideline file of the manifest
+rebuilds exactly the entries that list it.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from .batch import optimize_batch, resolve_auto_records
+from .constants import BUILD_STATE_FILE, DEFAULT_BATCH_CONCURRENCY
+from .models import BatchItemResult, BatchRecord, BuildEntry, BuildManifest, BuildReport
+from .templates import get_optimization_template
+
+
+def load_build_manifest(path: str) -> BuildManifest:
+    """
+    Load a build manifest from a JSON file.
+
+    The file holds `entries`, a list of `BuildEntry` objects, and optionally
+    `defaults`, fields applied to every entry that does not set them.
+
+    Args:
+        path: The manifest file.
+
+    Returns:
+        The validated manifest.
+
+    Raises:
+        ValueError: If the manifest is invalid or two entries share an output.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    defaults = data.get("defaults", {})
+    manifest = BuildManifest(
+        entries=[
+            BuildEntry.model_validate({**defaults, **entry})
+            for entry in data.get("entries", [])
+        ]
+    )
+    outputs = [entry.output for entry in manifest.entries]
+    duplicates = sorted({o for o in outputs if outputs.count(o) > 1})
+    if duplicates:
+        raise ValueError(f"Outputs listed more than once: {duplicates}")
+    return manifest
+
+
+def compose_input(text: str, guidelines: List[str]) -> str:
+    """Add the rules of an entry's guideline files to its source prompt."""
+    if not guidelines:
+        return text
+    rules = "\n\n".join(g.strip() for g in guidelines)
+    return f"{text.rstrip()}\n\nAlso follow these guidelines:\n\n{rules}"
+
+
+def _hash(text: str) -> str:
+    """Hash a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _read(path: str) -> str:
+    """Read a text file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """Write a file, replacing it atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _load_state(path: str) -> Dict[str, Dict[str, str]]:
+    """Load the fingerprint components of each output, ignoring a corrupt file."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            outputs = json.load(f)["outputs"]
+        return {
+            str(output): {str(k): str(v) for k, v in components.items()}
+            for output, components in outputs.items()
+        }
+    except (OSError, ValueError, KeyError, AttributeError):
+        return {}
+
+
+def _stale_reason(
+    previous: Optional[Dict[str, str]], current: Dict[str, str], output_path: str
+) -> Optional[str]:
+    """Explain why an output must be rebuilt, or None if it is up to date."""
+    if not os.path.exists(output_path):
+        return "output missing"
+    if previous is None:
+        return "not built by isoprompt"
+    changed = sorted(
+        key
+        for key in previous.keys() | current.keys()
+        if previous.get(key) != current.get(key)
+    )
+    return f"changed: {', '.join(changed)}" if changed else None
+
+
+def run_build(
+    manifest_path: str,
+    state_path: Optional[str] = None,
+    force: bool = False,
+    dry_run: bool = False,
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    timeout: Optional[float] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> BuildReport:
+    """
+    Rebuild the stale outputs of a manifest.
+
+    Args:
+        manifest_path: The manifest file. Paths in it are relative to it.
+        state_path: The file keeping the fingerprints; defaults to
+                    `.isoprompt-build.json` next to the manifest.
+        force: Whether to rebuild every output.
+        dry_run: Whether to only report what is stale.
+        max_concurrency: The maximum outputs built at once.
+        timeout: Optional time budget, in seconds, for the whole build.
+        backend: The name of the backend to use, or None to route each entry
+                 by the configured rules.
+        offline_fallback: Whether entries whose upstream call times out or
+                          fails transiently get a heuristic result instead.
+
+    Returns:
+        The build report.
+    """
+    started = time.time()
+    manifest = load_build_manifest(manifest_path)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    state_path = state_path or os.path.join(base_dir, BUILD_STATE_FILE)
+    state = _load_state(state_path)
+    report = BuildReport(total=len(manifest.entries))
+
+    records: List[BatchRecord] = []
+    components: Dict[str, Dict[str, str]] = {}
+    for entry in manifest.entries:
+        try:
+            text = _read(os.path.join(base_dir, entry.source))
+            guidelines = {g: _read(os.path.join(base_dir, g)) for g in entry.guidelines}
+            records.append(
+                BatchRecord(
+                    id=entry.output,
+                    prompt=compose_input(text, list(guidelines.values())),
+                    mode=entry.mode,
+                    domain=entry.domain,
+                    model=entry.model,
+                    temperature=entry.temperature,
+                )
+            )
+        except (OSError, ValueError) as e:
+            report.failed += 1
+            report.errors[entry.output] = str(e)
+            continue
+        components[entry.output] = {
+            "source": _hash(text),
+            "params": _hash(
+                json.dumps([entry.mode, entry.domain, entry.model, entry.temperature])
+            ),
+            **{f"guidelines {g}": _hash(content) for g, content in guidelines.items()},
+        }
+
+    stale: List[BatchRecord] = []
+    for record in resolve_auto_records(records):
+        current = components[record.id]
+        current["template"] = _hash(
+            get_optimization_template(record.mode, record.domain)
+        )
+        reason = _stale_reason(
+            state.get(record.id), current, os.path.join(base_dir, record.id)
+        )
+        if reason is None and force:
+            reason = "forced"
+        if reason is None:
+            report.up_to_date += 1
+            continue
+        report.stale[record.id] = reason
+        stale.append(record)
+
+    if dry_run or not stale:
+        report.duration_seconds = time.time() - started
+        return report
+
+    def on_result(result: BatchItemResult) -> None:
+        if result.optimized_prompt is None:
+            report.failed += 1
+            report.errors[result.id] = result.error or "Unknown error"
+            return
+        _write_atomic(os.path.join(base_dir, result.id), result.optimized_prompt)
+        state[result.id] = components[result.id]
+        _write_atomic(state_path, json.dumps({"outputs": state}, indent=2))
+        report.built += 1
+
+    optimize_batch(
+        stale,
+        max_concurrency=max_concurrency,
+        normalization=None,
+        timeout=timeout,
+        backend=backend,
+        offline_fallback=offline_fallback,
+        on_result=on_result,
+    )
+    report.duration_seconds = time.time() - started
+    return report
@@ -0,0 +1,103 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+In-memory caching of optimization results.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .constants import DEFAULT_RESULT_CACHE_SIZE, OPENAI_BACKEND
+
+
+def make_cache_key(
+    user_input: str,
+    mode: str,
+    domain: Optional[str],
+    model: str,
+    temperature: float,
+    n_candidates: int = 1,
+    backend: str = OPENAI_BACKEND,
+) -> str:
+    """
+    Build a stable cache key for an optimization request.
+
+    Args:
+        user_input: The user's basic prompt or request.
+        mode: The optimization mode.
+        domain: The optional domain specialization.
+        model: The model used for optimization.
+        temperature: The temperature used for optimization.
+        n_candidates: The candidates generated in one completion.
+        backend: The name of the backend serving the request.
+
+    Returns:
+        A hex digest identifying the request.
+    """
+    payload = json.dumps(
+        [user_input, mode, domain, model, temperature, n_candidates, backend]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    A thread-safe, size-bounded LRU cache of optimized prompts.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_RESULT_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached prompt for a key, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a prompt, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit, miss and size counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_result_cache = ResultCache()
+
+
+def get_result_cache() -> ResultCache:
+    """Get the process-wide result cache shared by the sync and async paths."""
+    return _result_cache
@@ -0,0 +1,315 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Slim, immutable records of the mode and domain catalogs.
+
+The built-in modes and domains are trusted constants, so they are kept as
+frozen named tuples rather than validated pydantic models: each entry is
+built once per process, needs no per-instance `__dict__`, and is shared by
+every caller. Pydantic validation (`IsoPromptMode`, `IsoPromptDomain`) is
+only applied at the boundary, to definitions registered by users.
+
+The built-in entries ship as packed catalog files in `isoprompt/catalogs`:
+JSON Lines with one entry per line, after a header line that indexes each
+entry's byte offset and length. A catalog reads its header on first use and
+parses an entry only when it is looked up, from a memory map of the file, so
+importing IsoPrompt or looking up one mode does not parse the whole catalog.
+Overlay files named by `ISOPROMPT_CATALOGS` are merged on top.
+"""
+
+import json
+import mmap
+import os
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from .constants import CATALOGS_ENV
+
+CATALOG_DIR = os.path.join(os.path.dirname(__file__), "catalogs")
+
+
+class ModeSpec(NamedTuple):
+    """
+    An optimization mode.
+    """
+
+    mode: str
+    description: str
+    usage: str
+    capabilities: Tuple[str, ...]
+    strictness: str
+    require_citations: bool
+    output_formats: Tuple[str, ...]
+    industries: Tuple[str, ...]
+    topics: Tuple[str, ...]
+
+
+class DomainSpec(NamedTuple):
+    """
+    A domain specialization.
+    """
+
+    domain: str
+    description: str
+    fields: Tuple[str, ...]
+    applications: Tuple[str, ...]
+
+
+def mode_from_dict(data: Dict[str, Any]) -> ModeSpec:
+    """Build a mode from a trusted catalog entry."""
+    return ModeSpec(
+        mode=data["mode"],
+        description=data["description"],
+        usage=data["usage"],
+        capabilities=tuple(data["capabilities"]),
+        strictness=data["strictness"],
+        require_citations=data["require_citations"],
+        output_formats=tuple(data["output_formats"]),
+        industries=tuple(data["industries"]),
+        topics=tuple(data["topics"]),
+    )
+
+
+def domain_from_dict(data: Dict[str, Any]) -> DomainSpec:
+    """Build a domain from a trusted catalog entry."""
+    return DomainSpec(
+        domain=data["domain"],
+        description=data["description"],
+        fields=tuple(data["fields"]),
+        applications=tuple(data["applications"]),
+    )
+
+
+def to_dict(spec: Union[ModeSpec, DomainSpec]) -> Dict[str, Any]:
+    """Convert a mode or domain to a JSON-ready dict, with lists for tuples."""
+    return {
+        key: list(value) if isinstance(value, tuple) else value
+        for key, value in spec._asdict().items()
+    }
+
+
+Spec = TypeVar("Spec", ModeSpec, DomainSpec)
+
+
+def write_catalog(path: str, entries: Iterable[Dict[str, Any]], key: str) -> None:
+    """
+    Write a packed catalog file.
+
+    Args:
+        path: The file to write.
+        entries: The catalog entries, in order.
+        key: The field naming each entry, e.g. "mode".
+
+    Raises:
+        ValueError: If two entries have the same name.
+    """
+    index: Dict[str, List[int]] = {}
+    lines: List[bytes] = []
+    offset = 0
+    for entry in entries:
+        name = entry[key]
+        if name in index:
+            raise ValueError(f"Duplicate catalog entry: {name!r}")
+        line = json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+        index[name] = [offset, len(line) - 1]
+        lines.append(line)
+        offset += len(line)
+    header = json.dumps({"key": key, "index": index}, ensure_ascii=False)
+    with open(path, "wb") as f:
+        f.write(header.encode("utf-8") + b"\n")
+        f.writelines(lines)
+
+
+def repack_catalog(path: str) -> None:
+    """
+    Rebuild the index of a packed catalog file after its entries were edited.
+
+    Args:
+        path: The catalog file; entries may be added, edited or removed, one
+            JSON object per line after the header.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        key = json.loads(f.readline())["key"]
+        entries = [json.loads(line) for line in f if line.strip()]
+    write_catalog(path, entries, key)
+
+
+def read_overlay(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Read an overlay catalog file.
+
+    Args:
+        path: A JSON file with optional "modes" and "domains" lists.
+
+    Returns:
+        The overlay's lists of mode and domain definitions.
+
+    Raises:
+        ValueError: If the file is not an overlay catalog.
+    """
+    with open(os.path.expanduser(path), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(
+        isinstance(data.get(section, []), list) for section in ("modes", "domains")
+    ):
+        raise ValueError(
+            f"{path}: expected an object with 'modes' and/or 'domains' lists."
+        )
+    return data
+
+
+def overlay_paths() -> List[str]:
+    """The overlay catalog files named by `ISOPROMPT_CATALOGS`, in order."""
+    return [p for p in os.getenv(CATALOGS_ENV, "").split(os.pathsep) if p]
+
+
+class PackedCatalog(Generic[Spec]):
+    """
+    A catalog backed by a packed catalog file, with entries added on top.
+
+    Built-in entries are parsed on first lookup and kept; entries added by
+    overlays or `add` replace built-in entries of the same name.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        section: str,
+        from_dict: Callable[[Dict[str, Any]], Spec],
+        validate: Callable[[Dict[str, Any]], Spec],
+    ):
+        """
+        Initialize the catalog; nothing is read until the first lookup.
+
+        Args:
+            path: The packed catalog file of the built-in entries.
+            section: The list of overlay files holding this catalog's entries.
+            from_dict: Builds a trusted built-in entry.
+            validate: Validates and builds an entry of an overlay.
+        """
+        self.path = path
+        self.section = section
+        self._from_dict: Callable[[Dict[str, Any]], Spec] = from_dict
+        self._validate: Callable[[Dict[str, Any]], Spec] = validate
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Tuple[int, int]]] = None
+        self._key = ""
+        self._data: Optional[mmap.mmap] = None
+        self._body = 0  # Offset of the first entry, after the header
+        self._entries: Dict[str, Spec] = {}
+        self._added: Dict[str, Spec] = {}
+        self._values: Optional[List[Spec]] = None  # All entries, once parsed
+
+    def _load(self) -> Dict[str, Tuple[int, int]]:
+        """Read the index of the file and apply overlays, once."""
+        if self._index is not None:
+            return self._index
+        with self._lock:
+            if self._index is None:
+                with open(self.path, "rb") as f:
+                    header = f.readline()
+                    self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                meta = json.loads(header)
+                self._key = meta["key"]
+                self._body = len(header)
+                for path in overlay_paths():
+                    for definition in read_overlay(path).get(self.section, []):
+                        spec = self._validate(definition)
+                        self._added[spec[0]] = spec
+                self._index = {
+                    name: (offset, length)
+                    for name, (offset, length) in meta["index"].items()
+                }
+        return self._index
+
+    def get(self, name: str) -> Optional[Spec]:
+        """
+        Look up an entry by name.
+
+        Args:
+            name: The entry's name.
+
+        Returns:
+            The entry, or None if there is no such entry.
+
+        Raises:
+            ValueError: If the index of the catalog file is stale.
+        """
+        index = self._load()
+        spec = self._added.get(name) or self._entries.get(name)
+        if spec is not None or name not in index:
+            return spec
+        assert self._data is not None
+        offset, length = index[name]
+        start = self._body + offset
+        try:
+            entry = json.loads(self._data[start : start + length])
+        except ValueError:
+            entry = None
+        if not isinstance(entry, dict) or entry.get(self._key) != name:
+            raise ValueError(
+                f"The index of {self.path} is stale; rebuild it with repack_catalog."
+            )
+        built: Spec = self._from_dict(entry)
+        self._entries[name] = built
+        return built
+
+    def names(self) -> List[str]:
+        """The names of all entries: built-in ones first, in file order."""
+        index = self._load()
+        return list(index) + [name for name in self._added if name not in index]
+
+    def values(self) -> List[Spec]:
+        """All entries, in the order of `names`."""
+        if self._values is None:
+            specs = [self.get(name) for name in self.names()]
+            self._values = [spec for spec in specs if spec is not None]
+        return list(self._values)
+
+    def add(self, spec: Spec) -> None:
+        """Add an entry, or replace the entry of the same name."""
+        self._load()
+        self._added[spec[0]] = spec
+        self._values = None
+
+    def __contains__(self, name: object) -> bool:
+        """Whether there is an entry of this name."""
+        return name in self._load() or name in self._added
+
+
+def load_catalog_overlay(path: str) -> Tuple[List[ModeSpec], List[DomainSpec]]:
+    """
+    Merge an overlay catalog file on top of the modes and domains.
+
+    Overlays named by `ISOPROMPT_CATALOGS` are merged when the catalogs are
+    first used; this merges one more at any time.
+
+    Args:
+        path: A JSON file with optional "modes" and "domains" lists, each
+            entry with the fields of `IsoPromptMode` or `IsoPromptDomain`.
+
+    Returns:
+        The registered modes and domains.
+
+    Raises:
+        ValueError: If the file is not an overlay catalog.
+        pydantic.ValidationError: If an entry is invalid.
+    """
+    from .domains import register_domain
+    from .modes import register_mode
+
+    overlay = read_overlay(path)
+    modes = [register_mode(mode) for mode in overlay.get("modes", [])]
+    domains = [register_domain(domain) for domain in overlay.get("domains", [])]
+    return modes, domains
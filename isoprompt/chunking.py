@@ -0,0 +1,162 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Map-reduce optimization of inputs too long for one call.
+
+A long input is split on structural boundaries (Markdown headings, then
+paragraphs, lines, sentences and words) into chunks of balanced token counts.
+The chunks are optimized in parallel into sections of the final prompt, and
+a reduce call that only sees an outline of the sections writes its opening
+and closing. Every call stays within the context window, and since the
+chunks are about the same size and the reduce answer is short, the whole
+run takes about as long as optimizing one chunk plus a short call.
+"""
+
+import math
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .ado import count_tokens
+from .constants import SECTION_OUTLINE_CHARS
+from .templates import get_optimization_template
+
+# Boundaries to split on, coarsest first. Each keeps its separator.
+_BOUNDARIES = [
+    re.compile(r"(\n+)(?=#{1,6} )"),
+    re.compile(r"(\n[ \t]*\n\s*)"),
+    re.compile(r"(\n)"),
+    re.compile(r"(?<=[.!?])(\s+)"),
+    re.compile(r"(\s+)"),
+]
+
+SECTIONS_MARKER = "---SECTIONS---"
+
+REDUCE_INSTRUCTIONS = f"""The sections outlined above were optimized separately, in this order, from the parts of one long request. They will be placed in the final prompt as they are. Write only:
+1. The opening of the final prompt: the role, the objective and how the sections fit together.
+2. The closing of the final prompt: the expected output format and final checks.
+
+Do not repeat the sections. Answer with the opening, then a line with only {SECTIONS_MARKER}, then the closing."""
+
+
+def _split_piece(
+    text: str, max_tokens: int, model: Optional[str], level: int = 0
+) -> Iterator[Tuple[str, int]]:
+    """Split text at the coarsest boundaries that bring each piece in budget."""
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        yield text, tokens
+        return
+    if level == len(_BOUNDARIES):
+        # No boundary left, so cut evenly by characters.
+        size = math.ceil(len(text) / math.ceil(tokens / max_tokens))
+        for start in range(0, len(text), size):
+            piece = text[start : start + size]
+            yield piece, count_tokens(piece, model)
+        return
+    parts = _BOUNDARIES[level].split(text)
+    for i in range(0, len(parts), 2):
+        piece = parts[i] + (parts[i + 1] if i + 1 < len(parts) else "")
+        if piece:
+            yield from _split_piece(piece, max_tokens, model, level + 1)
+
+
+def split_input(text: str, max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """
+    Split a long input into chunks of at most `max_tokens` tokens.
+
+    The number of chunks is the smallest that respects `max_tokens`, and the
+    chunks are balanced to about the same size, so no chunk is a straggler
+    when they are optimized in parallel.
+
+    Args:
+        text: The input.
+        max_tokens: The maximum tokens of a chunk.
+        model: The model whose tokenizer counts tokens.
+
+    Returns:
+        The chunks, in order; one chunk if the input fits.
+    """
+    if max_tokens < 1:
+        raise ValueError("max_tokens must be at least 1.")
+    pieces = list(_split_piece(text, max_tokens, model))
+    remaining = sum(tokens for _, tokens in pieces)
+    count = max(math.ceil(remaining / max_tokens), 1)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece, tokens in pieces:
+        if current:
+            # Aim each chunk at an even share of the tokens left, and end it
+            # where its size is closest to that share.
+            target = remaining / max(count - len(chunks), 1)
+            balanced = (
+                len(chunks) + 1 < count and size + tokens - target > target - size
+            )
+            if balanced or size + tokens > max_tokens:
+                chunks.append("".join(current))
+                remaining -= size
+                current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append("".join(current))
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def frame_chunk(chunk: str, index: int, count: int) -> str:
+    """Frame a chunk so it is optimized into one section of the final prompt."""
+    return (
+        f"This is part {index} of {count} of a long request that is optimized "
+        "in parts. Optimize only this part into one section of the final "
+        "prompt and keep all of its details. Do not add a role, an "
+        "introduction or an output format; they are written once for the "
+        f"whole prompt.\n\n{chunk}"
+    )
+
+
+def outline_section(section: str) -> str:
+    """The beginning of a section, cut at a word boundary."""
+    section = section.strip()
+    if len(section) <= SECTION_OUTLINE_CHARS:
+        return section
+    return section[:SECTION_OUTLINE_CHARS].rsplit(None, 1)[0] + " ..."
+
+
+def build_reduce_messages(
+    sections: List[str], mode: str, domain: Optional[str]
+) -> List[Dict[str, str]]:
+    """
+    Build the messages of the reduce call.
+
+    Args:
+        sections: The optimized sections, in order.
+        mode: The optimization mode.
+        domain: The optional domain specialization.
+
+    Returns:
+        The chat messages.
+    """
+    outline = "\n\n".join(
+        f"Section {i}:\n{outline_section(section)}"
+        for i, section in enumerate(sections, 1)
+    )
+    return [
+        {"role": "system", "content": get_optimization_template(mode, domain)},
+        {"role": "user", "content": f"{outline}\n\n{REDUCE_INSTRUCTIONS}"},
+    ]
+
+
+def assemble_sections(reduced: str, sections: List[str]) -> str:
+    """
+    Put the sections between the opening and closing of the reduce answer.
+
+    Args:
+        reduced: The reduce answer; without the marker it is all opening.
+        sections: The optimized sections, in order.
+
+    Returns:
+        The final prompt.
+    """
+    opening, _, closing = reduced.partition(SECTIONS_MARKER)
+    parts = [opening.strip()] + [s.strip() for s in sections] + [closing.strip()]
+    return "\n\n".join(part for part in parts if part)
@@ -4,112 +4,903 @@ Command-line interface for IsoPrompt, prompt optimization a command away.
 """
 
 import argparse
+import contextlib
+import json
 import os
+import sqlite3
 import sys
 import time
 import traceback
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional
 
 from dotenv import load_dotenv
 
-from .constants import DEFAULT_LLM_MODEL, DEFAULT_TEMPERATURE
+from .backends import (
+    configure_backends,
+    get_backend_registry,
+    load_backends_config,
+)
+from .constants import (
+    AUTO,
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_BATCH_POLL_INTERVAL,
+    DEFAULT_BUILD_MANIFEST,
+    DEFAULT_CHUNK_TOKENS,
+    DEFAULT_HEDGE_BUDGET,
+    DEFAULT_HEDGE_PERCENTILE,
+    DEFAULT_LLM_MODEL,
+    DEFAULT_MAX_PATCH_RATIO,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_REFINE_PASSES,
+    DEFAULT_REFINE_THRESHOLD,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_SEMANTIC_THRESHOLD,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    DEFAULT_SERVER_QUEUE_SIZE,
+    DEFAULT_SERVER_WORKERS,
+    DEFAULT_SHUTDOWN_TIMEOUT,
+    DEFAULT_TEMPERATURE,
+    DEFAULT_WATCH_DEBOUNCE,
+    DEFAULT_WATCH_POLL_INTERVAL,
+    HEURISTIC_BACKEND,
+    RESULT_FORMATS,
+    WATCH_EXTENSIONS,
+)
 from .domains import get_default_domain
+from .models import (
+    BatchItemResult,
+    BatchRecord,
+    NormalizationOptions,
+    RefinementOptions,
+)
 from .modes import get_default_mode
 from .optimizer import (
     get_available_domain_names,
     get_available_mode_names,
+    optimize_chunked,
     optimize_prompt,
+    reoptimize_prompt,
     validate_config,
 )
+from .refine import refine_prompt
+from .variants import VARIANT_SELECTIONS, optimize_variants
+
+
+def parse_name_list(value: str) -> List[str]:
+    """Parse a comma-separated list of mode or domain names."""
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def parse_ado_options(value: str) -> Dict[str, Any]:
+    """Parse the JSON object of `--ado-options`."""
+    try:
+        options = json.loads(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid JSON: {e}")
+    if not isinstance(options, dict):
+        raise argparse.ArgumentTypeError("expected a JSON object")
+    return options
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options selecting and configuring backends."""
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default=None,
+        help="Backend to use (default: routed by the backends configuration).",
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        metavar="PATH",
+        help="JSON file configuring backends and routing rules (default: $ISOPROMPT_BACKENDS).",
+    )
+
+
+def apply_backend_arguments(args: argparse.Namespace) -> Optional[str]:
+    """
+    Load the backends configuration, if any, and pick the requested backend.
+
+    Returns:
+        The backend name, or None to route each request.
+    """
+    registry = (
+        configure_backends(load_backends_config(args.backends))
+        if args.backends
+        else get_backend_registry()
+    )
+    backend: Optional[str] = getattr(args, "backend", None)
+    if getattr(args, "offline", False):
+        backend = HEURISTIC_BACKEND
+    if backend is not None:
+        registry.get(backend)  # Reject unknown names up front.
+    return backend
 
 
 def create_parser() -> argparse.ArgumentParser:
     """Create the argument parser."""
     parser = argparse.ArgumentParser(
-        prog="isoprompt",
-        description="AI-powered prompt optimization tool.",
+        prog="isoprompt",
+        description="AI-powered prompt optimization tool.",
+        epilog="""
+Examples:
+  isoprompt --prompt "write a blog post about AI"
+  
+  # With domain specialization
+  isoprompt --prompt "optimize our supply chain" --domain supply_chain
+  
+  # With mode selection
+  isoprompt --prompt "marketing campaign ideas" --mode creative --refine
+  
+  # Compare modes side by side
+  isoprompt --prompt "explain recursion" --modes simple,analytical,chain_of_thought
+
+  # File I/O
+  isoprompt --input basic_prompt.txt --output optimized_prompt.txt
+
+  # Long documents: optimize chunks in parallel and merge them
+  isoprompt --input long_spec.md --chunked --chunk-tokens 3000
+
+  # Embed a data file compactly (the cheapest of CSV, compact JSON and key: value lines)
+  isoprompt --prompt "Analyze these records for risks." --data records.json --ado
+
+  # Re-optimize an edited prompt by patching its previous optimized prompt
+  isoprompt --input prompt.txt --previous-input prompt.old.txt --previous-output optimized.txt
+
+  # Shell pipelines: one prompt per line in, one JSON result per line out
+  cat prompts.txt | isoprompt --stdin --jsonl --concurrency 16 > results.jsonl
+
+  # Batch jobs (see `isoprompt batch --help`)
+  isoprompt batch --input prompts.jsonl --output results.jsonl
+  isoprompt merge --output results.jsonl results.shard-*.jsonl
+
+  # Keep a directory of optimized prompts up to date (see `isoprompt watch --help`)
+  isoprompt watch prompts/ --out optimized/
+
+  # Rebuild only the stale outputs of a manifest (see `isoprompt build --help`)
+  isoprompt build isoprompt.build.json
+
+  # HTTP server (see `isoprompt serve --help`)
+  isoprompt serve --port 8080
+
+  # Latency, throughput, tokens and errors of past runs
+  isoprompt stats --since 24h
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+
+    # Input options: You can either provide a prompt, an input file or a stream.
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
+        "--prompt", "-p", type=str, help="Basic prompt to optimize."
+    )
+    input_group.add_argument(
+        "--input", "-i", type=str, help="File containing basic prompt."
+    )
+    input_group.add_argument(
+        "--stdin",
+        action="store_true",
+        help="Optimize each prompt read from standard input and write one result per prompt to standard output; diagnostics go to standard error.",
+    )
+
+    # Streaming options, for --stdin.
+    parser.add_argument(
+        "--null",
+        "-0",
+        action="store_true",
+        help="With --stdin, prompts and plain results are separated by NUL characters instead of newlines.",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help='With --stdin, write one JSON object per line: {"id": <prompt number>, "optimized_prompt": ...} or {"id": ..., "error": ...}.',
+    )
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help=f"With --stdin, prompts in flight at once; with --chunked, chunks optimized at once (default: {DEFAULT_BATCH_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="With --stdin, write results as they finish instead of in input order.",
+    )
+
+    # Output file can be passed regardless of input type.
+    parser.add_argument(
+        "--output",
+        "-o",
+        type=str,
+        help="Save optimized prompt to file. If not provided, the optimized prompt will be printed to the console.",
+    )
+
+    # Optimization options: You can choose a mode and domain.
+    mode_choices = get_available_mode_names() + [AUTO]
+    parser.add_argument(
+        "--mode",
+        "-m",
+        type=str,
+        choices=mode_choices,
+        default=get_default_mode().mode,
+        help=f"Optimization mode, or 'auto' to pick one from the prompt (default: {get_default_mode().mode}).",
+    )
+
+    parser.add_argument(
+        "--domain",
+        "-d",
+        type=str,
+        choices=get_available_domain_names() + [AUTO],
+        help=f"Domain specialization, or 'auto' to pick one from the prompt (default: {get_default_domain().domain}).",
+    )
+
+    # Fan-out options: optimize under several modes and domains at once.
+    parser.add_argument(
+        "--modes",
+        type=parse_name_list,
+        help="Comma-separated modes to optimize under concurrently, e.g. simple,analytical.",
+    )
+    parser.add_argument(
+        "--domains",
+        type=parse_name_list,
+        help="Comma-separated domains to optimize under concurrently.",
+    )
+    parser.add_argument(
+        "--select",
+        type=str,
+        choices=VARIANT_SELECTIONS,
+        help="With --modes/--domains, output only the shortest or best-scoring variant.",
+    )
+
+    # Chunking options: map-reduce inputs too long for one call.
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        help="Split a long input on structural boundaries, optimize the chunks in parallel and merge them into one prompt.",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=DEFAULT_CHUNK_TOKENS,
+        help=f"With --chunked, the maximum input tokens of a chunk (default: {DEFAULT_CHUNK_TOKENS}).",
+    )
+
+    # Data options: embed data after the optimized prompt.
+    parser.add_argument(
+        "--data",
+        type=str,
+        help="File with data (JSON, JSONL, CSV or text) to embed after the optimized prompt; the optimizer only sees a summary of it.",
+    )
+    parser.add_argument(
+        "--ado",
+        "--auto-data-opt",
+        action="store_true",
+        help="With --data, prune empty fields and encode the data as CSV, compact JSON or key: value lines, whichever takes the fewest tokens.",
+    )
+    parser.add_argument(
+        "--ado-options",
+        type=parse_ado_options,
+        default=None,
+        help='With --ado, options as JSON, e.g. \'{"content": true, "format": "csv"}\'.',
+    )
+
+    # Incremental options: patch the optimized prompt of a previous version.
+    parser.add_argument(
+        "--previous-input",
+        type=str,
+        help="File with the previous version of the prompt; with --previous-output, only the changed parts are re-optimized.",
+    )
+    parser.add_argument(
+        "--previous-output",
+        type=str,
+        help="File with the optimized prompt of the previous version.",
+    )
+    parser.add_argument(
+        "--max-change",
+        type=float,
+        default=DEFAULT_MAX_PATCH_RATIO,
+        help=f"With --previous-input, share of changed text above which the prompt is optimized from scratch (default: {DEFAULT_MAX_PATCH_RATIO}).",
+    )
+
+    # Refinement options
+    parser.add_argument(
+        "--refine",
+        "-r",
+        action="store_true",
+        help="Apply additional refinement to the optimized prompt.",
+    )
+    parser.add_argument(
+        "--refine-passes",
+        type=int,
+        default=DEFAULT_REFINE_PASSES,
+        help=f"Maximum optimization passes with --refine (default: {DEFAULT_REFINE_PASSES}).",
+    )
+    parser.add_argument(
+        "--refine-threshold",
+        type=float,
+        default=DEFAULT_REFINE_THRESHOLD,
+        help=f"Stop refining once consecutive passes are this similar (default: {DEFAULT_REFINE_THRESHOLD}).",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="Stop refining before a pass would exceed this many tokens in total.",
+    )
+
+    # Model options
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=DEFAULT_LLM_MODEL,
+        help=f"OpenAI model for optimization, or auto to pick one per request (default: {DEFAULT_LLM_MODEL}).",
+    )
+
+    parser.add_argument(
+        "--temperature",
+        "-t",
+        type=float,
+        default=DEFAULT_TEMPERATURE,
+        help=f"Temperature for optimization, must be between 0.0 and 2.0 (default: {DEFAULT_TEMPERATURE}).",
+    )
+
+    parser.add_argument(
+        "--ensemble",
+        type=int,
+        default=None,
+        help="Generate this many candidates and keep the consensus (default: 3 for redundancy_verification, 1 otherwise).",
+    )
+
+    # Reliability options
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Time budget in seconds for the whole optimization, including retries.",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=f"Retries for timeouts, rate limits and server errors (default: {DEFAULT_MAX_RETRIES}).",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Optimize locally and deterministically, without calling the API.",
+    )
+    parser.add_argument(
+        "--offline-fallback",
+        action="store_true",
+        help="Use the offline optimizer when the API times out or is unavailable.",
+    )
+    add_backend_arguments(parser)
+
+    # Utility options
+    parser.add_argument("--version", action="version", version="isoprompt v1.0.0")
+
+    parser.add_argument(
+        "--verbose", "-v", action="store_true", help="Show detailed output."
+    )
+
+    return parser
+
+
+def create_serve_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the `serve` command."""
+    parser = argparse.ArgumentParser(
+        prog="isoprompt serve",
+        description="Serve IsoPrompt over HTTP.",
+        epilog="""
+Endpoints:
+  GET  /health, /modes, /domains
+  POST /optimize, /optimize/batch, /optimize/stream (server-sent events)
+
+Examples:
+  isoprompt serve --port 8080 --workers 128
+  curl -X POST localhost:8080/optimize -d '{"prompt": "write a blog post"}'
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=DEFAULT_SERVER_HOST,
+        help=f"Interface to bind to (default: {DEFAULT_SERVER_HOST}).",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_SERVER_PORT,
+        help=f"Port to listen on (default: {DEFAULT_SERVER_PORT}).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_SERVER_WORKERS,
+        help=f"Maximum concurrent upstream calls (default: {DEFAULT_SERVER_WORKERS}).",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_SERVER_QUEUE_SIZE,
+        help=f"Pending requests accepted before returning 503 (default: {DEFAULT_SERVER_QUEUE_SIZE}).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_REQUEST_TIMEOUT,
+        help=f"Maximum seconds per request (default: {DEFAULT_REQUEST_TIMEOUT}).",
+    )
+    parser.add_argument(
+        "--shutdown-timeout",
+        type=float,
+        default=DEFAULT_SHUTDOWN_TIMEOUT,
+        help=f"Seconds to drain in-flight requests on shutdown (default: {DEFAULT_SHUTDOWN_TIMEOUT}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the shared result cache.",
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        metavar="PATH",
+        help="JSON file configuring backends and routing rules (default: $ISOPROMPT_BACKENDS).",
+    )
+    parser.add_argument(
+        "--semantic-cache",
+        type=str,
+        metavar="PATH",
+        help="Serve near-duplicate prompts from a semantic cache persisted at PATH (requires numpy).",
+    )
+    parser.add_argument(
+        "--semantic-threshold",
+        type=float,
+        default=DEFAULT_SEMANTIC_THRESHOLD,
+        help=f"Minimum similarity for a semantic cache hit (default: {DEFAULT_SEMANTIC_THRESHOLD}).",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a duplicate upstream request when a call is slower than usual.",
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=DEFAULT_HEDGE_PERCENTILE,
+        help=f"Latency percentile after which a call is hedged (default: {DEFAULT_HEDGE_PERCENTILE}).",
+    )
+    parser.add_argument(
+        "--hedge-budget",
+        type=float,
+        default=DEFAULT_HEDGE_BUDGET,
+        help=f"Maximum share of calls that may be hedged (default: {DEFAULT_HEDGE_BUDGET}).",
+    )
+    return parser
+
+
+DURATION_UNITS = {"s": 1.0, "m": 60.0, "h": 3600.0, "d": 86400.0}
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration such as `90s`, `30m`, `24h` or `7d` into seconds."""
+    value = value.strip().lower()
+    unit = DURATION_UNITS.get(value[-1:])
+    try:
+        return float(value[:-1]) * unit if unit else float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration: '{value}'")
+
+
+def create_stats_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the `stats` command."""
+    parser = argparse.ArgumentParser(
+        prog="isoprompt stats",
+        description="Summarize past optimization runs from the run journal.",
+        epilog="""
+Every optimization is journaled to ~/.isoprompt/journal.sqlite3, or to the
+file named by $ISOPROMPT_JOURNAL (set it empty to disable journaling).
+
+Examples:
+  isoprompt stats
+  isoprompt stats --since 24h --by model
+  isoprompt stats --since 7d --by mode,domain --json
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--since",
+        type=parse_duration,
+        default=None,
+        help="Only runs from this long ago, e.g. 30m, 24h or 7d (default: all).",
+    )
+    parser.add_argument(
+        "--by",
+        type=parse_name_list,
+        default=["model", "mode", "domain"],
+        help="Comma-separated columns to group by: model, mode, domain, backend (default: model,mode,domain).",
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        metavar="PATH",
+        help="Run journal to read (default: $ISOPROMPT_JOURNAL or ~/.isoprompt/journal.sqlite3).",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the statistics as JSON lines."
+    )
+    return parser
+
+
+def create_batch_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the `batch` command."""
+    parser = argparse.ArgumentParser(
+        prog="isoprompt batch",
+        description="Optimize a file of prompts.",
+        epilog="""
+Input is either a .jsonl file with one {"id": ..., "prompt": ...} object per
+line (optionally with mode, domain, model and temperature), or a text file
+with one prompt per line.
+
+Examples:
+  isoprompt batch --input prompts.txt --output results.jsonl
+  isoprompt batch --input corpus.jsonl --output results.jsonl --concurrency 16
+  isoprompt batch --input corpus.jsonl --output results.jsonl --batch-api
+
+  # Store prompts, results, token usage and latency for analysis
+  isoprompt batch --input corpus.jsonl --output results.sqlite
+  isoprompt batch --input corpus.jsonl --output results.parquet
+
+  # Split one corpus across machines, then combine the shards
+  isoprompt batch --input corpus.jsonl --output results.shard-0.jsonl --shard 0/2
+  isoprompt batch --input corpus.jsonl --output results.shard-1.jsonl --shard 1/2
+  isoprompt merge --input corpus.jsonl --output results.jsonl results.shard-*.jsonl
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--input", "-i", type=str, required=True, help="Batch input file."
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        type=str,
+        required=True,
+        help="File for results: JSONL, or a SQLite (.sqlite, .db) or Parquet (.parquet) table that also records prompts, token usage and latency.",
+    )
+    parser.add_argument(
+        "--output-format",
+        type=str,
+        choices=RESULT_FORMATS,
+        help="Format of --output (default: from its extension, else jsonl). Parquet requires pyarrow.",
+    )
+    parser.add_argument(
+        "--mode",
+        "-m",
+        type=str,
+        choices=get_available_mode_names() + [AUTO],
+        default=get_default_mode().mode,
+        help=f"Default optimization mode, or 'auto' to route each prompt (default: {get_default_mode().mode}).",
+    )
+    parser.add_argument(
+        "--domain",
+        "-d",
+        type=str,
+        choices=get_available_domain_names() + [AUTO],
+        help="Default domain specialization, or 'auto' to route each prompt.",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=DEFAULT_LLM_MODEL,
+        help=f"Default OpenAI model, or auto to pick one per record (default: {DEFAULT_LLM_MODEL}).",
+    )
+    parser.add_argument(
+        "--temperature",
+        "-t",
+        type=float,
+        default=DEFAULT_TEMPERATURE,
+        help=f"Default temperature (default: {DEFAULT_TEMPERATURE}).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help=f"Concurrent upstream calls (default: {DEFAULT_BATCH_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Time budget in seconds for the whole batch.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Optimize locally and deterministically, without calling the API.",
+    )
+    parser.add_argument(
+        "--offline-fallback",
+        action="store_true",
+        help="Use the offline optimizer when the API times out or is unavailable.",
+    )
+    add_backend_arguments(parser)
+    parser.add_argument(
+        "--refine",
+        "-r",
+        action="store_true",
+        help="Refine every optimized prompt with additional passes.",
+    )
+    parser.add_argument(
+        "--refine-passes",
+        type=int,
+        default=DEFAULT_REFINE_PASSES,
+        help=f"Maximum optimization passes with --refine (default: {DEFAULT_REFINE_PASSES}).",
+    )
+    parser.add_argument(
+        "--refine-threshold",
+        type=float,
+        default=DEFAULT_REFINE_THRESHOLD,
+        help=f"Stop refining once consecutive passes are this similar (default: {DEFAULT_REFINE_THRESHOLD}).",
+    )
+
+    # Sharding and resumption options
+    parser.add_argument(
+        "--shard",
+        type=str,
+        metavar="I/N",
+        help="Only run shard I of N (0 <= I < N), chosen by a stable hash of the record IDs.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        metavar="PATH",
+        help="Journal of completed records; reruns skip them (default with --shard: OUTPUT.checkpoint.jsonl).",
+    )
+
+    # Batch API options
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Submit the batch through the OpenAI Batch API and wait for it; rerun to resume.",
+    )
+    parser.add_argument(
+        "--batch-state",
+        type=str,
+        help="Resumable state file for --batch-api (default: OUTPUT.state.json).",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_BATCH_POLL_INTERVAL,
+        help=f"Seconds before the first status poll with --batch-api (default: {DEFAULT_BATCH_POLL_INTERVAL}).",
+    )
+
+    # Deduplication options
+    parser.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help="Send every record upstream, even exact duplicates.",
+    )
+    parser.add_argument(
+        "--keep-case",
+        action="store_true",
+        help="Treat prompts that differ only in casing as distinct.",
+    )
+    parser.add_argument(
+        "--keep-whitespace",
+        action="store_true",
+        help="Treat prompts that differ only in whitespace as distinct.",
+    )
+    parser.add_argument(
+        "--keep-punctuation",
+        action="store_true",
+        help="Treat prompts that differ only in trailing punctuation as distinct.",
+    )
+    parser.add_argument(
+        "--verbose", "-v", action="store_true", help="Show detailed output."
+    )
+    return parser
+
+
+def create_watch_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the `watch` command."""
+    parser = argparse.ArgumentParser(
+        prog="isoprompt watch",
+        description="Re-optimize prompt files whenever they change.",
+        epilog=f"""
+Every {", ".join(WATCH_EXTENSIONS)} file under SOURCE is optimized to the same
+relative path under --out, first for files changed since the last run, then
+again on every save. File-system notifications are used when watchdog is
+installed (pip install 'isoprompt[watch]'); otherwise files are polled.
+
+Examples:
+  isoprompt watch prompts/ --out optimized/
+  isoprompt watch prompts/ --out optimized/ --mode analytical --once
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("source", help="Directory of prompt files.")
+    parser.add_argument(
+        "--out", "-o", type=str, required=True, help="Directory for optimized prompts."
+    )
+    parser.add_argument(
+        "--mode",
+        "-m",
+        type=str,
+        choices=get_available_mode_names() + [AUTO],
+        default=get_default_mode().mode,
+        help=f"Optimization mode, or 'auto' to pick one per file (default: {get_default_mode().mode}).",
+    )
+    parser.add_argument(
+        "--domain",
+        "-d",
+        type=str,
+        choices=get_available_domain_names() + [AUTO],
+        help="Domain specialization, or 'auto' to pick one per file.",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=DEFAULT_LLM_MODEL,
+        help=f"OpenAI model, or auto to pick one per file (default: {DEFAULT_LLM_MODEL}).",
+    )
+    parser.add_argument(
+        "--temperature",
+        "-t",
+        type=float,
+        default=DEFAULT_TEMPERATURE,
+        help=f"Temperature (default: {DEFAULT_TEMPERATURE}).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help=f"Files optimized at once (default: {DEFAULT_BATCH_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Time budget in seconds for each file.",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_WATCH_DEBOUNCE,
+        help=f"Seconds without edits before a file is optimized (default: {DEFAULT_WATCH_DEBOUNCE}).",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Poll for changes even if file-system notifications are available.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_WATCH_POLL_INTERVAL,
+        help=f"Seconds between scans when polling (default: {DEFAULT_WATCH_POLL_INTERVAL}).",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Optimize the files changed since the last run, then exit.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Optimize locally and deterministically, without calling the API.",
+    )
+    parser.add_argument(
+        "--offline-fallback",
+        action="store_true",
+        help="Use the offline optimizer when the API times out or is unavailable.",
+    )
+    add_backend_arguments(parser)
+    return parser
+
+
+def create_build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the `build` command."""
+    parser = argparse.ArgumentParser(
+        prog="isoprompt build",
+        description="Re-optimize the outputs of a manifest whose inputs changed.",
         epilog="""
+The manifest is a JSON file with paths relative to it:
+
+  {
+    "defaults": {"mode": "analytical", "guidelines": ["style.md"]},
+    "entries": [
+      {"source": "src/support.txt", "output": "out/support.md", "domain": "ai"},
+      {"source": "src/faq.txt", "output": "out/faq.md", "guidelines": []}
+    ]
+  }
+
+An output is rebuilt when its source, rendered template, parameters or one of
+its guideline files changed since it was last built.
+
 Examples:
-  isoprompt --prompt "write a blog post about AI"
-  
-  # With domain specialization
-  isoprompt --prompt "optimize our supply chain" --domain supply_chain
-  
-  # With mode selection
-  isoprompt --prompt "marketing campaign ideas" --mode creative --refine
-  
-  # File I/O
-  isoprompt --input basic_prompt.txt --output optimized_prompt.txt
+  isoprompt build
+  isoprompt build prompts/isoprompt.build.json --dry-run
+  isoprompt build --force --concurrency 16
         """,
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
-
-    # Input options: You can either provide a prompt or an input file.
-    input_group = parser.add_mutually_exclusive_group(required=True)
-    input_group.add_argument(
-        "--prompt", "-p", type=str, help="Basic prompt to optimize."
-    )
-    input_group.add_argument(
-        "--input", "-i", type=str, help="File containing basic prompt."
+    parser.add_argument(
+        "manifest",
+        nargs="?",
+        default=DEFAULT_BUILD_MANIFEST,
+        help=f"Build manifest (default: {DEFAULT_BUILD_MANIFEST}).",
     )
-
-    # Output file can be passed regardless of input type.
     parser.add_argument(
-        "--output",
-        "-o",
+        "--state",
         type=str,
-        help="Save optimized prompt to file. If not provided, the optimized prompt will be printed to the console.",
+        metavar="PATH",
+        help="File keeping the fingerprints (default: .isoprompt-build.json next to the manifest).",
     )
-
-    # Optimization options: You can choose a mode and domain.
-    mode_choices = get_available_mode_names()
     parser.add_argument(
-        "--mode",
-        "-m",
-        type=str,
-        choices=mode_choices,
-        default=get_default_mode().mode,
-        help=f"Optimization mode (default: {get_default_mode().mode}).",
+        "--dry-run",
+        "-n",
+        action="store_true",
+        help="List the stale outputs and why, without rebuilding them.",
     )
-
+    parser.add_argument("--force", action="store_true", help="Rebuild every output.")
     parser.add_argument(
-        "--domain",
-        "-d",
-        type=str,
-        choices=get_available_domain_names(),
-        help=f"Domain specialization (default: {get_default_domain().domain}).",
+        "--concurrency",
+        "-c",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help=f"Outputs built at once (default: {DEFAULT_BATCH_CONCURRENCY}).",
     )
-
-    # Refinement options
     parser.add_argument(
-        "--refine",
-        "-r",
-        action="store_true",
-        help="Apply additional refinement to the optimized prompt.",
+        "--timeout",
+        type=float,
+        default=None,
+        help="Time budget in seconds for the whole build.",
     )
-
-    # Model options
     parser.add_argument(
-        "--model",
-        type=str,
-        default=DEFAULT_LLM_MODEL,
-        help=f"OpenAI model for optimization (default: {DEFAULT_LLM_MODEL}).",
+        "--offline",
+        action="store_true",
+        help="Optimize locally and deterministically, without calling the API.",
     )
-
     parser.add_argument(
-        "--temperature",
-        "-t",
-        type=float,
-        default=DEFAULT_TEMPERATURE,
-        help=f"Temperature for optimization, must be between 0.0 and 2.0 (default: {DEFAULT_TEMPERATURE}).",
+        "--offline-fallback",
+        action="store_true",
+        help="Use the offline optimizer when the API times out or is unavailable.",
     )
+    add_backend_arguments(parser)
+    return parser
 
-    # Utility options
-    parser.add_argument("--version", action="version", version="isoprompt v1.0.0")
 
+def create_merge_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the `merge` command."""
+    parser = argparse.ArgumentParser(
+        prog="isoprompt merge",
+        description="Combine the outputs of sharded batch runs.",
+        epilog="""
+Examples:
+  isoprompt merge --output results.jsonl results.shard-0.jsonl results.shard-1.jsonl
+  isoprompt merge --input corpus.jsonl --output results.jsonl results.shard-*.jsonl
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("shards", nargs="+", help="Shard output files.")
     parser.add_argument(
-        "--verbose", "-v", action="store_true", help="Show detailed output."
+        "--output", "-o", type=str, required=True, help="JSONL file for results."
+    )
+    parser.add_argument(
+        "--input",
+        "-i",
+        type=str,
+        help="The batch input file, to write results in input order and report missing records.",
     )
-
     return parser
 
 
@@ -162,6 +953,190 @@ def generate_input_preview(user_input: str) -> str:
     return f"INPUT: [{user_input[:100]}...]."
 
 
+def variant_output_path(file_path: str, mode: str, domain: Optional[str]) -> str:
+    """
+    Derive the output path of one variant, e.g. `out.analytical.finance.txt`.
+    """
+    stem, extension = os.path.splitext(file_path)
+    suffix = f".{mode}" + (f".{domain}" if domain else "")
+    return f"{stem}{suffix}{extension}"
+
+
+def run_variants(
+    args: argparse.Namespace,
+    user_input: str,
+    start_time: float,
+    backend: Optional[str],
+) -> None:
+    """Optimize the input under every requested mode and domain, then exit."""
+    modes = args.modes or [args.mode]
+    domains = args.domains or [args.domain]
+    try:
+        for mode in modes:
+            for domain in domains:
+                validate_config(
+                    {
+                        "mode": mode,
+                        "domain": domain,
+                        "temperature": args.temperature,
+                        "model": args.model,
+                    }
+                )
+    except ValueError as e:
+        print(f"Configuration error: {e}.")
+        sys.exit(1)
+
+    result = optimize_variants(
+        user_input=user_input,
+        modes=modes,
+        domains=domains,
+        model=args.model,
+        temperature=args.temperature,
+        select=args.select,
+        verbose=args.verbose,
+        timeout=args.timeout,
+        max_retries=args.retries,
+        ensemble_size=args.ensemble,
+        backend=backend,
+        offline_fallback=args.offline_fallback,
+    )
+    duration = time.time() - start_time
+    succeeded = [v for v in result.variants if v.error is None]
+    print(
+        f"🎉 IsoPrompt Run Complete: {len(succeeded)}/{len(result.variants)} variants "
+        f"succeeded in {duration:.2f} seconds."
+    )
+
+    variants = [result.selected] if result.selected else result.variants
+    for variant in variants:
+        label = variant.mode + (f", domain: {variant.domain}" if variant.domain else "")
+        print(
+            f"🔧 Variant mode: {label} ({variant.latency_seconds:.2f} seconds, "
+            f"{variant.prompt_tokens + variant.completion_tokens} tokens, "
+            f"score: {variant.score if variant.score is not None else 'n/a'})."
+        )
+        if variant.optimized_prompt is None:
+            print(f"Error: {variant.error}", file=sys.stderr)
+        elif args.output:
+            path = args.output
+            if not args.select:
+                path = variant_output_path(args.output, variant.mode, variant.domain)
+            save_prompt_to_file(variant.optimized_prompt, path)
+        else:
+            print(format_output(variant.optimized_prompt))
+
+    sys.exit(0 if succeeded else 1)
+
+
+def read_delimited(stream: IO[bytes], delimiter: bytes) -> Iterator[str]:
+    """
+    Read delimited, non-blank prompts from a binary stream as they arrive.
+
+    Args:
+        stream: The stream to read, such as `sys.stdin.buffer`.
+        delimiter: The separator between prompts, e.g. `b"\\n"` or `b"\\0"`.
+
+    Yields:
+        The prompts, decoded as UTF-8.
+    """
+    # read1 returns whatever is available instead of waiting to fill up.
+    read = getattr(stream, "read1", stream.read)
+    buffer = b""
+    while True:
+        chunk = read(65536)
+        if not chunk:
+            break
+        buffer += chunk
+        *items, buffer = buffer.split(delimiter)
+        for item in items:
+            text = item.decode("utf-8").rstrip("\r")
+            if text.strip():
+                yield text
+    text = buffer.decode("utf-8").rstrip("\r")
+    if text.strip():
+        yield text
+
+
+def run_stdin(args: argparse.Namespace) -> None:
+    """Optimize the prompts streamed on stdin, then exit."""
+    from .batch import optimize_stream
+
+    output = sys.stdout
+    delimiter = "\0" if args.null else "\n"
+    failed = 0
+    # Only results are written to stdout; everything else goes to stderr.
+    with contextlib.redirect_stdout(sys.stderr):
+        load_dotenv(dotenv_path=".env")
+        try:
+            backend = apply_backend_arguments(args)
+            validate_config(
+                {
+                    "mode": args.mode,
+                    "domain": args.domain,
+                    "temperature": args.temperature,
+                    "model": args.model,
+                }
+            )
+            if args.modes or args.domains:
+                raise ValueError("--modes and --domains cannot be used with --stdin")
+            refinement = None
+            if args.refine:
+                refinement = RefinementOptions(
+                    passes=args.refine_passes,
+                    convergence_threshold=args.refine_threshold,
+                    token_budget=args.token_budget,
+                )
+            records = (
+                BatchRecord(
+                    id=str(number),
+                    prompt=prompt,
+                    mode=args.mode,
+                    domain=args.domain,
+                    model=args.model,
+                    temperature=args.temperature,
+                )
+                for number, prompt in enumerate(
+                    read_delimited(sys.stdin.buffer, delimiter.encode()), start=1
+                )
+            )
+            results = optimize_stream(
+                records,
+                max_in_flight=args.concurrency,
+                ordered=not args.unordered,
+                timeout=args.timeout,
+                refinement=refinement,
+                backend=backend,
+                offline_fallback=args.offline_fallback,
+                max_retries=args.retries,
+                ensemble_size=args.ensemble,
+            )
+        except (OSError, ValueError) as e:
+            print(f"Configuration error: {e}.")
+            sys.exit(1)
+
+        try:
+            for result in results:
+                if result.error is not None:
+                    failed += 1
+                    print(f"Error: prompt {result.id} failed: {result.error}")
+                if args.jsonl:
+                    output.write(result.model_dump_json(exclude_none=True) + "\n")
+                elif result.optimized_prompt is not None:
+                    output.write(result.optimized_prompt + delimiter)
+                output.flush()
+        except UnicodeDecodeError as e:
+            print(f"Error reading standard input: {e}.")
+            sys.exit(1)
+        except BrokenPipeError:
+            # The reader went away, e.g. `| head`; silence the exit flush.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), output.fileno())
+            sys.exit(1)
+        except KeyboardInterrupt:
+            sys.exit(130)
+
+    sys.exit(0 if failed == 0 else 1)
+
+
 def format_output(optimized: str) -> str:
     """
     Format the output prompt.
@@ -182,17 +1157,474 @@ def load_env() -> None:
         print("🔧 OPENAI_API_KEY=your_api_key")
 
 
+def serve_main(argv: List[str]) -> None:
+    """Entry point for the `serve` command."""
+    args = create_serve_parser().parse_args(argv)
+    load_dotenv(dotenv_path=".env")
+
+    # Import lazily so plain CLI runs don't pay for the server module.
+    from .server import run_server
+
+    try:
+        apply_backend_arguments(args)
+        semantic_cache = None
+        if args.semantic_cache:
+            from .semantic_cache import SemanticCache
+
+            semantic_cache = SemanticCache(
+                threshold=args.semantic_threshold, path=args.semantic_cache
+            )
+
+        hedge = None
+        if args.hedge:
+            from .hedging import HedgePolicy
+
+            hedge = HedgePolicy(
+                percentile=args.hedge_percentile, budget=args.hedge_budget
+            )
+
+        run_server(
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            queue_size=args.queue_size,
+            request_timeout=args.timeout,
+            shutdown_timeout=args.shutdown_timeout,
+            use_cache=not args.no_cache,
+            semantic_cache=semantic_cache,
+            hedge=hedge,
+        )
+    except (ImportError, OSError, ValueError) as e:
+        print(f"Error: IsoPrompt server failed: {e}.", file=sys.stderr)
+        sys.exit(1)
+
+
+def watch_main(argv: List[str]) -> None:
+    """Entry point for the `watch` command."""
+    args = create_watch_parser().parse_args(argv)
+    load_dotenv(dotenv_path=".env")
+
+    from .watch import PromptWatcher
+
+    if not os.path.isdir(args.source):
+        print(f"Error: Directory '{args.source}' not found", file=sys.stderr)
+        sys.exit(1)
+    try:
+        backend = apply_backend_arguments(args)
+        validate_config(
+            {
+                "mode": args.mode,
+                "domain": args.domain,
+                "temperature": args.temperature,
+                "model": args.model,
+            }
+        )
+    except (OSError, ValueError) as e:
+        print(f"Configuration error: {e}.", file=sys.stderr)
+        sys.exit(1)
+
+    watcher = PromptWatcher(
+        args.source,
+        args.out,
+        mode=args.mode,
+        domain=args.domain,
+        model=args.model,
+        temperature=args.temperature,
+        backend=backend,
+        offline_fallback=args.offline_fallback,
+        timeout=args.timeout,
+        debounce=args.debounce,
+        poll_interval=args.poll_interval,
+        max_concurrency=args.concurrency,
+        use_polling=args.poll,
+    )
+    try:
+        if args.once:
+            count = watcher.sync()
+            print(f"🎉 IsoPrompt Watch: {count} files optimized.")
+            return
+        how = "polling" if watcher.use_polling else "file-system notifications"
+        print(f"🔧 Watching {watcher.source_dir} ({how}). Press Ctrl+C to stop.")
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\n🔧 Stopped watching.")
+    finally:
+        watcher.stop()
+
+
+def build_main(argv: List[str]) -> None:
+    """Entry point for the `build` command."""
+    args = create_build_parser().parse_args(argv)
+    load_dotenv(dotenv_path=".env")
+
+    from .build import run_build
+
+    try:
+        backend = apply_backend_arguments(args)
+        report = run_build(
+            args.manifest,
+            state_path=args.state,
+            force=args.force,
+            dry_run=args.dry_run,
+            max_concurrency=args.concurrency,
+            timeout=args.timeout,
+            backend=backend,
+            offline_fallback=args.offline_fallback,
+        )
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found", file=sys.stderr)
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(f"Error reading build manifest: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for output, reason in report.stale.items():
+        print(f"🔧 {output}: {reason}")
+    for output, error in report.errors.items():
+        print(f"Error: {output}: {error}", file=sys.stderr)
+    if args.dry_run:
+        print(
+            f"🔧 {len(report.stale)} of {report.total} outputs are stale, "
+            f"{report.up_to_date} up to date."
+        )
+        return
+    print(
+        f"🎉 IsoPrompt Build Complete: {report.built} built, {report.up_to_date} up "
+        f"to date, {report.failed} failed in {report.duration_seconds:.2f} seconds."
+    )
+    sys.exit(0 if report.failed == 0 else 1)
+
+
+def batch_main(argv: List[str]) -> None:
+    """Entry point for the `batch` command."""
+    args = create_batch_parser().parse_args(argv)
+    load_dotenv(dotenv_path=".env")
+
+    try:
+        backend = apply_backend_arguments(args)
+        validate_config(
+            {
+                "mode": args.mode,
+                "domain": args.domain,
+                "temperature": args.temperature,
+                "model": args.model,
+            }
+        )
+    except (OSError, ValueError) as e:
+        print(f"Configuration error: {e}.", file=sys.stderr)
+        sys.exit(1)
+
+    from .batch import load_batch_records, optimize_batch, write_batch_results
+    from .sharding import ShardCheckpoint, parse_shard, select_shard
+
+    try:
+        records = load_batch_records(
+            args.input,
+            defaults={
+                "mode": args.mode,
+                "domain": args.domain,
+                "model": args.model,
+                "temperature": args.temperature,
+            },
+        )
+    except FileNotFoundError:
+        print(f"Error: File '{args.input}' not found", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error reading batch file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.shard:
+        try:
+            shard_index, shard_count = parse_shard(args.shard)
+        except ValueError as e:
+            print(f"Configuration error: {e}", file=sys.stderr)
+            sys.exit(1)
+        records = select_shard(records, shard_index, shard_count)
+        print(f"🔧 Shard {shard_index}/{shard_count}: {len(records)} records.")
+
+    normalization = None
+    if not args.no_dedupe:
+        normalization = NormalizationOptions(
+            collapse_whitespace=not args.keep_whitespace,
+            casefold=not args.keep_case,
+            strip_trailing_punctuation=not args.keep_punctuation,
+        )
+
+    if args.batch_api:
+        if (
+            backend == HEURISTIC_BACKEND
+            or args.refine
+            or args.offline_fallback
+            or args.checkpoint
+        ):
+            print(
+                "Configuration error: --batch-api cannot be used with --offline, "
+                "--offline-fallback, --refine or --checkpoint.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        _run_batch_api(args, records, normalization, backend)
+
+    refinement = None
+    if args.refine:
+        if backend == HEURISTIC_BACKEND:
+            print(
+                "Configuration error: --refine cannot be used with --offline.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        try:
+            refinement = RefinementOptions(
+                passes=args.refine_passes,
+                convergence_threshold=args.refine_threshold,
+            )
+        except ValueError as e:
+            print(f"Configuration error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    sink = _open_sink(args, records)
+    checkpoint_path = args.checkpoint or (
+        f"{args.output}.checkpoint.jsonl" if args.shard else None
+    )
+    checkpoint = ShardCheckpoint(checkpoint_path) if checkpoint_path else None
+    completed = checkpoint.completed if checkpoint is not None else {}
+    pending = [record for record in records if record.id not in completed]
+    if completed:
+        print(f"🔧 Resuming: {len(records) - len(pending)} records already completed.")
+
+    def on_result(result: BatchItemResult) -> None:
+        if checkpoint is not None:
+            checkpoint.record(result)
+        if sink is not None:
+            sink.write(result)
+
+    print(f"🔧 Starting IsoPrompt batch run for {len(pending)} records.")
+    try:
+        if sink is not None:
+            for record in records:
+                if record.id in completed:
+                    sink.write(completed[record.id], record)
+        result = optimize_batch(
+            pending,
+            max_concurrency=args.concurrency,
+            normalization=normalization,
+            verbose=args.verbose,
+            timeout=args.timeout,
+            refinement=refinement,
+            backend=backend,
+            offline_fallback=args.offline_fallback,
+            on_result=(
+                on_result if checkpoint is not None or sink is not None else None
+            ),
+        )
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if sink is not None:
+            sink.close()
+
+    report = result.report
+    if completed:
+        by_id = {r.id: r for r in result.results}
+        results = [by_id.get(r.id) or completed[r.id] for r in records]
+        report = report.model_copy(
+            update={
+                "total": len(records),
+                "succeeded": report.succeeded + len(records) - len(pending),
+            }
+        )
+    else:
+        results = result.results
+    if sink is None:
+        write_batch_results(args.output, results)
+
+    print(
+        f"🎉 IsoPrompt Batch Complete: {report.succeeded}/{report.total} records "
+        f"succeeded in {report.duration_seconds:.2f} seconds."
+    )
+    print(
+        f"🔧 Deduplication: {report.unique} unique prompts, {report.duplicates} "
+        f"duplicates collapsed ({report.saved_calls_ratio:.0%} of calls saved)."
+    )
+    print(f"✓ Results saved to: {os.path.abspath(args.output)}")
+    sys.exit(0 if report.failed == 0 else 1)
+
+
+def _open_sink(args: argparse.Namespace, records: List[BatchRecord]) -> Any:
+    """Open the sink of a SQLite or Parquet `--output`, or None for JSONL."""
+    from .sinks import open_result_sink, result_format
+
+    if result_format(args.output, args.output_format) == "jsonl":
+        return None
+    try:
+        return open_result_sink(args.output, args.output_format, records)
+    except (ImportError, OSError, sqlite3.Error) as e:
+        print(f"Configuration error: {e}.", file=sys.stderr)
+        sys.exit(1)
+
+
+def _run_batch_api(
+    args: argparse.Namespace,
+    records: List[BatchRecord],
+    normalization: Optional[NormalizationOptions],
+    backend: Optional[str],
+) -> None:
+    """Run a `batch --batch-api` job and exit."""
+    from .batch_api import run_batch_api_job
+    from .errors import IsoPromptError, OptimizationTimeoutError
+
+    sink = _open_sink(args, records)
+    print(f"🔧 Submitting {len(records)} records to the Batch API.")
+    try:
+        report = run_batch_api_job(
+            records,
+            args.output,
+            state_path=args.batch_state,
+            normalization=normalization,
+            backend=backend,
+            poll_interval=args.poll_interval,
+            timeout=args.timeout,
+            verbose=args.verbose,
+            sink=sink,
+        )
+    except OptimizationTimeoutError:
+        print(
+            "⏳ Batch API job still running; run the same command again to resume.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(
+            "\n⏸ Stopped waiting; run the same command again to resume.",
+            file=sys.stderr,
+        )
+        sys.exit(130)
+    except (IsoPromptError, ValueError) as e:
+        print(f"Batch API error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if sink is not None:
+            sink.close()
+
+    print(
+        f"🎉 IsoPrompt Batch Complete: {report.succeeded}/{report.total} records "
+        f"succeeded in {report.duration_seconds:.2f} seconds."
+    )
+    print(
+        f"🔧 Deduplication: {report.unique} unique prompts, {report.duplicates} "
+        f"duplicates collapsed ({report.saved_calls_ratio:.0%} of calls saved)."
+    )
+    print(f"✓ Results saved to: {os.path.abspath(args.output)}")
+    sys.exit(0 if report.failed == 0 else 1)
+
+
+def merge_main(argv: List[str]) -> None:
+    """Entry point for the `merge` command."""
+    args = create_merge_parser().parse_args(argv)
+
+    from .batch import load_batch_records
+    from .sharding import merge_batch_results
+
+    try:
+        records = load_batch_records(args.input) if args.input else None
+        results = merge_batch_results(args.shards, args.output, records)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error reading batch file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    succeeded = sum(1 for r in results if r.error is None)
+    print(
+        f"🎉 Merged {len(args.shards)} shards: {succeeded}/{len(results)} records "
+        "succeeded."
+    )
+    missing = 0
+    if records is not None:
+        missing = len({r.id for r in records} - {r.id for r in results})
+        if missing:
+            print(f"⚠️ {missing} input records have no result.", file=sys.stderr)
+    print(f"✓ Results saved to: {os.path.abspath(args.output)}")
+    sys.exit(0 if succeeded == len(results) and not missing else 1)
+
+
+def stats_main(argv: List[str]) -> None:
+    """Entry point for the `stats` command."""
+    args = create_stats_parser().parse_args(argv)
+
+    from .journal import RunJournal, get_journal_path
+
+    path = args.journal or get_journal_path()
+    if not path or not os.path.exists(os.path.expanduser(path)):
+        print("Error: No run journal found.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        journal = RunJournal(path, retention_days=None)
+        since = time.time() - args.since if args.since is not None else None
+        summaries = journal.summarize(since=since, group_by=args.by)
+        journal.close()
+    except ValueError as e:
+        print(f"Configuration error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except sqlite3.Error as e:
+        print(f"Error reading the run journal: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.json:
+        for summary in summaries:
+            print(summary.model_dump_json())
+        return
+    if not summaries:
+        print("🔧 No runs in this window.")
+        return
+
+    for summary in summaries:
+        label = ", ".join(f"{k}: {v or '-'}" for k, v in summary.group.items())
+        print(f"📊 {label}")
+        print(
+            f"   {summary.runs} runs ({summary.runs_per_minute:.2f}/min), "
+            f"{summary.error_rate:.1%} errors, {summary.cache_hits} cache hits"
+        )
+        print(
+            f"   latency p50 {summary.p50_seconds:.2f}s, p95 {summary.p95_seconds:.2f}s, "
+            f"p99 {summary.p99_seconds:.2f}s"
+        )
+        print(
+            f"   tokens {summary.prompt_tokens} prompt + "
+            f"{summary.completion_tokens} completion"
+        )
+
+
+SUBCOMMANDS: Dict[str, Callable[[List[str]], None]] = {
+    "batch": batch_main,
+    "build": build_main,
+    "merge": merge_main,
+    "serve": serve_main,
+    "stats": stats_main,
+    "watch": watch_main,
+}
+
+
 def main() -> None:
     """Main entry point for the CLI."""
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    parser = create_parser()
+    args = parser.parse_args()
+    if args.stdin:
+        run_stdin(args)
+
     try:
         print("🔧 Starting IsoPrompt run now.")
         start_time = time.time()
 
         load_env()
 
-        parser = create_parser()
-        args = parser.parse_args()
-
         # Get input prompt
         if args.prompt:
             user_input = args.prompt
@@ -214,15 +1646,56 @@ def main() -> None:
             "model": args.model,
         }
 
+        refinement = None
         try:
+            backend = apply_backend_arguments(args)
             validate_config(config)
-        except ValueError as e:
+            if args.refine and backend == HEURISTIC_BACKEND:
+                raise ValueError("--refine cannot be used with --offline")
+            if bool(args.previous_input) != bool(args.previous_output):
+                raise ValueError(
+                    "--previous-input and --previous-output must be used together"
+                )
+            if args.previous_input and (args.refine or args.modes or args.domains):
+                raise ValueError(
+                    "--previous-input cannot be used with --refine, --modes or --domains"
+                )
+            if not 0.0 <= args.max_change <= 1.0:
+                raise ValueError("--max-change must be between 0.0 and 1.0")
+            if args.data and (
+                args.refine or args.modes or args.domains or args.previous_input
+            ):
+                raise ValueError(
+                    "--data cannot be used with --refine, --modes, --domains or --previous-input"
+                )
+            if args.chunked and (
+                args.refine
+                or args.modes
+                or args.domains
+                or args.previous_input
+                or args.data
+            ):
+                raise ValueError(
+                    "--chunked cannot be used with --refine, --modes, --domains, --previous-input or --data"
+                )
+            if args.chunk_tokens < 1:
+                raise ValueError("--chunk-tokens must be at least 1")
+            if args.refine:
+                refinement = RefinementOptions(
+                    passes=args.refine_passes,
+                    convergence_threshold=args.refine_threshold,
+                    token_budget=args.token_budget,
+                )
+        except (OSError, ValueError) as e:
             print(f"Configuration error: {e}.")
             print(
                 "Please check if you have passed correct arguments, run --help for more information."
             )
             sys.exit(1)
 
+        if args.modes or args.domains:
+            run_variants(args, user_input, start_time, backend)
+
         if args.verbose:
             print(generate_input_preview(user_input))
             print(f"Mode: {args.mode}")
@@ -230,14 +1703,79 @@ def main() -> None:
                 print(f"Domain: {args.domain}")
 
         # Optimize the prompt
-        optimized = optimize_prompt(
-            user_input=user_input,
-            mode=args.mode,
-            domain=args.domain,
-            model=args.model,
-            temperature=args.temperature,
-            verbose=args.verbose,
-        )
+        if args.previous_input:
+            incremental = reoptimize_prompt(
+                previous_input=load_prompt_from_file(args.previous_input),
+                previous_output=load_prompt_from_file(args.previous_output),
+                user_input=user_input,
+                mode=args.mode,
+                domain=args.domain,
+                model=args.model,
+                temperature=args.temperature,
+                max_change_ratio=args.max_change,
+                verbose=args.verbose,
+                timeout=args.timeout,
+                max_retries=args.retries,
+                backend=backend,
+                offline_fallback=args.offline_fallback,
+            )
+            optimized = incremental.optimized_prompt
+            print(
+                f"🔧 Incremental: {incremental.strategy} "
+                f"({incremental.change_ratio:.0%} changed, {incremental.edits} edits, "
+                f"{incremental.completion_tokens} completion tokens)."
+            )
+        elif args.chunked:
+            optimized = optimize_chunked(
+                user_input=user_input,
+                mode=args.mode,
+                domain=args.domain,
+                model=args.model,
+                temperature=args.temperature,
+                max_chunk_tokens=args.chunk_tokens,
+                max_concurrency=args.concurrency,
+                verbose=args.verbose,
+                timeout=args.timeout,
+                max_retries=args.retries,
+                backend=backend,
+                offline_fallback=args.offline_fallback,
+            )
+        elif refinement is not None:
+            refined = refine_prompt(
+                user_input=user_input,
+                mode=args.mode,
+                domain=args.domain,
+                model=args.model,
+                temperature=args.temperature,
+                options=refinement,
+                verbose=args.verbose,
+                timeout=args.timeout,
+                max_retries=args.retries,
+                ensemble_size=args.ensemble,
+                backend=backend,
+                offline_fallback=args.offline_fallback,
+            )
+            optimized = refined.optimized_prompt
+            print(
+                f"🔧 Refinement: {refined.passes} passes, {refined.total_tokens} tokens, "
+                f"stopped on {refined.stop_reason.replace('_', ' ')}."
+            )
+        else:
+            optimized = optimize_prompt(
+                user_input=user_input,
+                mode=args.mode,
+                domain=args.domain,
+                model=args.model,
+                temperature=args.temperature,
+                verbose=args.verbose,
+                timeout=args.timeout,
+                max_retries=args.retries,
+                ensemble_size=args.ensemble,
+                backend=backend,
+                offline_fallback=args.offline_fallback,
+                data=load_prompt_from_file(args.data) if args.data else None,
+                ado=args.ado_options or args.ado,
+            )
         duration = time.time() - start_time
 
         # Output result
@@ -3,3 +3,94 @@ DEFAULT_LLM_MODEL = "gpt-4.1-nano"
 DEFAULT_MODE = "simple"  # Default optimization mode
 SUPPORTED_LLM_MODELS = ["gpt-4.1-nano", "gpt-4.1-mini", "gpt-4.1"]
 DEFAULT_MAX_TOKENS = 8192
+DEFAULT_RESULT_CACHE_SIZE = 1024  # Maximum number of cached optimization results
+DEFAULT_SERVER_HOST = "127.0.0.1"
+DEFAULT_SERVER_PORT = 8080
+DEFAULT_SERVER_WORKERS = 64  # Concurrent upstream calls per server process
+DEFAULT_SERVER_QUEUE_SIZE = 1024  # Pending jobs before the server sheds load
+DEFAULT_REQUEST_TIMEOUT = 60.0  # Seconds
+DEFAULT_SHUTDOWN_TIMEOUT = 30.0  # Seconds to drain in-flight work on shutdown
+DEFAULT_MAX_BATCH_SIZE = 100
+DEFAULT_BATCH_CONCURRENCY = 8  # Concurrent upstream calls per batch job
+DEFAULT_SEMANTIC_THRESHOLD = 0.9  # Minimum cosine similarity for a semantic cache hit
+DEFAULT_SEMANTIC_CACHE_CAPACITY = 5000  # Maximum entries in the semantic cache
+DEFAULT_HASHED_FEATURES = 2048  # Dimensions of hashed n-gram vectors
+DEFAULT_HEDGE_PERCENTILE = 95.0  # Hedge calls slower than this latency percentile
+DEFAULT_HEDGE_BUDGET = 0.05  # Maximum share of calls that may be duplicated
+DEFAULT_MAX_RETRIES = 2  # Retries for rate-limited or transient upstream failures
+DEFAULT_RETRY_BACKOFF = 0.5  # Seconds before the first retry, doubled per attempt
+MAX_RETRY_BACKOFF = 8.0  # Seconds
+DEFAULT_REFINE_PASSES = 3  # Maximum optimization passes with --refine
+DEFAULT_REFINE_THRESHOLD = 0.9  # Similarity between passes that counts as converged
+DEFAULT_ENSEMBLE_SIZE = 3  # Candidates generated for ensemble modes
+ENSEMBLE_MODES = [
+    "redundancy_verification"
+]  # Modes that pick a consensus of candidates
+AUTO = "auto"  # Mode or domain value that is routed locally from the input
+DEFAULT_MODE_ROUTING_MIN_SCORE = (
+    0.1  # Minimum similarity for auto routing to pick a mode
+)
+DEFAULT_DOMAIN_ROUTING_MIN_SCORE = (
+    0.2  # Minimum similarity for auto routing to pick a domain
+)
+OPENAI_BACKEND = "openai"  # Optimize with the OpenAI API
+HEURISTIC_BACKEND = (
+    "heuristic"  # Optimize locally and deterministically, without a network call
+)
+BACKENDS_CONFIG_ENV = (
+    "ISOPROMPT_BACKENDS"  # Path of a JSON file configuring backends and routes
+)
+BACKEND_SLOT_POLL_INTERVAL = (
+    0.05  # Seconds between cancellation checks while waiting for a backend slot
+)
+AUTO_MODEL_TIERS = [
+    "gpt-4.1-nano",
+    "gpt-4.1-mini",
+    "gpt-4.1",
+]  # Models picked by model="auto", smallest first
+MODEL_HISTORY_ENV = (
+    "ISOPROMPT_MODEL_HISTORY"  # Path of the per-model latency and error history
+)
+DEFAULT_MODEL_HISTORY_PATH = "~/.isoprompt/model_history.json"
+DEFAULT_MODEL_HISTORY_WINDOW = 100  # Recent calls kept per model
+LARGE_INPUT_CHARS = 4000  # Inputs longer than this start one model tier higher
+MAX_MODEL_ERROR_RATE = 0.25  # Models failing more often than this are skipped
+MIN_MODEL_SAMPLES = 5  # Calls recorded before a model's statistics are trusted
+MIN_OPTIMIZED_WORDS = 10  # Shorter optimized prompts count as low quality
+JOURNAL_ENV = "ISOPROMPT_JOURNAL"  # Path of the run journal; set it empty to disable
+DEFAULT_JOURNAL_PATH = "~/.isoprompt/journal.sqlite3"
+DEFAULT_JOURNAL_RETENTION_DAYS = 30  # Older runs are deleted when the journal opens
+JOURNAL_FLUSH_EVERY = 64  # Runs buffered before they are written
+JOURNAL_FLUSH_INTERVAL = 5.0  # Seconds a run may stay buffered
+BATCH_API_ENDPOINT = "/v1/chat/completions"
+BATCH_API_COMPLETION_WINDOW = "24h"
+BATCH_API_MAX_REQUESTS = 50000  # Requests per Batch API input file
+DEFAULT_BATCH_POLL_INTERVAL = 10.0  # Seconds before the first Batch API status poll
+MAX_BATCH_POLL_INTERVAL = 300.0  # Seconds
+WATCH_EXTENSIONS = [".txt", ".md", ".prompt"]  # Files `isoprompt watch` optimizes
+WATCH_STATE_FILE = ".isoprompt-watch.json"  # Content hashes kept in the output dir
+DEFAULT_WATCH_DEBOUNCE = 0.5  # Seconds without edits before a file is optimized
+DEFAULT_WATCH_POLL_INTERVAL = 1.0  # Seconds between scans without notifications
+DEFAULT_BUILD_MANIFEST = "isoprompt.build.json"
+BUILD_STATE_FILE = ".isoprompt-build.json"  # Fingerprints kept next to the manifest
+DEFAULT_MAX_PATCH_RATIO = (
+    0.3  # Share of changed input above which edits re-optimize fully
+)
+PATCH_MAX_TOKENS = 2048  # Completion cap of a patch request
+DATA_FORMATS = [
+    "auto",
+    "csv",
+    "json",
+    "kv",
+]  # Encodings of `data=`; auto picks the cheapest
+DEFAULT_TOKEN_ENCODING = "o200k_base"  # tiktoken encoding for models it does not know
+DATA_COUNT_CHUNK = 8192  # Characters of encoded data counted at a time
+MAX_SUMMARY_FIELDS = 20  # Field names of `data=` shown to the optimizer
+DEFAULT_CHUNK_TOKENS = 3000  # Input tokens per chunk of a map-reduce optimization
+REDUCE_MAX_TOKENS = 1024  # Completion cap of the reduce call
+SECTION_OUTLINE_CHARS = 300  # Characters of each section the reduce call sees
+CATALOGS_ENV = "ISOPROMPT_CATALOGS"  # Overlay catalog files, separated by os.pathsep
+RESULT_FORMATS = ["jsonl", "sqlite", "parquet"]  # Output formats of batch results
+DEFAULT_SINK_BATCH_SIZE = 1000  # Results per SQLite transaction
+PARQUET_ROW_GROUP_SIZE = 10000  # Results per Parquet row group
+SINK_MAX_PENDING_WRITES = 4  # Batches queued for the writer before callers wait
@@ -0,0 +1,108 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Deadlines and cancellation shared across an optimization.
+
+A `Deadline` is created once per request and consulted by every stage (rate
+limit waits, retries, the HTTP call), so the total time never exceeds the
+caller's budget. A `CancelToken` lets a batch stop dispatching work and abort
+waits that are in progress.
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .errors import OptimizationCancelledError, OptimizationTimeoutError
+
+
+class Deadline:
+    """
+    A point in time (on the monotonic clock) by which work must finish.
+    """
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        """
+        Create a deadline.
+
+        Args:
+            timeout: Seconds from now, or None for no deadline.
+        """
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+
+    @classmethod
+    def resolve(
+        cls, deadline: Optional["Deadline"] = None, timeout: Optional[float] = None
+    ) -> "Deadline":
+        """Combine an optional deadline and timeout into the earlier of both."""
+        result = cls(timeout)
+        if deadline is not None and deadline.expires_at is not None:
+            if result.expires_at is None or deadline.expires_at < result.expires_at:
+                result.expires_at = deadline.expires_at
+        return result
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None if there is no deadline."""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self) -> None:
+        """Raise `OptimizationTimeoutError` if the deadline has passed."""
+        if self.expired():
+            raise OptimizationTimeoutError("Optimization deadline exceeded.")
+
+
+class CancelToken:
+    """
+    A thread-safe cancellation signal.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether `cancel` has been called."""
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Signal cancellation and run the registered callbacks."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Run `callback` on cancellation (immediately if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        """Stop running `callback` on cancellation."""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def check(self) -> None:
+        """Raise `OptimizationCancelledError` if cancelled."""
+        if self.cancelled:
+            raise OptimizationCancelledError("Optimization cancelled.")
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep, waking early and raising if cancelled."""
+        if self._event.wait(seconds):
+            raise OptimizationCancelledError("Optimization cancelled.")
@@ -0,0 +1,66 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Exceptions raised by IsoPrompt.
+
+Every optimization failure is an `IsoPromptError`, so callers can catch one
+type, while schedulers can react to the specific subclasses (retry later on
+`RateLimitedError`, extend the budget on `OptimizationTimeoutError`, ...).
+"""
+
+from typing import Optional
+
+
+class IsoPromptError(Exception):
+    """
+    Base class for IsoPrompt errors.
+    """
+
+    retryable = False
+
+
+class OptimizationTimeoutError(IsoPromptError, TimeoutError):
+    """
+    The optimization did not finish before its deadline.
+    """
+
+    retryable = True
+
+
+class OptimizationCancelledError(IsoPromptError):
+    """
+    The optimization was cancelled before it finished.
+    """
+
+
+class RateLimitedError(IsoPromptError):
+    """
+    The upstream API rejected the request because of rate limits.
+    """
+
+    retryable = True
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamError(IsoPromptError):
+    """
+    The upstream API failed or rejected the request.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retryable: bool = False,
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+class EmptyResponseError(IsoPromptError):
+    """
+    The upstream API returned no content.
+    """
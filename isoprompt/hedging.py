@@ -0,0 +1,328 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Hedged requests to cut tail latency.
+
+A hedged call starts normally. If it has not finished (or, for streams, has
+not produced its first token) within a percentile of recently observed
+latency, a duplicate is sent and whichever finishes first wins; the loser is
+cancelled. A budget caps the share of calls that may be duplicated.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Optional,
+    Set,
+    TypeVar,
+)
+
+from .constants import DEFAULT_HEDGE_BUDGET, DEFAULT_HEDGE_PERCENTILE
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """
+    A rolling window of observed latencies.
+    """
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Record one latency sample."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Return a latency percentile of the window (nearest-rank).
+
+        Args:
+            percentile: The percentile, between 0 and 100.
+
+        Returns:
+            The latency in seconds, or None if there are no samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(math.ceil(percentile / 100.0 * len(samples)) - 1, 0)
+        return samples[min(rank, len(samples) - 1)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+
+class HedgePolicy:
+    """
+    An opt-in policy for hedging slow calls.
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        budget: float = DEFAULT_HEDGE_BUDGET,
+        window: int = 200,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+    ) -> None:
+        """
+        Create a hedge policy.
+
+        Args:
+            percentile: Hedge once a call is slower than this percentile of
+                        the recent latency window.
+            budget: Maximum ratio of hedges to calls, e.g. 0.05 for 5%.
+            window: Number of recent latencies to keep.
+            min_samples: Samples required before any call is hedged.
+            min_delay: Lower bound, in seconds, on the hedge delay.
+        """
+        if not 0.0 < percentile < 100.0:
+            raise ValueError("Hedge percentile must be between 0 and 100.")
+        if not 0.0 <= budget <= 1.0:
+            raise ValueError("Hedge budget must be between 0.0 and 1.0.")
+
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latency = LatencyTracker(window)
+        self.first_token_latency = LatencyTracker(window)
+
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # --- Policy ---
+
+    def hedge_delay(self, tracker: Optional[LatencyTracker] = None) -> Optional[float]:
+        """
+        Return how long to wait before hedging, or None if not warmed up.
+
+        Args:
+            tracker: The latency window to use; defaults to full-call latency.
+        """
+        tracker = tracker or self.latency
+        if len(tracker) < self.min_samples:
+            return None
+        delay = tracker.percentile(self.percentile)
+        return None if delay is None else max(delay, self.min_delay)
+
+    def _start_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def _acquire_hedge(self) -> bool:
+        """Take one hedge from the budget, if any is left."""
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.calls:
+                self.budget_denied += 1
+                return False
+            self.hedges += 1
+            return True
+
+    def _record_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hedge rate, win rate and latency percentiles."""
+        with self._lock:
+            calls, hedges, wins = self.calls, self.hedges, self.hedge_wins
+            denied = self.budget_denied
+        return {
+            "calls": calls,
+            "hedges": hedges,
+            "hedge_rate": hedges / calls if calls else 0.0,
+            "hedge_wins": wins,
+            "win_rate": wins / hedges if hedges else 0.0,
+            "budget_denied": denied,
+            "p50": self.latency.percentile(50),
+            "p99": self.latency.percentile(99),
+            "hedge_delay": self.hedge_delay(),
+        }
+
+    # --- Sync calls ---
+
+    def run(self, fn: Callable[[], T]) -> T:
+        """
+        Run a blocking call, hedging it on a helper thread if it is slow.
+
+        Threads cannot be interrupted, so a losing call that already started
+        runs to completion in the background and its result is discarded.
+
+        Args:
+            fn: The call to run.
+
+        Returns:
+            The result of whichever attempt succeeded first.
+        """
+        self._start_call()
+        started = time.monotonic()
+        delay = self.hedge_delay()
+        if delay is None:
+            result = fn()
+            self.latency.record(time.monotonic() - started)
+            return result
+
+        executor = self._get_executor()
+        primary = executor.submit(fn)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._acquire_hedge():
+            result = primary.result()
+            self.latency.record(time.monotonic() - started)
+            return result
+
+        hedge = executor.submit(fn)
+        winner = self._first_success({primary, hedge})
+        self.latency.record(time.monotonic() - started)
+        if winner is hedge:
+            self._record_win()
+        for attempt in (primary, hedge):
+            if attempt is not winner:
+                attempt.cancel()
+        return winner.result()
+
+    @staticmethod
+    def _first_success(attempts: "Set[Future[T]]") -> "Future[T]":
+        """Wait for the first attempt to succeed, or the last one to fail."""
+        pending = set(attempts)
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None or not pending:
+                    return attempt
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix="isoprompt")
+            return self._executor
+
+    # --- Async calls ---
+
+    async def run_async(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await a call, hedging it with a duplicate if it is slow.
+
+        Args:
+            fn: A callable returning the coroutine to run.
+
+        Returns:
+            The result of whichever attempt succeeded first.
+        """
+        self._start_call()
+        started = time.monotonic()
+        primary = asyncio.ensure_future(fn())
+        attempts: "Set[asyncio.Future[T]]" = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done and self._acquire_hedge():
+                    attempts.add(asyncio.ensure_future(fn()))
+
+            winner = await self._first_success_async(attempts)
+            self.latency.record(time.monotonic() - started)
+            if winner is not primary:
+                self._record_win()
+            return winner.result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    @staticmethod
+    async def _first_success_async(
+        attempts: "Set[asyncio.Future[T]]",
+    ) -> "asyncio.Future[T]":
+        """Wait for the first attempt to succeed, or the last one to fail."""
+        pending = set(attempts)
+        while True:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for attempt in done:
+                if attempt.exception() is None or not pending:
+                    return attempt
+
+    async def stream_async(
+        self, fn: Callable[[], AsyncIterator[T]]
+    ) -> AsyncIterator[T]:
+        """
+        Iterate a stream, hedging it if the first item is slow to arrive.
+
+        The hedge delay is based on time to first item, and the attempt that
+        produces the first item wins the whole stream. Only the time to first
+        item is recorded: the rest of a stream moves at the pace of its
+        consumer, which says nothing about the latency of full calls.
+
+        Args:
+            fn: A callable returning the stream to consume.
+
+        Yields:
+            The items of the winning stream.
+        """
+        self._start_call()
+        started = time.monotonic()
+        primary = fn()
+        streams: Dict["asyncio.Future[T]", AsyncIterator[T]] = {
+            asyncio.ensure_future(primary.__anext__()): primary
+        }
+        winner: Optional[AsyncIterator[T]] = None
+        try:
+            delay = self.hedge_delay(self.first_token_latency)
+            if delay is not None:
+                done, _ = await asyncio.wait(set(streams), timeout=delay)
+                if not done and self._acquire_hedge():
+                    hedge = fn()
+                    streams[asyncio.ensure_future(hedge.__anext__())] = hedge
+
+            first_task = await self._first_success_async(set(streams))
+            winner = streams[first_task]
+            if winner is not primary:
+                self._record_win()
+            try:
+                first = first_task.result()
+            except StopAsyncIteration:
+                return
+            self.first_token_latency.record(time.monotonic() - started)
+        finally:
+            for task, stream in streams.items():
+                if stream is not winner or not task.done() or task.exception():
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    await _close(stream)
+
+        yield first
+        try:
+            async for item in winner:
+                yield item
+        finally:
+            await _close(winner)
+
+
+async def _close(stream: AsyncIterator[Any]) -> None:
+    """Close an async generator, ignoring errors from an abandoned attempt."""
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:
+            pass
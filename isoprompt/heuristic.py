@@ -0,0 +1,152 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Offline, deterministic prompt optimization.
+
+The heuristic backend turns the user's input into a structured prompt from
+the mode's output formats, strictness and citation policy, the domain's
+fields and the rules of `prompts/prompt_guidelines.md`, without any network
+call. It serves latency-critical paths and stands in for the API when the
+upstream is unavailable or too slow.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from .catalog import DomainSpec, ModeSpec
+from .domains import get_domain
+from .modes import get_default_mode, get_mode
+from .routing import stem_terms
+from .templates import get_prompt_guidelines
+
+# Guideline sections whose rules apply to the prompt being written, rather
+# than to the prompt engineering process.
+GUIDELINE_SECTIONS = ("Clarity & Precision", "Safety & Ethics")
+
+MAX_FOCUS_FIELDS = 4
+
+STRICTNESS_RULES: Dict[str, str] = {
+    "low": "Keep the response direct and concise.",
+    "medium": "Be accurate and well organized, and state any assumptions.",
+    "high": "Be rigorous: check each claim and state assumptions explicitly.",
+    "very_high": (
+        "Be rigorous and precise: justify every claim, flag uncertainty and "
+        "avoid speculation."
+    ),
+    "ultra": (
+        "Apply the highest rigor: verify every claim independently, flag any "
+        "uncertainty and do not speculate."
+    ),
+    "variable": "Match the level of rigor to the stakes of the task.",
+}
+
+_SECTION = re.compile(r"^\d+\.\s+\*\*(.+?)\*\*")
+_RULE = re.compile(r"^ {0,3}- (.+)$")
+_PROMPT_WORD = re.compile(r"\bprompt(s?)\b")
+_READABLE_NAMES = {"csv": "CSV", "json": "JSON", "qa": "Q&A", "plain": "plain text"}
+
+
+@lru_cache(maxsize=None)
+def get_guideline_rules(sections: Sequence[str] = GUIDELINE_SECTIONS) -> List[str]:
+    """
+    Extract the top-level rules of some sections of the prompt guidelines.
+
+    The guidelines address whoever writes a prompt, so "prompt" is reworded
+    as "response" for rules that are passed on to the model.
+
+    Args:
+        sections: The titles of the numbered sections to read.
+
+    Returns:
+        The rules, in file order.
+    """
+    rules: List[str] = []
+    current: Optional[str] = None
+    for line in get_prompt_guidelines().splitlines():
+        section = _SECTION.match(line.strip())
+        if section:
+            current = section.group(1).strip()
+            continue
+        rule = _RULE.match(line)
+        if rule and current in sections:
+            rules.append(_PROMPT_WORD.sub(r"response\1", rule.group(1).strip()))
+    return rules
+
+
+def _find_mode(mode: str) -> ModeSpec:
+    """Look up a mode, falling back to the default mode."""
+    return get_mode(mode) or get_default_mode()
+
+
+def _readable(name: str) -> str:
+    """Turn an identifier such as `risk_table` into `risk table`."""
+    return _READABLE_NAMES.get(name, name.replace("_", " "))
+
+
+def _task(user_input: str) -> str:
+    """Normalize the user's input into a task statement."""
+    task = " ".join(user_input.split())
+    task = task[:1].upper() + task[1:]
+    return task if task[-1:] in ".!?" else task + "."
+
+
+def _focus_fields(user_input: str, domain: DomainSpec) -> List[str]:
+    """Pick the domain fields most related to the input, in catalog order."""
+    terms = stem_terms(user_input)
+    related = [f for f in domain.fields if terms.keys() & stem_terms(f).keys()]
+    others = [f for f in domain.fields if f not in related]
+    return (related + others)[:MAX_FOCUS_FIELDS]
+
+
+def optimize_prompt_heuristic(
+    user_input: str, mode: str, domain: Optional[str] = None
+) -> str:
+    """
+    Build an optimized prompt locally, without calling a model.
+
+    Args:
+        user_input: The user's basic prompt or request.
+        mode: The optimization mode.
+        domain: The optional domain specialization.
+
+    Returns:
+        A structured Markdown prompt. The same input always gives the same
+        output.
+    """
+    mode_obj = _find_mode(mode)
+    domain_obj = get_domain(domain)
+
+    if domain_obj is not None:
+        role = (
+            f"You are an expert in {_readable(domain_obj.domain)}, the "
+            f"{domain_obj.description[:1].lower()}{domain_obj.description[1:]}"
+        )
+    else:
+        role = "You are a knowledgeable, careful assistant."
+
+    sections = [f"# Role\n\n{role}", f"# Task\n\n{_task(user_input)}"]
+
+    context = [f"- Approach: {mode_obj.description}"]
+    if mode_obj.capabilities:
+        context.append(f"- Emphasize: {', '.join(mode_obj.capabilities)}.")
+    if domain_obj is not None:
+        fields = ", ".join(_readable(f) for f in _focus_fields(user_input, domain_obj))
+        context.append(f"- Relevant areas: {fields}.")
+    sections.append("# Context\n\n" + "\n".join(context))
+
+    instructions = [
+        STRICTNESS_RULES.get(mode_obj.strictness, STRICTNESS_RULES["medium"])
+    ]
+    if mode_obj.require_citations:
+        instructions.append("Cite a source for every factual claim.")
+    instructions += get_guideline_rules()
+    sections.append("# Instructions\n\n" + "\n".join(f"- {i}" for i in instructions))
+
+    formats = [_readable(f) for f in mode_obj.output_formats]
+    if formats:
+        output = f"Format the response as {formats[0]}."
+        if len(formats) > 1:
+            output += f" If that does not fit, use {' or '.join(formats[1:])}."
+        sections.append(f"# Output Format\n\n{output}")
+
+    return "\n\n".join(sections)
@@ -0,0 +1,152 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Incremental re-optimization of edited prompts.
+
+When a prompt that was already optimized is edited, most of the optimized
+prompt is still right. Instead of regenerating all of it, the request is
+diffed sentence by sentence against the previous version and the model is
+asked for find-and-replace edits to the previous optimized prompt that cover
+only the changed sentences. The edits are a fraction of the full prompt, so
+they take fewer output tokens and return sooner. `reoptimize_prompt` in
+`optimizer` falls back to a full optimization when the change is too large or
+the edits do not apply.
+"""
+
+import difflib
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .templates import get_optimization_template
+
+# Sentence ends and line breaks.
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+_CODE_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+PATCH_INSTRUCTIONS = """The request you optimized before has changed. Update the previous optimized prompt for the changed parts only and keep everything else word for word.
+
+Answer with JSON only, in this form:
+{"edits": [{"find": "<text copied exactly from the previous optimized prompt>", "replace": "<its new text>"}]}
+
+Make each "find" long enough to occur only once. Use an empty "find" to add text at the end. Answer {"edits": []} if nothing needs to change."""
+
+# (find, replace) pairs
+Edits = List[Tuple[str, str]]
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into its sentences and lines, dropping empty ones."""
+    return [part.strip() for part in _SENTENCE_BREAK.split(text) if part.strip()]
+
+
+def diff_inputs(previous: str, current: str) -> Tuple[str, float]:
+    """
+    Compare two versions of a request sentence by sentence.
+
+    Args:
+        previous: The request that was optimized.
+        current: The edited request.
+
+    Returns:
+        The changed sentences, as "- removed" and "+ added" lines (empty if
+        nothing changed), and the share of characters in changed sentences,
+        from 0.0 to 1.0.
+    """
+    old, new = split_sentences(previous), split_sentences(current)
+    matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+    lines: List[str] = []
+    changed = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        for sentence in old[i1:i2]:
+            lines.append(f"- {sentence}")
+            changed += len(sentence)
+        for sentence in new[j1:j2]:
+            lines.append(f"+ {sentence}")
+            changed += len(sentence)
+    total = sum(len(s) for s in old) + sum(len(s) for s in new)
+    return "\n".join(lines), changed / total if total else 0.0
+
+
+def build_patch_messages(
+    previous_output: str, diff: str, mode: str, domain: Optional[str]
+) -> List[Dict[str, str]]:
+    """
+    Build the messages asking for edits to a previous optimized prompt.
+
+    The system message is the same optimization template as a full request,
+    so providers that cache prompt prefixes reuse it.
+
+    Args:
+        previous_output: The previous optimized prompt.
+        diff: The changed sentences, from `diff_inputs`.
+        mode: The optimization mode.
+        domain: The optional domain specialization.
+
+    Returns:
+        The chat messages.
+    """
+    user_message = (
+        f"Previous optimized prompt:\n\n{previous_output}\n\n"
+        f"Changes to the request (- removed, + added):\n\n{diff}\n\n"
+        f"{PATCH_INSTRUCTIONS}"
+    )
+    return [
+        {"role": "system", "content": get_optimization_template(mode, domain)},
+        {"role": "user", "content": user_message},
+    ]
+
+
+def parse_edits(content: str) -> Edits:
+    """
+    Parse the edits of a patch response.
+
+    Args:
+        content: The model's answer, optionally in a code fence.
+
+    Returns:
+        The edits, in order.
+
+    Raises:
+        ValueError: If the answer is not a valid list of edits.
+    """
+    data = json.loads(_CODE_FENCE.sub("", content.strip()))
+    if not isinstance(data, dict) or not isinstance(data.get("edits"), list):
+        raise ValueError("Expected an object with a list of edits.")
+    edits: Edits = []
+    for edit in data["edits"]:
+        if not isinstance(edit, dict):
+            raise ValueError(f"Invalid edit: {edit!r}")
+        find, replace = edit.get("find", ""), edit.get("replace", "")
+        if not isinstance(find, str) or not isinstance(replace, str):
+            raise ValueError(f"Invalid edit: {edit!r}")
+        edits.append((find, replace))
+    return edits
+
+
+def apply_edits(text: str, edits: Edits) -> str:
+    """
+    Apply edits to a prompt, each to the first occurrence of its `find`.
+
+    Args:
+        text: The previous optimized prompt.
+        edits: The (find, replace) pairs; an empty find appends.
+
+    Returns:
+        The edited prompt.
+
+    Raises:
+        ValueError: If a `find` does not occur or the result is empty.
+    """
+    for find, replace in edits:
+        if not find:
+            text = f"{text.rstrip()}\n\n{replace.strip()}" if replace.strip() else text
+            continue
+        index = text.find(find)
+        if index < 0:
+            raise ValueError(f"Edit target not found: {find[:60]!r}")
+        text = text[:index] + replace + text[index + len(find) :]
+    if not text.strip():
+        raise ValueError("The edits left an empty prompt.")
+    return text
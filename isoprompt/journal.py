@@ -0,0 +1,322 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+A local journal of optimization runs.
+
+Every optimization appends one row (time, model, mode, domain, backend, token
+usage, latency, cache hit and outcome) to a SQLite database in WAL mode. Rows
+are buffered and written in batches, so journaling adds no disk I/O to the
+hot path; the buffer is flushed when it fills up, when it gets old and at
+exit. Runs older than the retention period are deleted when the journal
+opens. `isoprompt stats` summarizes the journal.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .constants import (
+    DEFAULT_JOURNAL_PATH,
+    DEFAULT_JOURNAL_RETENTION_DAYS,
+    JOURNAL_ENV,
+    JOURNAL_FLUSH_EVERY,
+    JOURNAL_FLUSH_INTERVAL,
+)
+from .model_selection import latency_percentile
+from .models import RunStats
+from .usage import UsageMeter
+
+JOURNAL_GROUPS = ["model", "mode", "domain", "backend"]
+
+# Outcomes that still produced a prompt.
+SUCCESS_OUTCOMES = ("ok", "fallback")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    domain TEXT,
+    backend TEXT,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    cache_hit INTEGER NOT NULL,
+    outcome TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_ts ON runs (ts);
+"""
+
+Row = Tuple[Any, ...]
+
+
+class RunJournal:
+    """
+    A thread-safe, batched journal of optimization runs in SQLite.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        retention_days: Optional[float] = DEFAULT_JOURNAL_RETENTION_DAYS,
+        flush_every: int = JOURNAL_FLUSH_EVERY,
+        flush_interval: float = JOURNAL_FLUSH_INTERVAL,
+    ) -> None:
+        """
+        Open a journal, creating it if needed.
+
+        Args:
+            path: The SQLite database file.
+            retention_days: Delete runs older than this on open; None keeps
+                            every run.
+            flush_every: Buffered runs that trigger a write.
+            flush_interval: Seconds after which buffered runs are written on
+                            the next append.
+        """
+        self.path = os.path.expanduser(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._pending: List[Row] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            if retention_days is not None:
+                cutoff = time.time() - retention_days * 86400.0
+                self._connection.execute("DELETE FROM runs WHERE ts < ?", (cutoff,))
+
+    def append(
+        self,
+        model: str,
+        mode: str,
+        domain: Optional[str],
+        backend: Optional[str],
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+        cache_hit: bool,
+        outcome: str,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """
+        Buffer one run, writing the buffer if it is full or old.
+
+        Args:
+            model: The model of the run.
+            mode: The (resolved) mode of the run.
+            domain: The (resolved) domain of the run.
+            backend: The backend that served the run.
+            prompt_tokens: Prompt tokens spent.
+            completion_tokens: Completion tokens spent.
+            latency: Seconds the run took.
+            cache_hit: Whether the run was served from a cache.
+            outcome: "ok", "fallback", or the name of the raised error.
+            timestamp: When the run started; defaults to now.
+        """
+        row = (
+            timestamp if timestamp is not None else time.time(),
+            model,
+            mode,
+            domain,
+            backend,
+            prompt_tokens,
+            completion_tokens,
+            latency,
+            int(cache_hit),
+            outcome,
+        )
+        with self._lock:
+            self._pending.append(row)
+            should_flush = (
+                len(self._pending) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered runs in one transaction."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not rows:
+                return
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+
+    def summarize(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        group_by: Sequence[str] = ("model", "mode", "domain"),
+    ) -> List[RunStats]:
+        """
+        Summarize the journaled runs of a time window.
+
+        Args:
+            since: Start of the window as a Unix time; None for the first run.
+            until: End of the window as a Unix time; None for now.
+            group_by: Columns to group by, among `JOURNAL_GROUPS`.
+
+        Returns:
+            One summary per group, busiest group first.
+        """
+        for column in group_by:
+            if column not in JOURNAL_GROUPS:
+                raise ValueError(f"Invalid group. Available: {JOURNAL_GROUPS}.")
+        self.flush()
+
+        columns = ", ".join(list(group_by) + ["ts", "latency"])
+        query = (
+            f"SELECT {columns}, prompt_tokens, completion_tokens, cache_hit, "
+            "outcome FROM runs WHERE ts >= ? AND ts <= ?"
+        )
+        window_end = until if until is not None else time.time()
+        with self._lock:
+            rows = self._connection.execute(
+                query, (since if since is not None else 0.0, window_end)
+            ).fetchall()
+
+        groups: Dict[Tuple[Any, ...], List[Row]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row[: len(group_by)]), []).append(
+                row[len(group_by) :]
+            )
+
+        summaries = []
+        for key, runs in groups.items():
+            latencies = [run[1] for run in runs]
+            errors = sum(1 for run in runs if run[5] not in SUCCESS_OUTCOMES)
+            # Throughput over the span of the group's runs, at least a minute,
+            # so idle time before the first or after the last run of a long
+            # window does not dilute it.
+            timestamps = [run[0] for run in runs]
+            minutes = max(max(timestamps) - min(timestamps), 60.0) / 60.0
+            summaries.append(
+                RunStats(
+                    group=dict(zip(group_by, key)),
+                    runs=len(runs),
+                    errors=errors,
+                    error_rate=errors / len(runs),
+                    cache_hits=sum(run[4] for run in runs),
+                    p50_seconds=latency_percentile(latencies, 50) or 0.0,
+                    p95_seconds=latency_percentile(latencies, 95) or 0.0,
+                    p99_seconds=latency_percentile(latencies, 99) or 0.0,
+                    runs_per_minute=len(runs) / minutes,
+                    prompt_tokens=sum(run[2] for run in runs),
+                    completion_tokens=sum(run[3] for run in runs),
+                )
+            )
+        summaries.sort(key=lambda s: s.runs, reverse=True)
+        return summaries
+
+    def close(self) -> None:
+        """Flush buffered runs and close the database."""
+        self.flush()
+        with self._lock:
+            self._connection.close()
+
+
+def get_journal_path() -> Optional[str]:
+    """
+    Get the journal file from `ISOPROMPT_JOURNAL`, defaulting to
+    `~/.isoprompt/journal.sqlite3`, or None if journaling is disabled.
+    """
+    return os.environ.get(JOURNAL_ENV, DEFAULT_JOURNAL_PATH) or None
+
+
+_journal: Optional[RunJournal] = None
+_journal_opened = False
+_journal_lock = threading.Lock()
+
+
+def get_run_journal() -> Optional[RunJournal]:
+    """
+    Get the process-wide run journal, or None if journaling is disabled or
+    the journal cannot be opened.
+    """
+    global _journal, _journal_opened
+    with _journal_lock:
+        if not _journal_opened:
+            _journal_opened = True
+            path = get_journal_path()
+            if path:
+                try:
+                    _journal = RunJournal(path)
+                    atexit.register(_journal.flush)
+                except (OSError, sqlite3.Error):
+                    _journal = None  # Journaling never breaks optimization.
+        return _journal
+
+
+class JournaledRun:
+    """
+    The mutable record of one run, filled in while it executes.
+    """
+
+    def __init__(self) -> None:
+        self.usage = UsageMeter()
+        self.cache_hit = False
+        self.outcome = "ok"
+        self.backend: Optional[str] = None
+
+
+@contextmanager
+def journal_run(
+    model: str,
+    mode: str,
+    domain: Optional[str],
+    usage: Optional[UsageMeter] = None,
+) -> Iterator[JournaledRun]:
+    """
+    Journal the optimization run in the `with` block.
+
+    The block passes `run.usage` to its upstream calls and sets `cache_hit`,
+    `backend` and `outcome` ("fallback" for degraded results); a raised
+    error is journaled under its class name and re-raised.
+
+    Args:
+        model: The model of the run.
+        mode: The (resolved) mode of the run.
+        domain: The (resolved) domain of the run.
+        usage: Optional caller meter that also receives the run's tokens.
+    """
+    run = JournaledRun()
+    timestamp = time.time()
+    started = time.monotonic()
+    try:
+        yield run
+    except BaseException as e:
+        run.outcome = type(e).__name__
+        raise
+    finally:
+        if usage is not None:
+            usage.add(run.usage)
+        journal = get_run_journal()
+        if journal is not None:
+            try:
+                journal.append(
+                    model,
+                    mode,
+                    domain,
+                    run.backend,
+                    run.usage.prompt_tokens,
+                    run.usage.completion_tokens,
+                    time.monotonic() - started,
+                    run.cache_hit,
+                    run.outcome,
+                    timestamp,
+                )
+            except sqlite3.Error:
+                pass
@@ -0,0 +1,276 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Latency- and cost-aware selection for `model="auto"`.
+
+The smallest model is preferred. Strict modes and long inputs start higher,
+models that have recently been failing are skipped, and a latency budget
+steps down to a model whose recent latency fits. If the chosen model fails or
+returns a low-quality prompt, the request escalates to the next larger one.
+
+Latency and outcomes are kept per model in a small JSON file, so the policy
+carries over between runs.
+"""
+
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .constants import (
+    AUTO_MODEL_TIERS,
+    DEFAULT_MODEL_HISTORY_PATH,
+    DEFAULT_MODEL_HISTORY_WINDOW,
+    LARGE_INPUT_CHARS,
+    MAX_MODEL_ERROR_RATE,
+    MIN_MODEL_SAMPLES,
+    MIN_OPTIMIZED_WORDS,
+    MODEL_HISTORY_ENV,
+)
+from .models import ModelStats
+from .modes import get_mode
+from .similarity import jaccard_similarity
+
+# The tier, counted from the smallest model, that each strictness starts at.
+STRICTNESS_TIERS: Dict[str, int] = {
+    "low": 0,
+    "medium": 0,
+    "variable": 0,
+    "high": 1,
+    "very_high": 1,
+    "ultra": 2,
+}
+
+# An optimized prompt this similar to its input was not really optimized.
+ECHO_SIMILARITY = 0.9
+
+# (latency in seconds, whether the call succeeded)
+Sample = Tuple[float, bool]
+
+
+def latency_percentile(values: List[float], percentile: float) -> Optional[float]:
+    """Return a nearest-rank percentile, or None without values."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(math.ceil(percentile / 100.0 * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class ModelHistory:
+    """
+    A thread-safe rolling window of call outcomes per model, persisted to JSON.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        window: int = DEFAULT_MODEL_HISTORY_WINDOW,
+        autosave_every: int = 10,
+    ) -> None:
+        """
+        Create a history.
+
+        Args:
+            path: Optional JSON file to load from and persist to.
+            window: The number of recent calls kept per model.
+            autosave_every: Save to `path` after this many recorded calls.
+        """
+        self.path = os.path.expanduser(path) if path else None
+        self.window = window
+        self.autosave_every = autosave_every
+        self._samples: Dict[str, Deque[Sample]] = {}
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+        if self.path and os.path.exists(self.path):
+            self.load(self.path)
+
+    def record(self, model: str, seconds: float, ok: bool) -> None:
+        """
+        Record the outcome of one call.
+
+        Args:
+            model: The model called.
+            seconds: How long the call took.
+            ok: Whether it returned a usable prompt.
+        """
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = deque(maxlen=self.window)
+                self._samples[model] = samples
+            samples.append((seconds, ok))
+            self._unsaved += 1
+            should_save = bool(self.path) and self._unsaved >= self.autosave_every
+
+        if should_save:
+            self.save()
+
+    def stats(self, model: str) -> ModelStats:
+        """Summarize the recent calls of a model."""
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        latencies = [seconds for seconds, ok in samples if ok]
+        failures = sum(1 for _, ok in samples if not ok)
+        return ModelStats(
+            model=model,
+            samples=len(samples),
+            error_rate=failures / len(samples) if samples else 0.0,
+            p50_seconds=latency_percentile(latencies, 50),
+            p90_seconds=latency_percentile(latencies, 90),
+        )
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Persist the history to a JSON file, replacing it atomically.
+
+        Args:
+            path: The file to write; defaults to the history's own path.
+        """
+        target = os.path.expanduser(path) if path else self.path
+        if not target:
+            raise ValueError("No path to save the model history to.")
+
+        with self._lock:
+            data = {
+                "window": self.window,
+                "models": {
+                    model: [[round(s, 4), ok] for s, ok in samples]
+                    for model, samples in self._samples.items()
+                },
+            }
+            self._unsaved = 0
+
+        directory = os.path.dirname(os.path.abspath(target))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self, path: str) -> None:
+        """
+        Load a history saved by `save`. An unreadable file is ignored, since
+        the history only tunes the selection policy.
+
+        Args:
+            path: The file to read.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            loaded = {
+                model: deque(
+                    ((float(s), bool(ok)) for s, ok in samples), maxlen=self.window
+                )
+                for model, samples in data["models"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        with self._lock:
+            self._samples = loaded
+
+    def flush(self) -> None:
+        """Save unsaved calls, if the history has a path."""
+        if self.path and self._unsaved:
+            self.save()
+
+
+_history: Optional[ModelHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_model_history() -> ModelHistory:
+    """
+    Get the process-wide model history.
+
+    It is persisted to the file named by the `ISOPROMPT_MODEL_HISTORY`
+    environment variable, or to `~/.isoprompt/model_history.json`.
+    """
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = ModelHistory(
+                os.getenv(MODEL_HISTORY_ENV) or DEFAULT_MODEL_HISTORY_PATH
+            )
+            atexit.register(_history.flush)
+        return _history
+
+
+def _is_failing(stats: ModelStats) -> bool:
+    """Whether a model has recently failed too often to be picked first."""
+    return (
+        stats.samples >= MIN_MODEL_SAMPLES and stats.error_rate > MAX_MODEL_ERROR_RATE
+    )
+
+
+def _fits(stats: ModelStats, latency_budget: Optional[float]) -> bool:
+    """Whether a model's recent latency fits a budget."""
+    if latency_budget is None or stats.p90_seconds is None:
+        return True
+    return stats.p90_seconds <= latency_budget
+
+
+def plan_models(
+    user_input: str,
+    mode: str,
+    latency_budget: Optional[float] = None,
+    history: Optional[ModelHistory] = None,
+    tiers: List[str] = AUTO_MODEL_TIERS,
+) -> List[str]:
+    """
+    Choose the model of a request and the models to escalate to.
+
+    Args:
+        user_input: The user's basic prompt or request.
+        mode: The (resolved) optimization mode.
+        latency_budget: Optional seconds the request may take.
+        history: The recent performance of each model.
+        tiers: The candidate models, smallest first.
+
+    Returns:
+        The chosen model followed by the larger ones, in escalation order.
+    """
+    history = history or get_model_history()
+    spec = get_mode(mode)
+    strictness = spec.strictness if spec is not None else "medium"
+    base = STRICTNESS_TIERS.get(strictness, 0)
+    if len(user_input) > LARGE_INPUT_CHARS:
+        base += 1
+    base = min(base, len(tiers) - 1)
+
+    stats = [history.stats(model) for model in tiers]
+    chosen = next(
+        (i for i in range(base, len(tiers)) if not _is_failing(stats[i])), base
+    )
+    if not _fits(stats[chosen], latency_budget):
+        # Trade quality for latency: the largest smaller model that fits.
+        chosen = next(
+            (
+                i
+                for i in range(chosen - 1, -1, -1)
+                if _fits(stats[i], latency_budget) and not _is_failing(stats[i])
+            ),
+            chosen,
+        )
+    return tiers[chosen:]
+
+
+def is_low_quality(user_input: str, optimized: str) -> bool:
+    """
+    Whether an optimized prompt should be retried on a larger model.
+
+    A prompt is low quality when it is too short to be a structured prompt or
+    merely echoes the input.
+    """
+    if len(optimized.split()) < MIN_OPTIMIZED_WORDS:
+        return True
+    return jaccard_similarity(user_input, optimized) >= ECHO_SIMILARITY
@@ -3,9 +3,19 @@ IsoPrompt - AI-powered prompt optimization tool.
 Data structures for IsoPrompt.
 """
 
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from .constants import (
+    DEFAULT_LLM_MODEL,
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MODE,
+    DEFAULT_REFINE_PASSES,
+    DEFAULT_REFINE_THRESHOLD,
+    DEFAULT_TEMPERATURE,
+    OPENAI_BACKEND,
+)
 
 
 class IsoPromptMode(BaseModel):
@@ -33,3 +43,334 @@ class IsoPromptDomain(BaseModel):
     description: str
     fields: List[str]
     applications: List[str]
+
+
+class OptimizeRequest(BaseModel):
+    """
+    A model for a single optimization request received by the server.
+    """
+
+    prompt: str = Field(min_length=1)
+    mode: str = DEFAULT_MODE
+    domain: Optional[str] = None
+    model: str = DEFAULT_LLM_MODEL
+    temperature: float = DEFAULT_TEMPERATURE
+    timeout: Optional[float] = Field(default=None, gt=0)
+
+
+class BatchOptimizeRequest(BaseModel):
+    """
+    A model for a batch of optimization requests received by the server.
+    """
+
+    items: List[OptimizeRequest] = Field(
+        min_length=1, max_length=DEFAULT_MAX_BATCH_SIZE
+    )
+    timeout: Optional[float] = Field(default=None, gt=0)
+    dedupe: bool = True
+
+
+class NormalizationOptions(BaseModel):
+    """
+    A model for the normalization applied before batch deduplication.
+    """
+
+    collapse_whitespace: bool = True
+    casefold: bool = True
+    strip_trailing_punctuation: bool = True
+
+
+class BatchRecord(BaseModel):
+    """
+    A model for one record of a batch job.
+    """
+
+    id: str
+    prompt: str = Field(min_length=1)
+    mode: str = DEFAULT_MODE
+    domain: Optional[str] = None
+    model: str = DEFAULT_LLM_MODEL
+    temperature: float = DEFAULT_TEMPERATURE
+
+
+class BatchItemResult(BaseModel):
+    """
+    A model for the outcome of one batch record.
+    """
+
+    id: str
+    optimized_prompt: Optional[str] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    duplicate_of: Optional[str] = None
+    passes: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    latency_seconds: Optional[float] = None
+
+
+class BatchReport(BaseModel):
+    """
+    A model for the summary of a batch job.
+    """
+
+    total: int = 0
+    unique: int = 0
+    duplicates: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    duration_seconds: float = 0.0
+
+    @property
+    def saved_calls_ratio(self) -> float:
+        """The share of records served by another record's call."""
+        return self.duplicates / self.total if self.total else 0.0
+
+
+class BatchResult(BaseModel):
+    """
+    A model for the results and report of a batch job.
+    """
+
+    results: List[BatchItemResult]
+    report: BatchReport
+
+
+class RefinementOptions(BaseModel):
+    """
+    A model for the limits of multi-pass refinement.
+    """
+
+    passes: int = Field(default=DEFAULT_REFINE_PASSES, ge=1)
+    convergence_threshold: float = Field(default=DEFAULT_REFINE_THRESHOLD, gt=0, le=1)
+    token_budget: Optional[int] = Field(default=None, gt=0)
+
+
+class RefinementResult(BaseModel):
+    """
+    A model for the outcome of multi-pass refinement.
+    """
+
+    optimized_prompt: str
+    passes: int
+    similarities: List[float] = []
+    stop_reason: str
+    total_tokens: int = 0
+    duration_seconds: float = 0.0
+
+
+class VariantResult(BaseModel):
+    """
+    A model for one (mode, domain) variant of a fan-out optimization.
+    """
+
+    mode: str
+    domain: Optional[str] = None
+    optimized_prompt: Optional[str] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    latency_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    score: Optional[float] = None
+
+
+class VariantsResult(BaseModel):
+    """
+    A model for the variants of a fan-out optimization.
+    """
+
+    variants: List[VariantResult]
+    selected: Optional[VariantResult] = None
+    duration_seconds: float = 0.0
+
+    def by_key(self) -> Dict[Tuple[str, Optional[str]], VariantResult]:
+        """Return the variants keyed by (mode, domain)."""
+        return {(variant.mode, variant.domain): variant for variant in self.variants}
+
+
+class BackendConfig(BaseModel):
+    """
+    A model for one optimization backend.
+
+    `type` is "openai" for the OpenAI API or any server speaking its wire
+    protocol (set `base_url`), or "heuristic" for the offline optimizer.
+    `models` lists the models the backend serves, `max_connections` sizes its
+    HTTP connection pool (SDK default when unset) and `max_concurrency` caps
+    its in-flight requests. Set `api_key_env` to None for servers without
+    authentication.
+    """
+
+    name: str = Field(min_length=1)
+    type: str = OPENAI_BACKEND
+    base_url: Optional[str] = None
+    api_key_env: Optional[str] = "OPENAI_API_KEY"
+    models: List[str] = []
+    max_connections: Optional[int] = Field(default=None, ge=1)
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+
+
+class BackendRoute(BaseModel):
+    """
+    A model for a routing rule. Unset fields match any value.
+    """
+
+    backend: str
+    mode: Optional[str] = None
+    domain: Optional[str] = None
+    model: Optional[str] = None
+
+
+class BackendsConfig(BaseModel):
+    """
+    A model for the configured backends and the rules routing traffic to them.
+    """
+
+    backends: List[BackendConfig] = []
+    routes: List[BackendRoute] = []
+    default: str = OPENAI_BACKEND
+
+
+class ModelStats(BaseModel):
+    """
+    A model for the recent performance of one LLM model.
+    """
+
+    model: str
+    samples: int = 0
+    error_rate: float = 0.0
+    p50_seconds: Optional[float] = None
+    p90_seconds: Optional[float] = None
+
+
+class RunStats(BaseModel):
+    """
+    A model for the journaled runs of one group over a time window.
+    `runs_per_minute` is measured from the group's first to its last run.
+    """
+
+    group: Dict[str, Optional[str]]
+    runs: int
+    errors: int
+    error_rate: float
+    cache_hits: int
+    p50_seconds: float
+    p95_seconds: float
+    p99_seconds: float
+    runs_per_minute: float
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class BatchApiJob(BaseModel):
+    """
+    A model for one submitted Batch API job and its progress.
+    """
+
+    custom_ids: List[str]
+    input_file_id: Optional[str] = None
+    batch_id: Optional[str] = None
+    status: str = "pending"
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    errors: List[str] = []
+
+
+class BatchApiState(BaseModel):
+    """
+    A model for the resumable state of a Batch API run.
+
+    `groups` maps each request's custom ID to the IDs of the records that
+    share its result. `fingerprint` identifies the rendered requests, so a
+    state is only resumed for the same job.
+    """
+
+    fingerprint: str
+    groups: Dict[str, List[str]]
+    jobs: List[BatchApiJob]
+
+
+class BuildEntry(BaseModel):
+    """
+    A model for one output of a build manifest.
+
+    `source` and `output` are relative to the manifest. The rules of the
+    `guidelines` files are added to the request, so editing one of them
+    rebuilds exactly the entries that list it.
+    """
+
+    source: str = Field(min_length=1)
+    output: str = Field(min_length=1)
+    mode: str = DEFAULT_MODE
+    domain: Optional[str] = None
+    model: str = DEFAULT_LLM_MODEL
+    temperature: float = DEFAULT_TEMPERATURE
+    guidelines: List[str] = []
+
+
+class BuildManifest(BaseModel):
+    """
+    A model for a build manifest.
+    """
+
+    entries: List[BuildEntry]
+
+
+class BuildReport(BaseModel):
+    """
+    A model for the summary of a build.
+
+    `stale` maps each output that was (or, in a dry run, would be) rebuilt to
+    the reason, and `errors` maps each failed output to its error.
+    """
+
+    total: int = 0
+    up_to_date: int = 0
+    built: int = 0
+    failed: int = 0
+    stale: Dict[str, str] = {}
+    errors: Dict[str, str] = {}
+    duration_seconds: float = 0.0
+
+
+class IncrementalResult(BaseModel):
+    """
+    A model for the outcome of an incremental re-optimization.
+
+    `strategy` is "unchanged" when the input did not change, "patch" when the
+    previous prompt was edited, or "full" when it was optimized from scratch.
+    """
+
+    optimized_prompt: str
+    strategy: str
+    change_ratio: float = 0.0
+    edits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    duration_seconds: float = 0.0
+
+
+class DataOptions(BaseModel):
+    """
+    A model for the options of data optimization (`ado=`).
+
+    `content` prunes empty fields and lists fields shared by every row once;
+    `format` is "auto" to pick the encoding with the fewest tokens, or one of
+    "csv", "json" and "kv". Other keys are ignored.
+    """
+
+    content: bool = True
+    format: str = "auto"
+
+
+class EncodedData(BaseModel):
+    """
+    A model for data encoded to be embedded in a prompt.
+    """
+
+    text: str
+    format: str
+    tokens: int
+    original_tokens: int
+    summary: str
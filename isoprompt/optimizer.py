@@ -1,8 +1,23 @@
 """Core prompt optimization functions."""
 
+import asyncio
 import os
+import random
 import sys
-from typing import Any, Dict, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 try:
     import openai
@@ -14,20 +29,67 @@ except ImportError:
 
 import json
 
+from .ado import attach_data, describe_data, prepare_data
+from .backends import Backend, get_backend_registry
+from .cache import get_result_cache, make_cache_key
+from .chunking import (
+    assemble_sections,
+    build_reduce_messages,
+    frame_chunk,
+    split_input,
+)
 from .constants import (
+    AUTO,
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_CHUNK_TOKENS,
+    DEFAULT_ENSEMBLE_SIZE,
     DEFAULT_LLM_MODEL,
+    DEFAULT_MAX_PATCH_RATIO,
+    DEFAULT_MAX_RETRIES,
     DEFAULT_MAX_TOKENS,
     DEFAULT_MODE,
+    DEFAULT_RETRY_BACKOFF,
     DEFAULT_TEMPERATURE,
-    SUPPORTED_LLM_MODELS,
+    ENSEMBLE_MODES,
+    MAX_RETRY_BACKOFF,
+    OPENAI_BACKEND,
+    PATCH_MAX_TOKENS,
+    REDUCE_MAX_TOKENS,
 )
+from .deadline import CancelToken, Deadline
 from .domains import get_available_domain_names, is_domain_valid
+from .errors import (
+    EmptyResponseError,
+    IsoPromptError,
+    OptimizationCancelledError,
+    OptimizationTimeoutError,
+    RateLimitedError,
+    UpstreamError,
+)
+from .hedging import HedgePolicy
+from .heuristic import optimize_prompt_heuristic
+from .incremental import apply_edits, build_patch_messages, diff_inputs, parse_edits
+from .journal import journal_run
+from .model_selection import (
+    ModelHistory,
+    get_model_history,
+    is_low_quality,
+    plan_models,
+)
+from .models import DataOptions, IncrementalResult
 from .modes import get_available_mode_names, is_mode_valid
+from .routing import resolve_auto
+from .similarity import consensus
+from .singleflight import get_async_singleflight, get_sync_singleflight
 from .templates import get_optimization_template
+from .usage import UsageMeter
 
+if TYPE_CHECKING:
+    from .semantic_cache import SemanticCache
 
-def create_openai_client() -> openai.OpenAI:
-    """Create OpenAI client with API key validation."""
+
+def get_openai_api_key() -> str:
+    """Get the OpenAI API key from the environment."""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError(
@@ -36,7 +98,412 @@ def create_openai_client() -> openai.OpenAI:
             "export OPENAI_API_KEY='your-api-key'"
         )
 
-    return openai.OpenAI(api_key=api_key)
+    return api_key
+
+
+def create_openai_client() -> openai.OpenAI:
+    """
+    Create OpenAI client with API key validation.
+
+    SDK retries are disabled: IsoPrompt retries itself so that retries and
+    their backoff stay within the caller's deadline.
+    """
+    return openai.OpenAI(api_key=get_openai_api_key(), max_retries=0)
+
+
+def create_async_openai_client() -> openai.AsyncOpenAI:
+    """Create async OpenAI client with API key validation."""
+    return openai.AsyncOpenAI(api_key=get_openai_api_key(), max_retries=0)
+
+
+def get_openai_client() -> openai.OpenAI:
+    """
+    Get the shared client of the "openai" backend.
+
+    The client owns an HTTP connection pool, so it is created once per process
+    and reused by every call instead of paying the connection setup each time.
+    """
+    return get_backend_registry().get(OPENAI_BACKEND).client()
+
+
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """Get the shared async client of the "openai" backend."""
+    return get_backend_registry().get(OPENAI_BACKEND).async_client()
+
+
+def build_messages(
+    user_input: str,
+    mode: str = DEFAULT_MODE,
+    domain: Optional[str] = None,
+    verbose: bool = False,
+) -> List[Dict[str, str]]:
+    """
+    Build the chat messages for an optimization request.
+
+    Args:
+        user_input: The user's basic prompt or request
+        mode: Optimization mode
+        domain: Optional domain specialization
+        verbose: Whether to print verbose output
+    Returns:
+        The system and user messages to send to the model
+    """
+    # Get the optimization template
+    system_prompt = get_optimization_template(mode, domain)
+    user_prompt = f"User Query: {user_input}"
+
+    if verbose:
+        print(f"🔧 System Prompt: {system_prompt}.")
+        print(f"🔧 User Prompt: {user_prompt}.")
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+    if verbose:
+        print(f"🔧 Messages: {json.dumps(messages, indent=4)}.")
+
+    return messages
+
+
+def translate_error(error: Exception) -> IsoPromptError:
+    """
+    Translate an OpenAI SDK error into a typed IsoPrompt error.
+
+    Args:
+        error: The error raised while calling the API.
+
+    Returns:
+        The matching `IsoPromptError`.
+    """
+    if isinstance(error, IsoPromptError):
+        return error
+    message = f"Failed to optimize prompt: {error}."
+    if isinstance(error, (openai.APITimeoutError, asyncio.TimeoutError)):
+        return OptimizationTimeoutError(
+            "Failed to optimize prompt: Optimization deadline exceeded."
+            if isinstance(error, asyncio.TimeoutError)
+            else message
+        )
+    if isinstance(error, openai.RateLimitError):
+        retry_after = None
+        try:
+            retry_after = float(error.response.headers.get("retry-after", ""))
+        except (AttributeError, TypeError, ValueError):
+            pass
+        return RateLimitedError(message, retry_after=retry_after)
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        return UpstreamError(
+            message, status_code=status, retryable=status >= 500 or status == 408
+        )
+    if isinstance(error, openai.APIConnectionError):
+        return UpstreamError(message, retryable=True)
+    return UpstreamError(message)
+
+
+def _retry_delay(error: IsoPromptError, attempt: int) -> float:
+    """Seconds to wait before retrying after `error` on attempt `attempt`."""
+    if isinstance(error, RateLimitedError) and error.retry_after is not None:
+        return error.retry_after
+    backoff = min(DEFAULT_RETRY_BACKOFF * (2.0**attempt), MAX_RETRY_BACKOFF)
+    return backoff * random.uniform(0.5, 1.0)
+
+
+def _plan_retry(
+    error: IsoPromptError, attempt: int, max_retries: int, deadline: Deadline
+) -> Optional[float]:
+    """Return the delay before the next attempt, or None to give up."""
+    if not error.retryable or attempt >= max_retries:
+        return None
+    delay = _retry_delay(error, attempt)
+    remaining = deadline.remaining()
+    if remaining is not None and delay >= remaining:
+        # Waiting would overrun the deadline, so report the failure now.
+        return None
+    return delay
+
+
+def _http_timeout(deadline: Deadline) -> Any:
+    """The per-request HTTP timeout for the remaining time of a deadline."""
+    remaining = deadline.remaining()
+    return openai.NOT_GIVEN if remaining is None else remaining
+
+
+def resolve_ensemble_size(mode: str, ensemble_size: Optional[int] = None) -> int:
+    """
+    Get the number of candidates to generate for a request.
+
+    Args:
+        mode: The optimization mode.
+        ensemble_size: An explicit size, or None for the mode's default.
+
+    Returns:
+        `DEFAULT_ENSEMBLE_SIZE` for ensemble modes, 1 otherwise, unless
+        `ensemble_size` is given.
+    """
+    if ensemble_size is not None:
+        if ensemble_size < 1:
+            raise ValueError("Ensemble size must be at least 1.")
+        return ensemble_size
+    return DEFAULT_ENSEMBLE_SIZE if mode in ENSEMBLE_MODES else 1
+
+
+def _candidate_count(ensemble_size: int) -> Any:
+    """The `n` parameter for a completion, omitted for single candidates."""
+    return ensemble_size if ensemble_size > 1 else openai.NOT_GIVEN
+
+
+def _extract_content(response: Any) -> str:
+    """
+    Get the stripped message content of a completion.
+
+    When the completion has several candidates, the one that agrees most with
+    the others (by n-gram similarity) is returned.
+    """
+    candidates = [
+        str(choice.message.content).strip()
+        for choice in response.choices
+        if choice.message.content and choice.message.content.strip()
+    ]
+    if not candidates:
+        raise EmptyResponseError(
+            "Failed to optimize prompt: No content in OpenAI response."
+        )
+    best, _ = consensus(candidates)
+    return candidates[best]
+
+
+def _select_backend(
+    backend: Optional[str], mode: str, domain: Optional[str], model: str
+) -> Backend:
+    """Get the named backend, or route the request to one."""
+    return get_backend_registry().resolve(backend, mode, domain, model)
+
+
+def _should_fall_back(error: IsoPromptError, offline_fallback: bool) -> bool:
+    """
+    Whether to answer with the heuristic backend after an upstream failure.
+
+    Only failures a retry could have fixed (deadline exceeded, rate limits,
+    outages) fall back; rejected requests are still raised.
+    """
+    return offline_fallback and error.retryable
+
+
+def _record_attempt(
+    history: ModelHistory, model: str, started: float, meter: UsageMeter, ok: bool
+) -> None:
+    """Record one model attempt of `model="auto"` in the history."""
+    if ok and not meter.calls:
+        return  # Served from a cache or offline, so its latency means nothing.
+    history.record(model, time.monotonic() - started, ok)
+
+
+def _optimize_with_auto_model(
+    user_input: str,
+    mode: str,
+    deadline: Deadline,
+    verbose: bool,
+    usage: Optional[UsageMeter],
+    offline_fallback: bool,
+    attempt: Callable[[str, bool, UsageMeter], str],
+) -> str:
+    """
+    Optimize with the model picked for the request, escalating to larger
+    models on failure or on a low-quality prompt.
+
+    `attempt(model, offline_fallback, usage)` runs one optimization; only the
+    largest model may fall back to the offline optimizer.
+    """
+    history = get_model_history()
+    ladder = plan_models(user_input, mode, deadline.remaining(), history)
+    if verbose:
+        print(f"🔧 Auto-selected model: {ladder[0]}.")
+
+    for i, candidate in enumerate(ladder):
+        last = i == len(ladder) - 1
+        meter = UsageMeter()
+        started = time.monotonic()
+        try:
+            optimized = attempt(candidate, offline_fallback and last, meter)
+        except OptimizationCancelledError:
+            raise
+        except IsoPromptError as e:
+            _record_attempt(history, candidate, started, meter, False)
+            if last or deadline.expired():
+                raise
+            reason = str(e)
+        else:
+            ok = not is_low_quality(user_input, optimized)
+            _record_attempt(history, candidate, started, meter, ok)
+            if ok or last:
+                return optimized
+            reason = "a low-quality prompt"
+        finally:
+            if usage is not None:
+                usage.add(meter)
+        if verbose:
+            print(f"🔧 Escalating to {ladder[i + 1]} after: {reason}")
+    raise AssertionError("The escalation ladder is never empty.")
+
+
+async def _optimize_with_auto_model_async(
+    user_input: str,
+    mode: str,
+    deadline: Deadline,
+    usage: Optional[UsageMeter],
+    offline_fallback: bool,
+    attempt: Callable[[str, bool, UsageMeter], Awaitable[str]],
+) -> str:
+    """Async version of `_optimize_with_auto_model`."""
+    history = get_model_history()
+    ladder = plan_models(user_input, mode, deadline.remaining(), history)
+
+    for i, candidate in enumerate(ladder):
+        last = i == len(ladder) - 1
+        meter = UsageMeter()
+        started = time.monotonic()
+        try:
+            optimized = await attempt(candidate, offline_fallback and last, meter)
+        except IsoPromptError:
+            _record_attempt(history, candidate, started, meter, False)
+            if last or deadline.expired():
+                raise
+        else:
+            ok = not is_low_quality(user_input, optimized)
+            _record_attempt(history, candidate, started, meter, ok)
+            if ok or last:
+                return optimized
+        finally:
+            if usage is not None:
+                usage.add(meter)
+    raise AssertionError("The escalation ladder is never empty.")
+
+
+def _request_optimization(
+    user_input: str,
+    mode: str,
+    domain: Optional[str],
+    model: str,
+    temperature: float,
+    verbose: bool,
+    deadline: Deadline,
+    max_retries: int,
+    cancel_token: Optional[CancelToken],
+    usage: Optional[UsageMeter] = None,
+    ensemble_size: int = 1,
+    backend: Optional[Backend] = None,
+    messages: Optional[List[Dict[str, str]]] = None,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+) -> str:
+    """
+    Send one optimization request upstream, retrying transient failures.
+
+    `messages` replaces the standard optimization messages, and `max_tokens`
+    caps the completion.
+    """
+    backend = backend or get_backend_registry().get(OPENAI_BACKEND)
+    client = backend.client()
+
+    if verbose:
+        print(
+            f"🔧 Optimizing prompt with mode: {mode}, domain: {domain}, model: {model}, temperature: {temperature}."
+        )
+
+    if messages is None:
+        messages = build_messages(user_input, mode, domain, verbose)
+
+    attempt = 0
+    while True:
+        deadline.check()
+        if cancel_token is not None:
+            cancel_token.check()
+
+        try:
+            with backend.slot(deadline, cancel_token):
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,  # type: ignore
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    n=_candidate_count(ensemble_size),
+                    timeout=_http_timeout(deadline),
+                )
+            if usage is not None:
+                usage.record(getattr(response, "usage", None))
+            content = _extract_content(response)
+
+            if verbose:
+                print(f"🔧 Response: {content}.")
+
+            return content
+
+        except Exception as e:
+            error = translate_error(e)
+            delay = _plan_retry(error, attempt, max_retries, deadline)
+            if delay is None:
+                raise error from e
+            if verbose:
+                print(f"🔧 Retrying in {delay:.2f} seconds after: {error}")
+            if cancel_token is not None:
+                cancel_token.sleep(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+
+async def _request_optimization_async(
+    user_input: str,
+    mode: str,
+    domain: Optional[str],
+    model: str,
+    temperature: float,
+    verbose: bool,
+    deadline: Deadline,
+    max_retries: int,
+    usage: Optional[UsageMeter] = None,
+    ensemble_size: int = 1,
+    backend: Optional[Backend] = None,
+    messages: Optional[List[Dict[str, str]]] = None,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+) -> str:
+    """Async version of `_request_optimization`; cancel by cancelling the task."""
+    backend = backend or get_backend_registry().get(OPENAI_BACKEND)
+    client = backend.async_client()
+    if messages is None:
+        messages = build_messages(user_input, mode, domain, verbose)
+
+    attempt = 0
+    while True:
+        deadline.check()
+        try:
+            # The HTTP timeout bounds each read; wait_for bounds the whole call,
+            # including the wait for a concurrency slot.
+            async def create() -> Any:
+                async with backend.async_slot():
+                    return await client.chat.completions.create(
+                        model=model,
+                        messages=messages,  # type: ignore
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        n=_candidate_count(ensemble_size),
+                        timeout=_http_timeout(deadline),
+                    )
+
+            response = await asyncio.wait_for(create(), deadline.remaining())
+            if usage is not None:
+                usage.record(getattr(response, "usage", None))
+            return _extract_content(response)
+
+        except Exception as e:
+            error = translate_error(e)
+            delay = _plan_retry(error, attempt, max_retries, deadline)
+            if delay is None:
+                raise error from e
+            await asyncio.sleep(delay)
+            attempt += 1
 
 
 def optimize_prompt(
@@ -46,6 +513,20 @@ def optimize_prompt(
     model: str = DEFAULT_LLM_MODEL,
     temperature: float = DEFAULT_TEMPERATURE,
     verbose: bool = False,
+    use_cache: bool = False,
+    coalesce: bool = False,
+    semantic_cache: Optional["SemanticCache"] = None,
+    hedge: Optional[HedgePolicy] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cancel_token: Optional[CancelToken] = None,
+    usage: Optional[UsageMeter] = None,
+    ensemble_size: Optional[int] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+    data: Any = None,
+    ado: Union[bool, Dict[str, Any], DataOptions] = False,
 ) -> str:
     """
     Optimize a user's basic prompt into a high-quality, production-ready prompt.
@@ -53,56 +534,1024 @@ def optimize_prompt(
     Args:
         user_input: The user's basic prompt or request
         mode: Optimization mode (simple, reasoning, chain_of_thought,
-              creative, analytical)
+              creative, analytical), or "auto" to pick one from the input
+        domain: Optional domain specialization, or "auto" to pick one from
+                the input
+        model: OpenAI model to use for optimization, or "auto" to pick one
+               per request from the input size, the mode's strictness, the
+               time budget and each model's recent latency and error rate,
+               escalating to a larger model on failure or a low-quality prompt
+        temperature: Temperature for generation (lower = more focused)
+        verbose: Whether to print verbose output
+        use_cache: Whether to reuse results from the shared result cache
+        coalesce: Whether to share one upstream call between identical
+                  concurrent requests
+        semantic_cache: Optional cache that serves near-duplicate prompts
+        hedge: Optional policy that duplicates slow upstream calls
+        timeout: Optional total time budget in seconds, covering retries,
+                 backoff waits and the HTTP calls
+        deadline: Optional `Deadline` shared with other work; the earlier of
+                  `deadline` and `timeout` applies
+        max_retries: Retries for rate-limited or transient upstream failures
+        cancel_token: Optional token that aborts retries and waits
+        usage: Optional meter that accumulates the tokens of upstream calls
+        ensemble_size: Candidates to generate in one completion, keeping the
+                       consensus; defaults to 3 for ensemble modes
+                       (redundancy_verification) and 1 otherwise
+        backend: The name of the backend to use ("openai", "heuristic" to
+                 optimize offline and deterministically, or a configured
+                 backend); None routes the request by the configured rules
+        offline_fallback: Whether to answer with the heuristic backend when
+                          the upstream times out or is unavailable
+        data: Optional data to embed after the optimized prompt: a dict, a
+              list of records, or a JSON, JSONL or CSV string. The optimizer
+              only sees a summary of it.
+        ado: Whether to optimize `data` before embedding it: True prunes
+             empty fields and picks the encoding (CSV, compact JSON or
+             key: value lines) with the fewest tokens, and a dict or
+             `DataOptions` customizes this
+    Returns:
+        Optimized prompt string
+    Raises:
+        OptimizationTimeoutError: If the deadline is exceeded.
+        RateLimitedError: If the request stays rate limited.
+        UpstreamError: If the upstream API fails or rejects the request.
+        EmptyResponseError: If the upstream API returns no content.
+        OptimizationCancelledError: If `cancel_token` is cancelled.
+    """
+    encoded = prepare_data(data, ado, model, verbose) if data is not None else None
+    if encoded is not None:
+        optimized = optimize_prompt(
+            describe_data(user_input, encoded),
+            mode,
+            domain,
+            model,
+            temperature,
+            verbose,
+            use_cache,
+            coalesce,
+            semantic_cache,
+            hedge,
+            timeout,
+            deadline,
+            max_retries,
+            cancel_token,
+            usage,
+            ensemble_size,
+            backend,
+            offline_fallback,
+        )
+        return attach_data(optimized, encoded)
+    request_deadline = Deadline.resolve(deadline, timeout)
+    if AUTO in (mode, domain):
+        mode, domain = resolve_auto(user_input, mode, domain)
+        if verbose:
+            print(f"🔧 Auto-routed to mode: {mode}, domain: {domain}.")
+    if model == AUTO:
+
+        def attempt(candidate: str, fallback: bool, meter: UsageMeter) -> str:
+            return optimize_prompt(
+                user_input,
+                mode,
+                domain,
+                candidate,
+                temperature,
+                verbose,
+                use_cache,
+                coalesce,
+                semantic_cache,
+                hedge,
+                deadline=request_deadline,
+                max_retries=max_retries,
+                cancel_token=cancel_token,
+                usage=meter,
+                ensemble_size=ensemble_size,
+                backend=backend,
+                offline_fallback=fallback,
+            )
+
+        return _optimize_with_auto_model(
+            user_input,
+            mode,
+            request_deadline,
+            verbose,
+            usage,
+            offline_fallback,
+            attempt,
+        )
+    with journal_run(model, mode, domain, usage) as run:
+        selected = _select_backend(backend, mode, domain, model)
+        run.backend = selected.name
+        if selected.is_heuristic:
+            return optimize_prompt_heuristic(user_input, mode, domain)
+
+        n_candidates = resolve_ensemble_size(mode, ensemble_size)
+        cache_key = make_cache_key(
+            user_input,
+            mode,
+            domain,
+            model,
+            temperature,
+            n_candidates,
+            selected.name,
+        )
+        if use_cache:
+            cached = get_result_cache().get(cache_key)
+            if cached is not None:
+                run.cache_hit = True
+                if verbose:
+                    print("🔧 Result cache hit.")
+                return cached
+
+        if semantic_cache is not None:
+            similar = semantic_cache.lookup(
+                user_input, mode, domain, model, selected.name
+            )
+            if similar is not None:
+                run.cache_hit = True
+                if verbose:
+                    print("🔧 Semantic cache hit.")
+                return similar
+
+        def request() -> str:
+            def call() -> str:
+                return _request_optimization(
+                    user_input,
+                    mode,
+                    domain,
+                    model,
+                    temperature,
+                    verbose,
+                    request_deadline,
+                    max_retries,
+                    cancel_token,
+                    run.usage,
+                    n_candidates,
+                    selected,
+                )
+
+            return hedge.run(call) if hedge is not None else call()
+
+        try:
+            if coalesce:
+                optimized = get_sync_singleflight().do(
+                    cache_key, request, timeout=request_deadline.remaining()
+                )
+            else:
+                optimized = request()
+        except IsoPromptError as e:
+            if not _should_fall_back(e, offline_fallback):
+                raise
+            if verbose:
+                print(f"🔧 Falling back to the offline optimizer after: {e}")
+            # Degraded results are not cached.
+            run.outcome = "fallback"
+            return optimize_prompt_heuristic(user_input, mode, domain)
+
+        if use_cache:
+            get_result_cache().set(cache_key, optimized)
+        if semantic_cache is not None:
+            semantic_cache.add(
+                user_input, mode, domain, model, optimized, selected.name
+            )
+        return optimized
+
+
+async def optimize_prompt_async(
+    user_input: str,
+    mode: str = DEFAULT_MODE,
+    domain: Optional[str] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    verbose: bool = False,
+    use_cache: bool = False,
+    coalesce: bool = False,
+    semantic_cache: Optional["SemanticCache"] = None,
+    hedge: Optional[HedgePolicy] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    usage: Optional[UsageMeter] = None,
+    ensemble_size: Optional[int] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+    data: Any = None,
+    ado: Union[bool, Dict[str, Any], DataOptions] = False,
+) -> str:
+    """
+    Async version of `optimize_prompt`, sharing its client pool and caches.
+
+    Args:
+        user_input: The user's basic prompt or request
+        mode: Optimization mode
         domain: Optional domain specialization
         model: OpenAI model to use for optimization
         temperature: Temperature for generation (lower = more focused)
         verbose: Whether to print verbose output
+        use_cache: Whether to reuse results from the shared result cache
+        coalesce: Whether to share one upstream call between identical
+                  concurrent requests
+        semantic_cache: Optional cache that serves near-duplicate prompts
+        hedge: Optional policy that duplicates slow upstream calls
+        timeout: Optional total time budget in seconds, covering retries,
+                 backoff waits and the HTTP calls
+        deadline: Optional `Deadline` shared with other work; the earlier of
+                  `deadline` and `timeout` applies
+        max_retries: Retries for rate-limited or transient upstream failures
+        usage: Optional meter that accumulates the tokens of upstream calls
+        ensemble_size: Candidates to generate in one completion, keeping the
+                       consensus
+        backend: The name of the backend to use; None routes the request
+        offline_fallback: Whether to answer with the heuristic backend when
+                          the upstream times out or is unavailable
+        data: Optional data to embed after the optimized prompt
+        ado: Whether and how to optimize `data` before embedding it
     Returns:
         Optimized prompt string
+    Raises:
+        The same typed errors as `optimize_prompt`. Cancel the awaiting task
+        to abort an in-flight call.
     """
-    client = create_openai_client()
+    encoded = prepare_data(data, ado, model, verbose) if data is not None else None
+    if encoded is not None:
+        optimized = await optimize_prompt_async(
+            describe_data(user_input, encoded),
+            mode,
+            domain,
+            model,
+            temperature,
+            verbose,
+            use_cache,
+            coalesce,
+            semantic_cache,
+            hedge,
+            timeout,
+            deadline,
+            max_retries,
+            usage,
+            ensemble_size,
+            backend,
+            offline_fallback,
+        )
+        return attach_data(optimized, encoded)
+    request_deadline = Deadline.resolve(deadline, timeout)
+    mode, domain = resolve_auto(user_input, mode, domain)
+    if model == AUTO:
 
-    if verbose:
-        print(
-            f"🔧 Optimizing prompt with mode: {mode}, domain: {domain}, model: {model}, temperature: {temperature}."
+        def attempt(
+            candidate: str, fallback: bool, meter: UsageMeter
+        ) -> Awaitable[str]:
+            return optimize_prompt_async(
+                user_input,
+                mode,
+                domain,
+                candidate,
+                temperature,
+                verbose,
+                use_cache,
+                coalesce,
+                semantic_cache,
+                hedge,
+                deadline=request_deadline,
+                max_retries=max_retries,
+                usage=meter,
+                ensemble_size=ensemble_size,
+                backend=backend,
+                offline_fallback=fallback,
+            )
+
+        return await _optimize_with_auto_model_async(
+            user_input, mode, request_deadline, usage, offline_fallback, attempt
         )
+    with journal_run(model, mode, domain, usage) as run:
+        selected = _select_backend(backend, mode, domain, model)
+        run.backend = selected.name
+        if selected.is_heuristic:
+            return optimize_prompt_heuristic(user_input, mode, domain)
 
-    # Get the optimization template
-    system_prompt = get_optimization_template(mode, domain)
-    user_prompt = f"User Query: {user_input}"
+        n_candidates = resolve_ensemble_size(mode, ensemble_size)
+        cache_key = make_cache_key(
+            user_input,
+            mode,
+            domain,
+            model,
+            temperature,
+            n_candidates,
+            selected.name,
+        )
+        if use_cache:
+            cached = get_result_cache().get(cache_key)
+            if cached is not None:
+                run.cache_hit = True
+                return cached
 
-    if verbose:
-        print(f"🔧 System Prompt: {system_prompt}.")
-        print(f"🔧 User Prompt: {user_prompt}.")
+        if semantic_cache is not None:
+            similar = semantic_cache.lookup(
+                user_input, mode, domain, model, selected.name
+            )
+            if similar is not None:
+                run.cache_hit = True
+                return similar
 
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt},
-    ]
+        def request() -> Awaitable[str]:
+            def call() -> Awaitable[str]:
+                return _request_optimization_async(
+                    user_input,
+                    mode,
+                    domain,
+                    model,
+                    temperature,
+                    verbose,
+                    request_deadline,
+                    max_retries,
+                    run.usage,
+                    n_candidates,
+                    selected,
+                )
+
+            return hedge.run_async(call) if hedge is not None else call()
+
+        try:
+            if coalesce:
+                optimized = await get_async_singleflight().do(
+                    cache_key, request, timeout=request_deadline.remaining()
+                )
+            else:
+                optimized = await request()
+        except IsoPromptError as e:
+            if not _should_fall_back(e, offline_fallback):
+                raise
+            run.outcome = "fallback"
+            return optimize_prompt_heuristic(user_input, mode, domain)
+
+        if use_cache:
+            get_result_cache().set(cache_key, optimized)
+        if semantic_cache is not None:
+            semantic_cache.add(
+                user_input, mode, domain, model, optimized, selected.name
+            )
+        return optimized
+
+
+def reoptimize_prompt(
+    previous_input: str,
+    previous_output: str,
+    user_input: str,
+    mode: str = DEFAULT_MODE,
+    domain: Optional[str] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_change_ratio: float = DEFAULT_MAX_PATCH_RATIO,
+    verbose: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cancel_token: Optional[CancelToken] = None,
+    usage: Optional[UsageMeter] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> IncrementalResult:
+    """
+    Re-optimize an edited prompt by patching its previous optimized prompt.
+
+    The edited request is diffed sentence by sentence against the previous
+    one, and the model only writes edits for the changed sentences, which
+    takes far fewer output tokens than regenerating the whole prompt. The
+    prompt is optimized from scratch instead when the changed share of the
+    request exceeds `max_change_ratio`, when the backend is the heuristic
+    one, or when the model's edits do not apply.
+
+    Args:
+        previous_input: The request that `previous_output` was optimized from
+        previous_output: The previous optimized prompt
+        user_input: The edited request
+        mode: Optimization mode, or "auto" to pick one from the input
+        domain: Optional domain specialization, or "auto"
+        model: OpenAI model to use, or "auto"
+        temperature: Temperature for generation (lower = more focused)
+        max_change_ratio: Share of changed characters, from 0.0 to 1.0, above
+                          which the prompt is optimized from scratch
+        verbose: Whether to print verbose output
+        timeout: Optional total time budget in seconds
+        deadline: Optional `Deadline` shared with other work
+        max_retries: Retries for rate-limited or transient upstream failures
+        cancel_token: Optional token that aborts retries and waits
+        usage: Optional meter that accumulates the tokens of upstream calls
+        backend: The name of the backend to use; None routes the request
+        offline_fallback: Whether to answer with the heuristic backend when
+                          the upstream times out or is unavailable
+    Returns:
+        The new optimized prompt and how it was produced
+    Raises:
+        The same typed errors as `optimize_prompt`.
+    """
+    started = time.monotonic()
+    request_deadline = Deadline.resolve(deadline, timeout)
+    meter = UsageMeter()
+    diff, ratio = diff_inputs(previous_input, user_input)
+
+    def finish(optimized: str, strategy: str, edits: int = 0) -> IncrementalResult:
+        if usage is not None:
+            usage.add(meter)
+        if verbose:
+            print(f"🔧 Re-optimized with strategy: {strategy}.")
+        return IncrementalResult(
+            optimized_prompt=optimized,
+            strategy=strategy,
+            change_ratio=ratio,
+            edits=edits,
+            prompt_tokens=meter.prompt_tokens,
+            completion_tokens=meter.completion_tokens,
+            duration_seconds=time.monotonic() - started,
+        )
+
+    if not diff:
+        return finish(previous_output, "unchanged")
+    if AUTO in (mode, domain):
+        mode, domain = resolve_auto(user_input, mode, domain)
+    patch_model = model
+    if model == AUTO:
+        patch_model = plan_models(
+            user_input, mode, request_deadline.remaining(), get_model_history()
+        )[0]
+    selected = _select_backend(backend, mode, domain, patch_model)
+
+    if ratio <= max_change_ratio and not selected.is_heuristic:
+        # The meter receives the run's tokens when the `with` block exits.
+        patched: Optional[Tuple[str, str, int]] = None
+        with journal_run(patch_model, mode, domain, meter) as run:
+            run.backend = selected.name
+            try:
+                content = _request_optimization(
+                    user_input,
+                    mode,
+                    domain,
+                    patch_model,
+                    temperature,
+                    verbose,
+                    request_deadline,
+                    max_retries,
+                    cancel_token,
+                    run.usage,
+                    1,
+                    selected,
+                    messages=build_patch_messages(previous_output, diff, mode, domain),
+                    max_tokens=PATCH_MAX_TOKENS,
+                )
+            except IsoPromptError as e:
+                if not _should_fall_back(e, offline_fallback):
+                    raise
+                run.outcome = "fallback"
+                heuristic = optimize_prompt_heuristic(user_input, mode, domain)
+                patched = (heuristic, "full", 0)
+            else:
+                try:
+                    edits = parse_edits(content)
+                    patched = (apply_edits(previous_output, edits), "patch", len(edits))
+                except ValueError as e:
+                    # The prompt is still produced, by the full optimization below.
+                    run.outcome = "fallback"
+                    if verbose:
+                        print(
+                            f"🔧 Optimizing from scratch after an unusable patch: {e}"
+                        )
+        if patched is not None:
+            return finish(*patched)
+
+    optimized = optimize_prompt(
+        user_input,
+        mode,
+        domain,
+        model,
+        temperature,
+        verbose,
+        deadline=request_deadline,
+        max_retries=max_retries,
+        cancel_token=cancel_token,
+        usage=meter,
+        backend=backend,
+        offline_fallback=offline_fallback,
+    )
+    return finish(optimized, "full")
+
+
+async def reoptimize_prompt_async(
+    previous_input: str,
+    previous_output: str,
+    user_input: str,
+    mode: str = DEFAULT_MODE,
+    domain: Optional[str] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_change_ratio: float = DEFAULT_MAX_PATCH_RATIO,
+    verbose: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    usage: Optional[UsageMeter] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> IncrementalResult:
+    """
+    Async version of `reoptimize_prompt`.
+
+    Raises:
+        The same typed errors as `optimize_prompt`. Cancel the awaiting task
+        to abort an in-flight call.
+    """
+    started = time.monotonic()
+    request_deadline = Deadline.resolve(deadline, timeout)
+    meter = UsageMeter()
+    diff, ratio = diff_inputs(previous_input, user_input)
+
+    def finish(optimized: str, strategy: str, edits: int = 0) -> IncrementalResult:
+        if usage is not None:
+            usage.add(meter)
+        return IncrementalResult(
+            optimized_prompt=optimized,
+            strategy=strategy,
+            change_ratio=ratio,
+            edits=edits,
+            prompt_tokens=meter.prompt_tokens,
+            completion_tokens=meter.completion_tokens,
+            duration_seconds=time.monotonic() - started,
+        )
+
+    if not diff:
+        return finish(previous_output, "unchanged")
+    mode, domain = resolve_auto(user_input, mode, domain)
+    patch_model = model
+    if model == AUTO:
+        patch_model = plan_models(
+            user_input, mode, request_deadline.remaining(), get_model_history()
+        )[0]
+    selected = _select_backend(backend, mode, domain, patch_model)
+
+    if ratio <= max_change_ratio and not selected.is_heuristic:
+        # The meter receives the run's tokens when the `with` block exits.
+        patched: Optional[Tuple[str, str, int]] = None
+        with journal_run(patch_model, mode, domain, meter) as run:
+            run.backend = selected.name
+            try:
+                content = await _request_optimization_async(
+                    user_input,
+                    mode,
+                    domain,
+                    patch_model,
+                    temperature,
+                    verbose,
+                    request_deadline,
+                    max_retries,
+                    run.usage,
+                    1,
+                    selected,
+                    messages=build_patch_messages(previous_output, diff, mode, domain),
+                    max_tokens=PATCH_MAX_TOKENS,
+                )
+            except IsoPromptError as e:
+                if not _should_fall_back(e, offline_fallback):
+                    raise
+                run.outcome = "fallback"
+                heuristic = optimize_prompt_heuristic(user_input, mode, domain)
+                patched = (heuristic, "full", 0)
+            else:
+                try:
+                    edits = parse_edits(content)
+                    patched = (apply_edits(previous_output, edits), "patch", len(edits))
+                except ValueError:
+                    run.outcome = "fallback"
+        if patched is not None:
+            return finish(*patched)
 
+    optimized = await optimize_prompt_async(
+        user_input,
+        mode,
+        domain,
+        model,
+        temperature,
+        verbose,
+        deadline=request_deadline,
+        max_retries=max_retries,
+        usage=meter,
+        backend=backend,
+        offline_fallback=offline_fallback,
+    )
+    return finish(optimized, "full")
+
+
+def _reduce_model(
+    model: str, mode: str, messages: List[Dict[str, str]], deadline: Deadline
+) -> str:
+    """The model of a reduce call; "auto" picks one for the outline."""
+    if model != AUTO:
+        return model
+    outline = messages[-1]["content"]
+    return plan_models(outline, mode, deadline.remaining(), get_model_history())[0]
+
+
+def optimize_chunked(
+    user_input: str,
+    mode: str = DEFAULT_MODE,
+    domain: Optional[str] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    verbose: bool = False,
+    use_cache: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cancel_token: Optional[CancelToken] = None,
+    usage: Optional[UsageMeter] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> str:
+    """
+    Optimize an input too long for one call by map-reduce.
+
+    The input is split on structural boundaries into balanced chunks of at
+    most `max_chunk_tokens` tokens, the chunks are optimized in parallel into
+    sections of the final prompt, and a reduce call that sees an outline of
+    the sections writes the opening and closing that join them. An input
+    that fits in one chunk is optimized by `optimize_prompt`.
+
+    Args:
+        user_input: The user's long prompt or document
+        mode: Optimization mode, or "auto" to pick one from the input
+        domain: Optional domain specialization, or "auto"
+        model: OpenAI model to use, or "auto"
+        temperature: Temperature for generation (lower = more focused)
+        max_chunk_tokens: The maximum input tokens of a chunk; pick it well
+                          within the model's context window
+        max_concurrency: The maximum chunks optimized at once; the run takes
+                         about one call per wave of chunks
+        verbose: Whether to print verbose output
+        use_cache: Whether to reuse results from the shared result cache
+        timeout: Optional total time budget in seconds
+        deadline: Optional `Deadline` shared with other work
+        max_retries: Retries for rate-limited or transient upstream failures
+        cancel_token: Optional token that aborts every call
+        usage: Optional meter that accumulates the tokens of upstream calls
+        backend: The name of the backend to use; None routes the request
+        offline_fallback: Whether to answer with the heuristic backend when
+                          the upstream times out or is unavailable
+    Returns:
+        Optimized prompt string
+    Raises:
+        The same typed errors as `optimize_prompt`; the first failing chunk
+        cancels the others.
+    """
+    request_deadline = Deadline.resolve(deadline, timeout)
+    if AUTO in (mode, domain):
+        mode, domain = resolve_auto(user_input, mode, domain)
+    chunks = split_input(user_input, max_chunk_tokens, None if model == AUTO else model)
+    selected = _select_backend(backend, mode, domain, model)
+    if len(chunks) <= 1 or selected.is_heuristic:
+        return optimize_prompt(
+            user_input,
+            mode,
+            domain,
+            model,
+            temperature,
+            verbose,
+            use_cache,
+            deadline=request_deadline,
+            max_retries=max_retries,
+            cancel_token=cancel_token,
+            usage=usage,
+            backend=backend,
+            offline_fallback=offline_fallback,
+        )
     if verbose:
-        print(f"🔧 Messages: {json.dumps(messages, indent=4)}.")
+        print(f"🔧 Optimizing {len(chunks)} chunks in parallel.")
+
+    chunk_token = CancelToken()
+    if cancel_token is not None:
+        cancel_token.add_callback(chunk_token.cancel)
+
+    def optimize_chunk(index: int, chunk: str) -> str:
+        return optimize_prompt(
+            frame_chunk(chunk, index, len(chunks)),
+            mode,
+            domain,
+            model,
+            temperature,
+            use_cache=use_cache,
+            deadline=request_deadline,
+            max_retries=max_retries,
+            cancel_token=chunk_token,
+            usage=usage,
+            backend=backend,
+        )
 
+    failure: Optional[BaseException] = None
+    workers = max(1, min(len(chunks), max_concurrency))
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,  # type: ignore
-            temperature=temperature,
-            max_tokens=DEFAULT_MAX_TOKENS,
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(optimize_chunk, i, chunk)
+                for i, chunk in enumerate(chunks, 1)
+            ]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException as e:
+                failure = e
+                chunk_token.cancel()
+    finally:
+        if cancel_token is not None:
+            cancel_token.remove_callback(chunk_token.cancel)
+    if failure is not None:
+        if isinstance(failure, IsoPromptError) and _should_fall_back(
+            failure, offline_fallback
+        ):
+            if verbose:
+                print(f"🔧 Falling back to the offline optimizer after: {failure}")
+            return optimize_prompt_heuristic(user_input, mode, domain)
+        raise failure
+    sections = [future.result() for future in futures]
+
+    messages = build_reduce_messages(sections, mode, domain)
+    reduce_model = _reduce_model(model, mode, messages, request_deadline)
+    with journal_run(reduce_model, mode, domain, usage) as run:
+        reducer = _select_backend(backend, mode, domain, reduce_model)
+        run.backend = reducer.name
+        try:
+            reduced = _request_optimization(
+                messages[-1]["content"],
+                mode,
+                domain,
+                reduce_model,
+                temperature,
+                verbose,
+                request_deadline,
+                max_retries,
+                cancel_token,
+                run.usage,
+                1,
+                reducer,
+                messages=messages,
+                max_tokens=REDUCE_MAX_TOKENS,
+            )
+        except IsoPromptError as e:
+            if not _should_fall_back(e, offline_fallback):
+                raise
+            # The sections still make a prompt without an opening and closing.
+            run.outcome = "fallback"
+            reduced = ""
+    return assemble_sections(reduced, sections)
+
+
+async def optimize_chunked_async(
+    user_input: str,
+    mode: str = DEFAULT_MODE,
+    domain: Optional[str] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    verbose: bool = False,
+    use_cache: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    usage: Optional[UsageMeter] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> str:
+    """
+    Async version of `optimize_chunked`.
+
+    Raises:
+        The same typed errors as `optimize_prompt`. Cancel the awaiting task
+        to abort every in-flight call.
+    """
+    request_deadline = Deadline.resolve(deadline, timeout)
+    mode, domain = resolve_auto(user_input, mode, domain)
+    chunks = split_input(user_input, max_chunk_tokens, None if model == AUTO else model)
+    selected = _select_backend(backend, mode, domain, model)
+    if len(chunks) <= 1 or selected.is_heuristic:
+        return await optimize_prompt_async(
+            user_input,
+            mode,
+            domain,
+            model,
+            temperature,
+            verbose,
+            use_cache,
+            deadline=request_deadline,
+            max_retries=max_retries,
+            usage=usage,
+            backend=backend,
+            offline_fallback=offline_fallback,
         )
 
-        content = response.choices[0].message.content
-        if not content:
-            raise ValueError("No content in OpenAI response.")
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
-        if verbose:
-            print(f"🔧 Response: {content}.")
+    async def optimize_chunk(index: int, chunk: str) -> str:
+        async with semaphore:
+            return await optimize_prompt_async(
+                frame_chunk(chunk, index, len(chunks)),
+                mode,
+                domain,
+                model,
+                temperature,
+                use_cache=use_cache,
+                deadline=request_deadline,
+                max_retries=max_retries,
+                usage=usage,
+                backend=backend,
+            )
+
+    tasks = [
+        asyncio.ensure_future(optimize_chunk(i, chunk))
+        for i, chunk in enumerate(chunks, 1)
+    ]
+    try:
+        sections = await asyncio.gather(*tasks)
+    except IsoPromptError as e:
+        if not _should_fall_back(e, offline_fallback):
+            raise
+        return optimize_prompt_heuristic(user_input, mode, domain)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    messages = build_reduce_messages(sections, mode, domain)
+    reduce_model = _reduce_model(model, mode, messages, request_deadline)
+    with journal_run(reduce_model, mode, domain, usage) as run:
+        reducer = _select_backend(backend, mode, domain, reduce_model)
+        run.backend = reducer.name
+        try:
+            reduced = await _request_optimization_async(
+                messages[-1]["content"],
+                mode,
+                domain,
+                reduce_model,
+                temperature,
+                verbose,
+                request_deadline,
+                max_retries,
+                run.usage,
+                1,
+                reducer,
+                messages=messages,
+                max_tokens=REDUCE_MAX_TOKENS,
+            )
+        except IsoPromptError as e:
+            if not _should_fall_back(e, offline_fallback):
+                raise
+            run.outcome = "fallback"
+            reduced = ""
+    return assemble_sections(reduced, sections)
 
-        return content.strip()
 
+async def _stream_optimization_async(
+    user_input: str,
+    mode: str,
+    domain: Optional[str],
+    model: str,
+    temperature: float,
+    verbose: bool,
+    deadline: Deadline,
+    backend: Backend,
+) -> AsyncIterator[str]:
+    """Stream one optimization request from upstream within a deadline."""
+    client = backend.async_client()
+    messages = build_messages(user_input, mode, domain, verbose)
+
+    deadline.check()
+    try:
+        # The slot is held until the stream ends.
+        async with backend.async_slot():
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=messages,  # type: ignore
+                temperature=temperature,
+                max_tokens=DEFAULT_MAX_TOKENS,
+                stream=True,
+                timeout=_http_timeout(deadline),
+            )
+            async for chunk in stream:  # type: ignore[union-attr]
+                deadline.check()
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
     except Exception as e:
-        raise Exception(f"Failed to optimize prompt: {e}.")
+        raise translate_error(e) from e
+
+
+async def stream_optimize_prompt_async(
+    user_input: str,
+    mode: str = DEFAULT_MODE,
+    domain: Optional[str] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    verbose: bool = False,
+    use_cache: bool = False,
+    hedge: Optional[HedgePolicy] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Stream an optimized prompt as it is generated.
+
+    Args:
+        user_input: The user's basic prompt or request
+        mode: Optimization mode
+        domain: Optional domain specialization
+        model: OpenAI model to use for optimization
+        temperature: Temperature for generation (lower = more focused)
+        verbose: Whether to print verbose output
+        use_cache: Whether to reuse results from the shared result cache
+        hedge: Optional policy that duplicates the request when its first
+               token is slow to arrive
+        timeout: Optional total time budget in seconds for the whole stream
+        deadline: Optional `Deadline` shared with other work
+        backend: The name of the backend to use; None routes the request
+        offline_fallback: Whether to answer with the heuristic backend when
+                          the upstream fails before the first chunk
+    Yields:
+        Chunks of the optimized prompt, in order. Ensemble modes need every
+        candidate before choosing one, and the heuristic backend has no
+        stream, so they yield the whole prompt once.
+    """
+    mode, domain = resolve_auto(user_input, mode, domain)
+    if model == AUTO:
+        # Chunks already sent cannot be escalated, so only the first choice
+        # of the model policy is used.
+        budget = Deadline.resolve(deadline, timeout).remaining()
+        model = plan_models(user_input, mode, budget)[0]
+    selected = _select_backend(backend, mode, domain, model)
+    if selected.is_heuristic or resolve_ensemble_size(mode) > 1:
+        yield await optimize_prompt_async(
+            user_input,
+            mode,
+            domain,
+            model,
+            temperature,
+            verbose,
+            use_cache=use_cache,
+            hedge=hedge,
+            timeout=timeout,
+            deadline=deadline,
+            backend=selected.name,
+            offline_fallback=offline_fallback,
+        )
+        return
+
+    with journal_run(model, mode, domain) as run:
+        run.backend = selected.name
+        cache_key = make_cache_key(
+            user_input, mode, domain, model, temperature, backend=selected.name
+        )
+        if use_cache:
+            cached = get_result_cache().get(cache_key)
+            if cached is not None:
+                run.cache_hit = True
+                yield cached
+                return
+
+        stream_deadline = Deadline.resolve(deadline, timeout)
+
+        def request() -> AsyncIterator[str]:
+            return _stream_optimization_async(
+                user_input,
+                mode,
+                domain,
+                model,
+                temperature,
+                verbose,
+                stream_deadline,
+                selected,
+            )
+
+        stream = hedge.stream_async(request) if hedge is not None else request()
+        parts: List[str] = []
+        try:
+            async for delta in stream:
+                parts.append(delta)
+                yield delta
+        except IsoPromptError as e:
+            # Chunks already sent cannot be taken back.
+            if parts or not _should_fall_back(e, offline_fallback):
+                raise
+            run.outcome = "fallback"
+            yield optimize_prompt_heuristic(user_input, mode, domain)
+            return
+
+        optimized = "".join(parts).strip()
+        if not optimized:
+            raise EmptyResponseError(
+                "Failed to optimize prompt: No content in OpenAI response."
+            )
+        if use_cache:
+            get_result_cache().set(cache_key, optimized)
 
 
 def validate_config(config: Dict[str, Any]) -> None:
@@ -117,17 +1566,21 @@ def validate_config(config: Dict[str, Any]) -> None:
         temperature: The temperature to use for optimization.
 
     Raises:
-        ValueError: If the mode, domain, or temperature is invalid.
+        ValueError: If the mode, domain, temperature or model is invalid. Mode
+            and domain may also be "auto"; the model must be "auto" or served
+            by one of the configured backends.
     """
 
     if not config:
         raise ValueError("No configuration provided.")
 
-    if config.get("mode") and not is_mode_valid(config["mode"]):
+    mode = config.get("mode")
+    if mode and mode != AUTO and not is_mode_valid(mode):
         mode_names = get_available_mode_names()
         raise ValueError(f"Invalid mode. Available: {mode_names}.")
 
-    if config.get("domain") and not is_domain_valid(config["domain"]):
+    domain = config.get("domain")
+    if domain and domain != AUTO and not is_domain_valid(domain):
         domain_names = get_available_domain_names()
         raise ValueError(f"Invalid domain. Available: {domain_names}.")
 
@@ -136,5 +1589,6 @@ def validate_config(config: Dict[str, Any]) -> None:
         raise ValueError("Temperature must be between 0.0 and 2.0.")
 
     model = config.get("model", DEFAULT_LLM_MODEL)
-    if model not in SUPPORTED_LLM_MODELS:
-        raise ValueError(f"Invalid model. Available: {SUPPORTED_LLM_MODELS}.")
+    registry = get_backend_registry()
+    if model != AUTO and not registry.is_model_supported(model):
+        raise ValueError(f"Invalid model. Available: {registry.models}.")
@@ -0,0 +1,262 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Multi-pass refinement of optimized prompts.
+
+Pass N re-optimizes the output of pass N-1. Refinement stops early once two
+consecutive passes are nearly identical by local n-gram similarity, or when
+the next pass would not fit in the token or time budget, so extra passes are
+only paid for while they still change the prompt.
+"""
+
+import time
+from typing import List, Optional
+
+from .constants import (
+    DEFAULT_LLM_MODEL,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MODE,
+    DEFAULT_TEMPERATURE,
+)
+from .deadline import CancelToken, Deadline
+from .errors import OptimizationTimeoutError
+from .models import RefinementOptions, RefinementResult
+from .optimizer import optimize_prompt, optimize_prompt_async
+from .routing import resolve_auto
+from .similarity import jaccard_similarity
+from .usage import UsageMeter
+
+
+class _Refinement:
+    """
+    The bookkeeping shared by the sync and async refinement loops.
+    """
+
+    def __init__(self, options: RefinementOptions, deadline: Deadline) -> None:
+        self.options = options
+        self.deadline = deadline
+        self.usage = UsageMeter()
+        self.similarities: List[float] = []
+        self.passes = 0
+        self.stop_reason = "max_passes"
+        self.started = time.monotonic()
+        self._pass_started = self.started
+        self._pass_tokens_before = 0
+        self._last_pass_seconds = 0.0
+        self._last_pass_tokens = 0
+
+    def start_pass(self) -> bool:
+        """Return whether another pass should run, recording why not."""
+        if self.passes >= self.options.passes:
+            return False
+        if self.passes:
+            budget = self.options.token_budget
+            # The next pass re-sends the previous output, so it costs about
+            # as much as the previous pass did.
+            if (
+                budget is not None
+                and self.usage.total_tokens + self._last_pass_tokens > budget
+            ):
+                self.stop_reason = "token_budget"
+                return False
+            remaining = self.deadline.remaining()
+            if remaining is not None and remaining < self._last_pass_seconds:
+                self.stop_reason = "deadline"
+                return False
+        self._pass_started = time.monotonic()
+        self._pass_tokens_before = self.usage.total_tokens
+        return True
+
+    def finish_pass(self, previous: Optional[str], refined: str) -> bool:
+        """Record a finished pass and return whether the prompt converged."""
+        self.passes += 1
+        self._last_pass_seconds = time.monotonic() - self._pass_started
+        self._last_pass_tokens = self.usage.total_tokens - self._pass_tokens_before
+        if previous is None:
+            return False
+        similarity = jaccard_similarity(previous, refined)
+        self.similarities.append(round(similarity, 4))
+        if similarity >= self.options.convergence_threshold:
+            self.stop_reason = "converged"
+            return True
+        return False
+
+    def result(self, optimized: str) -> RefinementResult:
+        """Build the result of the refinement."""
+        return RefinementResult(
+            optimized_prompt=optimized,
+            passes=self.passes,
+            similarities=self.similarities,
+            stop_reason=self.stop_reason,
+            total_tokens=self.usage.total_tokens,
+            duration_seconds=time.monotonic() - self.started,
+        )
+
+
+def refine_prompt(
+    user_input: str,
+    mode: str = DEFAULT_MODE,
+    domain: Optional[str] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    options: RefinementOptions = RefinementOptions(),
+    verbose: bool = False,
+    use_cache: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cancel_token: Optional[CancelToken] = None,
+    usage: Optional[UsageMeter] = None,
+    ensemble_size: Optional[int] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> RefinementResult:
+    """
+    Optimize a prompt, then re-optimize the result until it converges.
+
+    Args:
+        user_input: The user's basic prompt or request
+        mode: Optimization mode
+        domain: Optional domain specialization
+        model: OpenAI model to use for optimization
+        temperature: Temperature for generation (lower = more focused)
+        options: Maximum passes, convergence threshold and token budget
+        verbose: Whether to print verbose output
+        use_cache: Whether to reuse results from the shared result cache
+        timeout: Optional time budget in seconds for all passes
+        deadline: Optional `Deadline` shared with other work
+        max_retries: Retries per pass for transient upstream failures
+        cancel_token: Optional token that aborts the refinement
+        usage: Optional meter that accumulates the tokens of all passes
+        ensemble_size: Candidates generated per pass, keeping the consensus;
+                       defaults to the mode's ensemble size
+        backend: The name of the backend to use, or None to route the request
+        offline_fallback: Whether a pass whose upstream call times out or
+                          fails transiently gets a heuristic result instead
+    Returns:
+        The last pass's prompt, with the number of passes and why refinement
+        stopped. Only the first pass raises on timeout; a later pass that runs
+        out of time ends refinement with the previous pass's prompt.
+    """
+    # Route "auto" once on the user's request; later passes only see the
+    # previous pass's output.
+    mode, domain = resolve_auto(user_input, mode, domain)
+    refinement = _Refinement(options, Deadline.resolve(deadline, timeout))
+    current: Optional[str] = None
+
+    while refinement.start_pass():
+        try:
+            refined = optimize_prompt(
+                user_input=current if current is not None else user_input,
+                mode=mode,
+                domain=domain,
+                model=model,
+                temperature=temperature,
+                verbose=verbose,
+                use_cache=use_cache,
+                deadline=refinement.deadline,
+                max_retries=max_retries,
+                cancel_token=cancel_token,
+                usage=refinement.usage,
+                ensemble_size=ensemble_size,
+                backend=backend,
+                offline_fallback=offline_fallback,
+            )
+        except OptimizationTimeoutError:
+            if current is None:
+                raise
+            refinement.stop_reason = "deadline"
+            break
+
+        converged = refinement.finish_pass(current, refined)
+        current = refined
+        if verbose:
+            print(f"🔧 Refinement pass {refinement.passes} complete.")
+        if converged:
+            break
+
+    if usage is not None:
+        usage.add(refinement.usage)
+    assert current is not None
+    return refinement.result(current)
+
+
+async def refine_prompt_async(
+    user_input: str,
+    mode: str = DEFAULT_MODE,
+    domain: Optional[str] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    options: RefinementOptions = RefinementOptions(),
+    verbose: bool = False,
+    use_cache: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    usage: Optional[UsageMeter] = None,
+    ensemble_size: Optional[int] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> RefinementResult:
+    """
+    Async version of `refine_prompt`.
+
+    Args:
+        user_input: The user's basic prompt or request
+        mode: Optimization mode
+        domain: Optional domain specialization
+        model: OpenAI model to use for optimization
+        temperature: Temperature for generation (lower = more focused)
+        options: Maximum passes, convergence threshold and token budget
+        verbose: Whether to print verbose output
+        use_cache: Whether to reuse results from the shared result cache
+        timeout: Optional time budget in seconds for all passes
+        deadline: Optional `Deadline` shared with other work
+        max_retries: Retries per pass for transient upstream failures
+        usage: Optional meter that accumulates the tokens of all passes
+        ensemble_size: Candidates generated per pass, keeping the consensus;
+                       defaults to the mode's ensemble size
+        backend: The name of the backend to use, or None to route the request
+        offline_fallback: Whether a pass whose upstream call times out or
+                          fails transiently gets a heuristic result instead
+    Returns:
+        The last pass's prompt, with the number of passes and why refinement
+        stopped.
+    """
+    # Route "auto" once on the user's request; later passes only see the
+    # previous pass's output.
+    mode, domain = resolve_auto(user_input, mode, domain)
+    refinement = _Refinement(options, Deadline.resolve(deadline, timeout))
+    current: Optional[str] = None
+
+    while refinement.start_pass():
+        try:
+            refined = await optimize_prompt_async(
+                user_input=current if current is not None else user_input,
+                mode=mode,
+                domain=domain,
+                model=model,
+                temperature=temperature,
+                verbose=verbose,
+                use_cache=use_cache,
+                deadline=refinement.deadline,
+                max_retries=max_retries,
+                usage=refinement.usage,
+                ensemble_size=ensemble_size,
+                backend=backend,
+                offline_fallback=offline_fallback,
+            )
+        except OptimizationTimeoutError:
+            if current is None:
+                raise
+            refinement.stop_reason = "deadline"
+            break
+
+        converged = refinement.finish_pass(current, refined)
+        current = refined
+        if converged:
+            break
+
+    if usage is not None:
+        usage.add(refinement.usage)
+    assert current is not None
+    return refinement.result(current)
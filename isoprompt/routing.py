@@ -0,0 +1,208 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Local routing of `mode="auto"` and `domain="auto"`.
+
+Each mode and domain is described by a document built from its name,
+description, capabilities, topics, industries, fields and applications. The
+documents are indexed once per process as TF-IDF vectors over stemmed content
+words, and an input is routed to the entry with the highest cosine similarity.
+With numpy installed, a whole batch of inputs is scored in one matrix product;
+otherwise a sparse pure Python scan is used.
+"""
+
+import math
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .catalog import DomainSpec, ModeSpec
+from .constants import (
+    AUTO,
+    DEFAULT_DOMAIN_ROUTING_MIN_SCORE,
+    DEFAULT_MODE,
+    DEFAULT_MODE_ROUTING_MIN_SCORE,
+)
+from .domains import get_available_domains
+from .modes import get_available_modes
+from .similarity import np, tokenize
+
+# Truncating words to a prefix is a crude but fast stemmer: "summarize" and
+# "summarization" both become "summar".
+STEM_LENGTH = 6
+
+
+def stem_terms(text: str) -> Counter:
+    """Count the stemmed content words of a text."""
+    return Counter(token[:STEM_LENGTH] for token in tokenize(text.replace("_", " ")))
+
+
+def _mode_document(mode: ModeSpec) -> str:
+    """Describe a mode as text for routing."""
+    parts = (mode.mode, mode.mode, mode.description, mode.usage)
+    return " ".join(parts + mode.capabilities + mode.topics + mode.industries)
+
+
+def _domain_document(domain: DomainSpec) -> str:
+    """Describe a domain as text for routing."""
+    parts = (domain.domain, domain.domain, domain.description)
+    return " ".join(parts + domain.fields + domain.applications)
+
+
+class RoutingIndex:
+    """
+    A TF-IDF index over the documents of several routing targets.
+    """
+
+    def __init__(
+        self, names: Sequence[str], documents: Sequence[str], min_score: float
+    ) -> None:
+        """
+        Build an index.
+
+        Args:
+            names: The name of each target.
+            documents: The text describing each target.
+            min_score: The similarity below which no target is chosen.
+        """
+        self.names = list(names)
+        self.min_score = min_score
+
+        terms = [stem_terms(document) for document in documents]
+        document_frequency: Counter = Counter()
+        for counts in terms:
+            document_frequency.update(counts.keys())
+        self.vocabulary = {term: i for i, term in enumerate(document_frequency)}
+        self._idf = [
+            math.log((1.0 + len(documents)) / (1.0 + document_frequency[term])) + 1.0
+            for term in self.vocabulary
+        ]
+        self._rows = [self._vectorize(counts) for counts in terms]
+
+        if np is not None:
+            matrix = np.zeros((len(self.vocabulary), len(names)), dtype=np.float32)
+            for column, row in enumerate(self._rows):
+                for index, weight in row.items():
+                    matrix[index, column] = weight
+            self._matrix = matrix
+
+    def _vectorize(self, counts: Counter) -> Dict[int, float]:
+        """Build the unit-length TF-IDF vector of some term counts."""
+        vector = {
+            self.vocabulary[term]: (1.0 + math.log(count))
+            * self._idf[self.vocabulary[term]]
+            for term, count in counts.items()
+            if term in self.vocabulary
+        }
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+        return {index: value / norm for index, value in vector.items()}
+
+    def scores(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Score every text against every target.
+
+        Args:
+            texts: The inputs to route.
+
+        Returns:
+            A (len(texts), len(names)) matrix of cosine similarities.
+        """
+        queries = [self._vectorize(stem_terms(text)) for text in texts]
+        if np is not None:
+            dense = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+            for row, query in enumerate(queries):
+                for index, weight in query.items():
+                    dense[row, index] = weight
+            return (dense @ self._matrix).tolist()  # type: ignore[no-any-return]
+
+        return [
+            [
+                sum(weight * row.get(index, 0.0) for index, weight in query.items())
+                for row in self._rows
+            ]
+            for query in queries
+        ]
+
+    def route(self, texts: Sequence[str]) -> List[Optional[str]]:
+        """
+        Route every text to its best-scoring target.
+
+        Args:
+            texts: The inputs to route.
+
+        Returns:
+            The best target of each text, or None if none reaches `min_score`.
+        """
+        routes: List[Optional[str]] = []
+        for row in self.scores(texts):
+            best = max(range(len(row)), key=row.__getitem__)
+            routes.append(self.names[best] if row[best] >= self.min_score else None)
+        return routes
+
+
+@lru_cache(maxsize=None)
+def get_mode_index() -> RoutingIndex:
+    """Get the routing index over the available modes, built once."""
+    modes = get_available_modes()
+    return RoutingIndex(
+        [m.mode for m in modes],
+        [_mode_document(m) for m in modes],
+        DEFAULT_MODE_ROUTING_MIN_SCORE,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_domain_index() -> RoutingIndex:
+    """Get the routing index over the available domains, built once."""
+    domains = get_available_domains()
+    return RoutingIndex(
+        [d.domain for d in domains],
+        [_domain_document(d) for d in domains],
+        DEFAULT_DOMAIN_ROUTING_MIN_SCORE,
+    )
+
+
+def route_modes(texts: Sequence[str]) -> List[str]:
+    """
+    Pick a mode for each input, falling back to the default mode.
+
+    Args:
+        texts: The inputs to route.
+
+    Returns:
+        One mode name per input.
+    """
+    return [mode or DEFAULT_MODE for mode in get_mode_index().route(texts)]
+
+
+def route_domains(texts: Sequence[str]) -> List[Optional[str]]:
+    """
+    Pick a domain for each input, or None if no domain fits.
+
+    Args:
+        texts: The inputs to route.
+
+    Returns:
+        One domain name (or None) per input.
+    """
+    return get_domain_index().route(texts)
+
+
+def resolve_auto(
+    user_input: str, mode: str, domain: Optional[str]
+) -> Tuple[str, Optional[str]]:
+    """
+    Replace an `"auto"` mode or domain with the locally routed choice.
+
+    Args:
+        user_input: The user's basic prompt or request.
+        mode: The requested mode, possibly `"auto"`.
+        domain: The requested domain, possibly `"auto"`.
+
+    Returns:
+        The concrete (mode, domain) pair.
+    """
+    if mode == AUTO:
+        mode = route_modes([user_input])[0]
+    if domain == AUTO:
+        domain = route_domains([user_input])[0]
+    return mode, domain
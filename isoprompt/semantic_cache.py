@@ -0,0 +1,344 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Approximate caching of optimizations for near-duplicate prompts.
+
+Prompts are embedded as hashed n-gram TF-IDF vectors (see `similarity`) and
+kept in one matrix per (mode, domain, model, backend) partition. A lookup is a single
+vectorized cosine-similarity scan of its partition; the best match is returned
+when it reaches the similarity threshold.
+
+Requires numpy: pip install 'isoprompt[semantic]'
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .constants import (
+    DEFAULT_HASHED_FEATURES,
+    DEFAULT_SEMANTIC_CACHE_CAPACITY,
+    DEFAULT_SEMANTIC_THRESHOLD,
+    OPENAI_BACKEND,
+)
+from .similarity import cosine_scores, idf_weights, require_numpy, vectorize
+
+PartitionKey = Tuple[str, Optional[str], str, str]
+
+
+class _Partition:
+    """
+    The vectors and cached optimizations of one (mode, domain, model, backend).
+
+    Vectors live in a preallocated buffer that doubles when full, so inserts
+    are amortized O(1) and removals swap the last row into the freed slot.
+    """
+
+    __slots__ = ("buffer", "count", "prompts", "outputs", "last_used")
+
+    def __init__(self, n_features: int) -> None:
+        numpy = require_numpy()
+        self.buffer = numpy.zeros((16, n_features), dtype=numpy.float32)
+        self.count = 0
+        self.prompts: List[str] = []
+        self.outputs: List[str] = []
+        self.last_used: List[float] = []
+
+    @property
+    def vectors(self) -> Any:
+        """The stored vectors, one row per entry."""
+        return self.buffer[: self.count]
+
+    def append(self, vector: Any, prompt: str, output: str) -> None:
+        """Append an entry."""
+        if self.count == len(self.buffer):
+            grown = require_numpy().zeros(
+                (2 * len(self.buffer), self.buffer.shape[1]), dtype=self.buffer.dtype
+            )
+            grown[: self.count] = self.buffer[: self.count]
+            self.buffer = grown
+        self.buffer[self.count] = vector
+        self.prompts.append(prompt)
+        self.outputs.append(output)
+        self.last_used.append(time.monotonic())
+        self.count += 1
+
+    def remove(self, index: int) -> None:
+        """Remove an entry by moving the last entry into its slot."""
+        last = self.count - 1
+        self.buffer[index] = self.buffer[last]
+        self.prompts[index] = self.prompts[last]
+        self.outputs[index] = self.outputs[last]
+        self.last_used[index] = self.last_used[last]
+        self.prompts.pop()
+        self.outputs.pop()
+        self.last_used.pop()
+        self.count -= 1
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class SemanticCache:
+    """
+    A persistent, capacity-bounded nearest-neighbor cache of optimized prompts.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_SEMANTIC_THRESHOLD,
+        capacity: int = DEFAULT_SEMANTIC_CACHE_CAPACITY,
+        n_features: int = DEFAULT_HASHED_FEATURES,
+        path: Optional[str] = None,
+        autosave_every: int = 32,
+    ) -> None:
+        """
+        Create a semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a lookup to hit.
+            capacity: Maximum number of entries; least recently used entries
+                      are evicted beyond it.
+            n_features: Dimensions of the hashed n-gram vectors.
+            path: Optional `.npz` file to load from and persist to.
+            autosave_every: Save to `path` after this many insertions.
+        """
+        self._np = require_numpy()
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("Semantic cache threshold must be in (0.0, 1.0].")
+        if capacity < 1:
+            raise ValueError("Semantic cache capacity must be at least 1.")
+
+        self.threshold = threshold
+        self.capacity = capacity
+        self.n_features = n_features
+        self.path = path
+        self.autosave_every = autosave_every
+        self.hits = 0
+        self.misses = 0
+
+        self._partitions: Dict[PartitionKey, _Partition] = {}
+        self._document_frequency = self._np.zeros(n_features, dtype=self._np.float32)
+        self._size = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    # --- Lookup and insertion ---
+
+    def nearest(
+        self,
+        user_input: str,
+        mode: str,
+        domain: Optional[str],
+        model: str,
+        backend: str = OPENAI_BACKEND,
+    ) -> Optional[Tuple[float, str, str]]:
+        """
+        Find the most similar cached prompt in the request's partition.
+
+        Returns:
+            (similarity, cached prompt, cached optimization), or None if the
+            partition is empty.
+        """
+        query = vectorize([user_input], self.n_features)
+        with self._lock:
+            partition = self._partitions.get((mode, domain, model, backend))
+            if partition is None or not len(partition):
+                return None
+            weights = idf_weights(self._document_frequency, self._size)
+            scores = cosine_scores(query, partition.vectors, weights)[0]
+            best = int(scores.argmax())
+            partition.last_used[best] = time.monotonic()
+            return (
+                float(scores[best]),
+                partition.prompts[best],
+                partition.outputs[best],
+            )
+
+    def lookup(
+        self,
+        user_input: str,
+        mode: str,
+        domain: Optional[str],
+        model: str,
+        backend: str = OPENAI_BACKEND,
+    ) -> Optional[str]:
+        """
+        Return a cached optimization for a near-duplicate prompt, if any.
+
+        Args:
+            user_input: The user's basic prompt or request.
+            mode: The optimization mode.
+            domain: The optional domain specialization.
+            model: The model used for optimization.
+            backend: The name of the backend serving the request.
+
+        Returns:
+            The cached optimized prompt, or None on a miss.
+        """
+        match = self.nearest(user_input, mode, domain, model, backend)
+        if match is not None and match[0] >= self.threshold:
+            self.hits += 1
+            return match[2]
+        self.misses += 1
+        return None
+
+    def add(
+        self,
+        user_input: str,
+        mode: str,
+        domain: Optional[str],
+        model: str,
+        optimized: str,
+        backend: str = OPENAI_BACKEND,
+    ) -> None:
+        """
+        Add an optimization to the cache, evicting old entries if full.
+
+        Args:
+            user_input: The user's basic prompt or request.
+            mode: The optimization mode.
+            domain: The optional domain specialization.
+            model: The model used for optimization.
+            optimized: The optimized prompt.
+            backend: The name of the backend that optimized it.
+        """
+        vector = vectorize([user_input], self.n_features)
+        with self._lock:
+            key = (mode, domain, model, backend)
+            self._insert(key, vector, user_input, optimized)
+            while self._size > self.capacity:
+                self._evict_oldest()
+            self._unsaved += 1
+            should_save = bool(self.path) and self._unsaved >= self.autosave_every
+
+        if should_save:
+            self.save()
+
+    def _insert(self, key: PartitionKey, vector: Any, prompt: str, output: str) -> None:
+        """Append a row to a partition. Must hold the lock."""
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = _Partition(self.n_features)
+            self._partitions[key] = partition
+        partition.append(vector[0], prompt, output)
+        self._document_frequency += vector[0] > 0
+        self._size += 1
+
+    def _evict_oldest(self) -> None:
+        """Remove the least recently used entry. Must hold the lock."""
+        key, index = min(
+            (
+                (key, int(self._np.argmin(partition.last_used)))
+                for key, partition in self._partitions.items()
+                if len(partition)
+            ),
+            key=lambda item: self._partitions[item[0]].last_used[item[1]],
+        )
+        partition = self._partitions[key]
+        self._document_frequency -= partition.vectors[index] > 0
+        partition.remove(index)
+        if not len(partition):
+            del self._partitions[key]
+        self._size -= 1
+
+    # --- Persistence ---
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Persist the cache to an `.npz` file, replacing it atomically.
+
+        Args:
+            path: The file to write; defaults to the cache's own path.
+        """
+        target = path or self.path
+        if not target:
+            raise ValueError("No path to save the semantic cache to.")
+
+        with self._lock:
+            keys = list(self._partitions)
+            metadata = {
+                "n_features": self.n_features,
+                "partitions": [
+                    {
+                        "mode": key[0],
+                        "domain": key[1],
+                        "model": key[2],
+                        "backend": key[3],
+                        "prompts": self._partitions[key].prompts,
+                        "outputs": self._partitions[key].outputs,
+                    }
+                    for key in keys
+                ],
+            }
+            arrays = {
+                f"vectors_{i}": self._partitions[key].vectors.copy()
+                for i, key in enumerate(keys)
+            }
+            self._unsaved = 0
+
+        directory = os.path.dirname(os.path.abspath(target))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self._np.savez_compressed(
+                    f, metadata=self._np.array(json.dumps(metadata)), **arrays
+                )
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self, path: str) -> None:
+        """
+        Load entries from an `.npz` file written by `save`.
+
+        Args:
+            path: The file to read.
+        """
+        with self._np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            if metadata["n_features"] != self.n_features:
+                raise ValueError(
+                    f"Semantic cache at '{path}' uses {metadata['n_features']} "
+                    f"features, expected {self.n_features}."
+                )
+            with self._lock:
+                for i, entry in enumerate(metadata["partitions"]):
+                    vectors = data[f"vectors_{i}"]
+                    key = (
+                        entry["mode"],
+                        entry["domain"],
+                        entry["model"],
+                        entry.get("backend", OPENAI_BACKEND),
+                    )
+                    for row, prompt, output in zip(
+                        vectors, entry["prompts"], entry["outputs"]
+                    ):
+                        self._insert(key, row[None, :], prompt, output)
+                while self._size > self.capacity:
+                    self._evict_oldest()
+
+    # --- Introspection ---
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit, miss and size counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": self._size,
+                "capacity": self.capacity,
+                "partitions": len(self._partitions),
+                "threshold": self.threshold,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size
@@ -0,0 +1,750 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Asynchronous HTTP server for IsoPrompt.
+
+The server runs on a single asyncio event loop. Requests are parsed by
+lightweight connection handlers and handed to a fixed pool of workers through
+a bounded queue, so the number of concurrent upstream calls stays constant no
+matter how many clients are connected.
+"""
+
+import asyncio
+import json
+import signal
+import sys
+from http import HTTPStatus
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from pydantic import ValidationError
+
+from .batch import group_duplicates
+from .cache import get_result_cache
+from .catalog import to_dict
+from .constants import (
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    DEFAULT_SERVER_QUEUE_SIZE,
+    DEFAULT_SERVER_WORKERS,
+    DEFAULT_SHUTDOWN_TIMEOUT,
+)
+from .domains import get_available_domains
+from .errors import OptimizationTimeoutError, RateLimitedError, UpstreamError
+from .hedging import HedgePolicy
+from .models import (
+    BatchOptimizeRequest,
+    BatchRecord,
+    NormalizationOptions,
+    OptimizeRequest,
+)
+from .modes import get_available_modes
+from .optimizer import (
+    optimize_prompt_async,
+    stream_optimize_prompt_async,
+    validate_config,
+)
+from .singleflight import get_coalescing_stats
+
+if TYPE_CHECKING:
+    from .semantic_cache import SemanticCache
+
+MAX_HEADER_COUNT = 100
+MAX_BODY_SIZE = 4 * 1024 * 1024  # 4 MiB
+KEEP_ALIVE_TIMEOUT = 5.0  # Seconds an idle connection is kept open
+
+JobFactory = Callable[[], Awaitable[Any]]
+
+
+class HTTPError(Exception):
+    """
+    An error that is reported to the client as an HTTP status.
+    """
+
+    def __init__(
+        self, status: int, message: str, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class Request:
+    """
+    A parsed HTTP request.
+    """
+
+    __slots__ = ("method", "path", "version", "headers", "body")
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        version: str,
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> None:
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self) -> bool:
+        """Whether the client asked to keep the connection open."""
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self) -> Any:
+        """Decode the request body as JSON."""
+        try:
+            return json.loads(self.body or b"{}")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body is not valid JSON.")
+
+
+class _Job:
+    """
+    A unit of work waiting in the server queue.
+    """
+
+    __slots__ = ("factory", "future", "deadline")
+
+    def __init__(
+        self, factory: JobFactory, future: "asyncio.Future[Any]", deadline: float
+    ) -> None:
+        self.factory = factory
+        self.future = future
+        self.deadline = deadline
+
+
+class IsoPromptServer:
+    """
+    An asyncio HTTP server exposing IsoPrompt optimization.
+
+    Endpoints:
+        GET  /health            Liveness, queue depth and cache statistics.
+        GET  /modes             Available optimization modes.
+        GET  /domains           Available domains.
+        POST /optimize          Optimize a single prompt.
+        POST /optimize/batch    Optimize a list of prompts.
+        POST /optimize/stream   Optimize a prompt, streamed as server-sent events.
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_SERVER_HOST,
+        port: int = DEFAULT_SERVER_PORT,
+        workers: int = DEFAULT_SERVER_WORKERS,
+        queue_size: int = DEFAULT_SERVER_QUEUE_SIZE,
+        request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT,
+        use_cache: bool = True,
+        semantic_cache: Optional["SemanticCache"] = None,
+        hedge: Optional[HedgePolicy] = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Server needs at least one worker.")
+        if queue_size < 1:
+            raise ValueError("Server queue size must be at least 1.")
+
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_size = queue_size
+        self.request_timeout = request_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.use_cache = use_cache
+        self.semantic_cache = semantic_cache
+        self.hedge = hedge
+
+        self._queue: Optional["asyncio.Queue[_Job]"] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._worker_tasks: List["asyncio.Task[None]"] = []
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._draining = False
+        self._in_flight = 0
+
+        self._routes: Dict[Tuple[str, str], Callable[..., Awaitable[None]]] = {
+            ("GET", "/health"): self._handle_health,
+            ("GET", "/modes"): self._handle_modes,
+            ("GET", "/domains"): self._handle_domains,
+            ("POST", "/optimize"): self._handle_optimize,
+            ("POST", "/optimize/batch"): self._handle_batch,
+            ("POST", "/optimize/stream"): self._handle_stream,
+        }
+
+        # The catalogs never change while the server runs, so serialize once.
+        self._modes_body = json.dumps(
+            {"modes": [to_dict(m) for m in get_available_modes()]}
+        ).encode("utf-8")
+        self._domains_body = json.dumps(
+            {"domains": [to_dict(d) for d in get_available_domains()]}
+        ).encode("utf-8")
+
+    # --- Lifecycle ---
+
+    async def start(self) -> None:
+        """Start the workers and begin accepting connections."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_tasks = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.workers)
+        ]
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        sockets = self._server.sockets
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+
+    async def shutdown(self) -> None:
+        """
+        Stop accepting connections, drain queued work and close the server.
+
+        Work that is still queued when the shutdown timeout expires is failed
+        with a 503 so that no client waits forever.
+        """
+        if self._server is None or self._queue is None:
+            return
+
+        self._draining = True
+        self._server.close()
+
+        try:
+            await asyncio.wait_for(self._queue.join(), self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            if not job.future.done():
+                job.future.set_exception(
+                    HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server shut down.")
+                )
+            self._queue.task_done()
+
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        if self.semantic_cache is not None and self.semantic_cache.path:
+            self.semantic_cache.save()
+        self._server = None
+
+    async def serve_forever(self) -> None:
+        """Run until SIGINT or SIGTERM, then shut down gracefully."""
+        await self.start()
+        print(
+            f"🔧 IsoPrompt server listening on http://{self.host}:{self.port} "
+            f"with {self.workers} workers.",
+            file=sys.stderr,
+        )
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Signal handlers are unavailable on some platforms (Windows).
+                pass
+
+        try:
+            await stop.wait()
+        finally:
+            print("🔧 Shutting down, draining in-flight requests.", file=sys.stderr)
+            await self.shutdown()
+
+    # --- Worker pool ---
+
+    async def _worker(self) -> None:
+        """Take jobs from the queue and run them within their deadlines."""
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.future.done():
+                    # The client already gave up on this job.
+                    continue
+                remaining = job.deadline - loop.time()
+                if remaining <= 0:
+                    job.future.set_exception(asyncio.TimeoutError())
+                    continue
+
+                self._in_flight += 1
+                try:
+                    result = await asyncio.wait_for(job.factory(), remaining)
+                except asyncio.CancelledError:
+                    if not job.future.done():
+                        job.future.cancel()
+                    raise
+                except BaseException as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+                finally:
+                    self._in_flight -= 1
+            finally:
+                self._queue.task_done()
+
+    async def _enqueue(
+        self, factory: JobFactory, deadline: float, wait: bool = False
+    ) -> "asyncio.Future[Any]":
+        """
+        Put a job on the queue.
+
+        Args:
+            factory: A callable returning the coroutine to run.
+            deadline: The loop time by which the job must finish.
+            wait: Wait for queue space (up to the deadline) instead of
+                rejecting the job when the queue is full.
+
+        Returns:
+            A future resolved with the job result.
+        """
+        if self._draining or self._queue is None:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server is shutting down.")
+
+        loop = asyncio.get_running_loop()
+        job = _Job(factory, loop.create_future(), deadline)
+        if wait:
+            try:
+                await asyncio.wait_for(
+                    self._queue.put(job), max(deadline - loop.time(), 0)
+                )
+            except asyncio.TimeoutError:
+                raise HTTPError(
+                    HTTPStatus.SERVICE_UNAVAILABLE,
+                    "Server is overloaded, retry later.",
+                    {"Retry-After": "1"},
+                )
+        else:
+            try:
+                self._queue.put_nowait(job)
+            except asyncio.QueueFull:
+                raise HTTPError(
+                    HTTPStatus.SERVICE_UNAVAILABLE,
+                    "Server is overloaded, retry later.",
+                    {"Retry-After": "1"},
+                )
+        return job.future
+
+    async def _run(self, factory: JobFactory, deadline: float) -> Any:
+        """Run a job through the pool and wait for its result."""
+        future = await self._enqueue(factory, deadline)
+        return await self._await_job(future, deadline)
+
+    async def _await_job(self, future: "asyncio.Future[Any]", deadline: float) -> Any:
+        """Wait for a queued job, translating failures to HTTP errors."""
+        remaining = deadline - asyncio.get_running_loop().time()
+        try:
+            return await asyncio.wait_for(future, max(remaining, 0))
+        except (asyncio.TimeoutError, OptimizationTimeoutError):
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, "Request deadline exceeded.")
+        except (HTTPError, asyncio.CancelledError):
+            raise
+        except RateLimitedError as e:
+            headers: Dict[str, str] = {}
+            if e.retry_after is not None:
+                headers["Retry-After"] = str(max(int(e.retry_after), 1))
+            raise HTTPError(HTTPStatus.TOO_MANY_REQUESTS, str(e), headers)
+        except UpstreamError as e:
+            # Upstream rejections of the request itself are the client's fault.
+            status = (
+                HTTPStatus.BAD_REQUEST
+                if e.status_code is not None and 400 <= e.status_code < 500
+                else HTTPStatus.BAD_GATEWAY
+            )
+            raise HTTPError(status, str(e))
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        except Exception as e:
+            raise HTTPError(HTTPStatus.BAD_GATEWAY, str(e))
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        """Compute the loop deadline for a request, capped by the server timeout."""
+        budget = self.request_timeout
+        if timeout is not None:
+            budget = min(timeout, budget)
+        return asyncio.get_running_loop().time() + budget
+
+    # --- HTTP handling ---
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve requests on one connection until it is closed."""
+        self._writers.add(writer)
+        try:
+            while not self._draining:
+                try:
+                    request = await asyncio.wait_for(
+                        self._read_request(reader), KEEP_ALIVE_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as e:
+                    await self._send_error(writer, e, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                keep_alive = request.keep_alive and not self._draining
+                handler = self._routes.get((request.method, request.path))
+                try:
+                    if handler is None:
+                        known = any(path == request.path for _, path in self._routes)
+                        raise HTTPError(
+                            (
+                                HTTPStatus.METHOD_NOT_ALLOWED
+                                if known
+                                else HTTPStatus.NOT_FOUND
+                            ),
+                            f"No route for {request.method} {request.path}.",
+                        )
+                    await handler(request, writer, keep_alive)
+                except HTTPError as e:
+                    await self._send_error(writer, e, keep_alive)
+
+                if not keep_alive or request.path == "/optimize/stream":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        """Read and parse one request, or return None on a closed connection."""
+        line = await reader.readline()
+        if not line:
+            return None
+
+        parts = line.decode("latin-1").strip().split()
+        if len(parts) != 3:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line.")
+        method, target, version = parts
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADER_COUNT:
+                raise HTTPError(
+                    HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers."
+                )
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large.")
+        body = await reader.readexactly(length) if length else b""
+
+        return Request(method.upper(), target.split("?", 1)[0], version, headers, body)
+
+    async def _send(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: bytes,
+        keep_alive: bool,
+        content_type: str = "application/json",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Write a complete response."""
+        lines = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        writer.write(head + body)
+        await writer.drain()
+
+    async def _send_json(
+        self,
+        writer: asyncio.StreamWriter,
+        payload: Any,
+        keep_alive: bool,
+        status: int = HTTPStatus.OK,
+    ) -> None:
+        """Write a JSON response."""
+        await self._send(
+            writer, status, json.dumps(payload).encode("utf-8"), keep_alive
+        )
+
+    async def _send_error(
+        self, writer: asyncio.StreamWriter, error: HTTPError, keep_alive: bool
+    ) -> None:
+        """Write an error response."""
+        body = json.dumps({"error": error.message}).encode("utf-8")
+        await self._send(writer, error.status, body, keep_alive, headers=error.headers)
+
+    # --- Request parsing ---
+
+    def _parse(self, request: Request, model: Any) -> Any:
+        """Validate a request body against a pydantic model."""
+        try:
+            parsed = model.model_validate(request.json())
+        except ValidationError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid request: {e}")
+        return parsed
+
+    def _validate(self, item: OptimizeRequest) -> None:
+        """Validate the optimization options of a request."""
+        try:
+            validate_config(
+                {
+                    "mode": item.mode,
+                    "domain": item.domain,
+                    "temperature": item.temperature,
+                    "model": item.model,
+                }
+            )
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+    def _optimize_job(self, item: OptimizeRequest, deadline: float) -> JobFactory:
+        """Build a job that optimizes a single request."""
+
+        def factory() -> Awaitable[str]:
+            remaining = deadline - asyncio.get_running_loop().time()
+            return optimize_prompt_async(
+                user_input=item.prompt,
+                mode=item.mode,
+                domain=item.domain,
+                model=item.model,
+                temperature=item.temperature,
+                use_cache=self.use_cache,
+                coalesce=True,
+                semantic_cache=self.semantic_cache,
+                hedge=self.hedge,
+                timeout=max(remaining, 0.0),
+            )
+
+        return factory
+
+    # --- Handlers ---
+
+    async def _handle_health(
+        self, request: Request, writer: asyncio.StreamWriter, keep_alive: bool
+    ) -> None:
+        payload = {
+            "status": "draining" if self._draining else "ok",
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "cache": get_result_cache().stats(),
+            "coalescing": get_coalescing_stats(),
+            "semantic_cache": (
+                self.semantic_cache.stats() if self.semantic_cache else None
+            ),
+            "hedging": self.hedge.stats() if self.hedge else None,
+        }
+        status = HTTPStatus.SERVICE_UNAVAILABLE if self._draining else HTTPStatus.OK
+        await self._send_json(writer, payload, keep_alive, status)
+
+    async def _handle_modes(
+        self, request: Request, writer: asyncio.StreamWriter, keep_alive: bool
+    ) -> None:
+        await self._send(writer, HTTPStatus.OK, self._modes_body, keep_alive)
+
+    async def _handle_domains(
+        self, request: Request, writer: asyncio.StreamWriter, keep_alive: bool
+    ) -> None:
+        await self._send(writer, HTTPStatus.OK, self._domains_body, keep_alive)
+
+    async def _handle_optimize(
+        self, request: Request, writer: asyncio.StreamWriter, keep_alive: bool
+    ) -> None:
+        item: OptimizeRequest = self._parse(request, OptimizeRequest)
+        self._validate(item)
+        deadline = self._deadline(item.timeout)
+        optimized = await self._run(self._optimize_job(item, deadline), deadline)
+        await self._send_json(writer, {"optimized_prompt": optimized}, keep_alive)
+
+    async def _handle_batch(
+        self, request: Request, writer: asyncio.StreamWriter, keep_alive: bool
+    ) -> None:
+        batch: BatchOptimizeRequest = self._parse(request, BatchOptimizeRequest)
+        for item in batch.items:
+            self._validate(item)
+
+        records = [
+            BatchRecord(
+                id=str(i),
+                prompt=item.prompt,
+                mode=item.mode,
+                domain=item.domain,
+                model=item.model,
+                temperature=item.temperature,
+            )
+            for i, item in enumerate(batch.items)
+        ]
+        groups = group_duplicates(
+            records, NormalizationOptions() if batch.dedupe else None
+        )
+
+        async def run_group(group: List[int]) -> Dict[str, Any]:
+            item = batch.items[group[0]]
+            deadline = self._deadline(item.timeout or batch.timeout)
+            try:
+                # Batches wait for queue space rather than being shed outright.
+                future = await self._enqueue(
+                    self._optimize_job(item, deadline), deadline, wait=True
+                )
+                return {"optimized_prompt": await self._await_job(future, deadline)}
+            except HTTPError as e:
+                return {"error": e.message, "status": int(e.status)}
+
+        outcomes = await asyncio.gather(*(run_group(group) for group in groups))
+
+        results: List[Dict[str, Any]] = [{} for _ in records]
+        for group, outcome in zip(groups, outcomes):
+            for i in group:
+                results[i] = outcome
+        report = {
+            "total": len(records),
+            "unique": len(groups),
+            "duplicates": len(records) - len(groups),
+            "failed": sum(len(g) for g, o in zip(groups, outcomes) if "error" in o),
+        }
+        await self._send_json(
+            writer, {"results": results, "report": report}, keep_alive
+        )
+
+    async def _handle_stream(
+        self, request: Request, writer: asyncio.StreamWriter, keep_alive: bool
+    ) -> None:
+        item: OptimizeRequest = self._parse(request, OptimizeRequest)
+        self._validate(item)
+        deadline = self._deadline(item.timeout)
+
+        done = object()
+        chunks: "asyncio.Queue[Any]" = asyncio.Queue()
+
+        async def produce() -> None:
+            remaining = deadline - asyncio.get_running_loop().time()
+            async for delta in stream_optimize_prompt_async(
+                user_input=item.prompt,
+                mode=item.mode,
+                domain=item.domain,
+                model=item.model,
+                temperature=item.temperature,
+                use_cache=self.use_cache,
+                hedge=self.hedge,
+                timeout=max(remaining, 0.0),
+            ):
+                chunks.put_nowait(delta)
+
+        future = await self._enqueue(produce, deadline)
+        future.add_done_callback(lambda _: chunks.put_nowait(done))
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                remaining = max(deadline - loop.time(), 0)
+                chunk = await asyncio.wait_for(chunks.get(), remaining)
+                if chunk is done:
+                    break
+                writer.write(_sse_event("chunk", {"delta": chunk}))
+                await writer.drain()
+        except asyncio.TimeoutError:
+            future.cancel()
+            writer.write(_sse_event("error", {"error": "Request deadline exceeded."}))
+        except ConnectionError:
+            future.cancel()
+            raise
+        else:
+            if future.cancelled():
+                writer.write(_sse_event("error", {"error": "Request cancelled."}))
+            elif future.exception() is not None:
+                error = future.exception()
+                message = (
+                    "Request deadline exceeded."
+                    if isinstance(error, asyncio.TimeoutError)
+                    else str(error)
+                )
+                writer.write(_sse_event("error", {"error": message}))
+            else:
+                writer.write(_sse_event("done", {}))
+        await writer.drain()
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Encode a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def run_server(
+    host: str = DEFAULT_SERVER_HOST,
+    port: int = DEFAULT_SERVER_PORT,
+    workers: int = DEFAULT_SERVER_WORKERS,
+    queue_size: int = DEFAULT_SERVER_QUEUE_SIZE,
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT,
+    use_cache: bool = True,
+    semantic_cache: Optional["SemanticCache"] = None,
+    hedge: Optional[HedgePolicy] = None,
+) -> None:
+    """
+    Run the IsoPrompt HTTP server until interrupted.
+
+    Args:
+        host: The interface to bind to.
+        port: The port to listen on.
+        workers: The number of concurrent upstream calls.
+        queue_size: The number of pending jobs accepted before shedding load.
+        request_timeout: The maximum time, in seconds, a request may take.
+        shutdown_timeout: The time, in seconds, to drain work on shutdown.
+        use_cache: Whether to serve repeated requests from the result cache.
+        semantic_cache: Optional cache that serves near-duplicate prompts.
+        hedge: Optional policy that duplicates slow upstream calls.
+    """
+    server = IsoPromptServer(
+        host=host,
+        port=port,
+        workers=workers,
+        queue_size=queue_size,
+        request_timeout=request_timeout,
+        shutdown_timeout=shutdown_timeout,
+        use_cache=use_cache,
+        semantic_cache=semantic_cache,
+        hedge=hedge,
+    )
+    asyncio.run(server.serve_forever())
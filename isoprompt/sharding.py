@@ -0,0 +1,182 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Sharded, resumable batch runs.
+
+A corpus is split into N shards by a stable hash of each record's ID, so any
+number of processes or machines can run `isoprompt batch --shard i/N` on the
+same input without coordinating: each one picks the same records for shard
+`i` every time. Every shard appends its successful results to a checkpoint
+journal as they finish, and a rerun skips the IDs already in it, so a crash
+only loses the calls that were in flight. `merge_batch_results` combines the
+shard outputs into one file.
+"""
+
+import hashlib
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .batch import write_batch_results
+from .models import BatchItemResult, BatchRecord
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification such as `0/4`.
+
+    Args:
+        spec: `i/N`, with shards numbered from 0 to N - 1.
+
+    Returns:
+        The shard index and the shard count.
+
+    Raises:
+        ValueError: If the specification is malformed or out of range.
+    """
+    try:
+        index_text, count_text = spec.split("/")
+        index, count = int(index_text), int(count_text)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}'. Expected i/N, such as 0/4.")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}'. Expected 0 <= i < N.")
+    return index, count
+
+
+def shard_of(record_id: str, count: int) -> int:
+    """
+    Get the shard of a record ID.
+
+    The hash is stable across processes, machines and Python versions, unlike
+    the built-in `hash`.
+
+    Args:
+        record_id: The record's ID.
+        count: The number of shards.
+
+    Returns:
+        The shard index, from 0 to count - 1.
+    """
+    digest = hashlib.blake2b(record_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def select_shard(
+    records: Sequence[BatchRecord], index: int, count: int
+) -> List[BatchRecord]:
+    """Keep the records of one shard, in input order."""
+    return [record for record in records if shard_of(record.id, count) == index]
+
+
+class ShardCheckpoint:
+    """
+    An append-only journal of the results a batch run has completed.
+
+    Each line is one successful result. A line cut short by a crash is
+    ignored when the journal is read back.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open a checkpoint, loading the results already in it.
+
+        Args:
+            path: The JSONL journal file; created if missing.
+        """
+        self.path = os.path.expanduser(path)
+        self._results: Dict[str, BatchItemResult] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            for result in _read_results(self.path):
+                self._results[result.id] = result
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() and not _ends_with_newline(self.path):
+            self._file.write("\n")  # Start after a line cut short by a crash.
+
+    @property
+    def completed(self) -> Dict[str, BatchItemResult]:
+        """The completed results, by record ID."""
+        with self._lock:
+            return dict(self._results)
+
+    def record(self, result: BatchItemResult) -> None:
+        """
+        Append a result if it succeeded. Failed records are not checkpointed,
+        so a rerun retries them.
+
+        Args:
+            result: The result of one record.
+        """
+        if result.error is not None:
+            return
+        with self._lock:
+            if result.id in self._results:
+                return
+            self._results[result.id] = result
+            self._file.write(result.model_dump_json(exclude_none=True) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        """Sync the journal to disk and close it."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+
+def _ends_with_newline(path: str) -> bool:
+    """Whether a non-empty file ends with a newline."""
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _read_results(path: str) -> Iterator[BatchItemResult]:
+    """Read the results of a JSONL file, skipping lines cut short by a crash."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield BatchItemResult.model_validate_json(line)
+            except ValueError:
+                continue
+
+
+def merge_batch_results(
+    paths: Sequence[str],
+    output_path: str,
+    records: Optional[Sequence[BatchRecord]] = None,
+) -> List[BatchItemResult]:
+    """
+    Combine the outputs of several shards into one result file.
+
+    When a record appears more than once, for example because a shard was
+    rerun under another output name, a success wins over a failure.
+
+    Args:
+        paths: The shard output files.
+        output_path: The merged JSONL file.
+        records: Optional input records; results are then written in input
+                 order, followed by results for IDs not among them.
+
+    Returns:
+        The merged results.
+    """
+    merged: Dict[str, BatchItemResult] = {}
+    for path in paths:
+        for result in _read_results(path):
+            current = merged.get(result.id)
+            if current is None or (current.error is not None and result.error is None):
+                merged[result.id] = result
+
+    results = list(merged.values())
+    if records is not None:
+        order = {record.id: i for i, record in enumerate(records)}
+        results.sort(key=lambda r: order.get(r.id, len(order)))
+
+    write_batch_results(output_path, results)
+    return results
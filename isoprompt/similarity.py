@@ -0,0 +1,227 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Local text similarity using hashed n-gram features.
+
+Features are content-word unigrams and character trigrams (optionally word
+bigrams), hashed into a fixed number of buckets with CRC32 so vectors are
+stable across processes.
+NumPy is only needed for the vectorized helpers.
+"""
+
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .constants import DEFAULT_HASHED_FEATURES
+
+np: Any
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+_TOKEN = re.compile(r"\w+")
+CHAR_NGRAM_SIZE = 3
+
+# Function words carry little meaning and make paraphrases look dissimilar.
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or that the this "
+    "to with about".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase content-word tokens."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def extract_ngrams(text: str, word_bigrams: bool = False) -> Counter:
+    """
+    Extract the word and character n-grams of a text.
+
+    Args:
+        text: The text to featurize.
+        word_bigrams: Whether to include word bigrams, which make the
+                      features sensitive to word order.
+
+    Returns:
+        A counter of n-gram strings.
+    """
+    tokens = tokenize(text)
+    grams: Counter = Counter(tokens)
+    if word_bigrams:
+        grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    for token in tokens:
+        padded = f" {token} "
+        grams.update(
+            "#" + padded[i : i + CHAR_NGRAM_SIZE]
+            for i in range(max(len(padded) - CHAR_NGRAM_SIZE + 1, 1))
+        )
+    return grams
+
+
+def hash_features(
+    text: str, n_features: int = DEFAULT_HASHED_FEATURES
+) -> Dict[int, float]:
+    """
+    Hash the n-grams of a text into sublinear term-frequency buckets.
+
+    Args:
+        text: The text to featurize.
+        n_features: The number of hash buckets.
+
+    Returns:
+        A sparse mapping of bucket index to weight.
+    """
+    features: Dict[int, float] = {}
+    for gram, count in extract_ngrams(text).items():
+        bucket = zlib.crc32(gram.encode("utf-8")) % n_features
+        features[bucket] = features.get(bucket, 0.0) + 1.0 + math.log(count)
+    return features
+
+
+def jaccard_similarity(a: str, b: str) -> float:
+    """
+    Jaccard similarity of the n-gram sets of two texts.
+
+    Args:
+        a: The first text.
+        b: The second text.
+
+    Returns:
+        A score between 0.0 (disjoint) and 1.0 (identical n-grams).
+    """
+    grams_a = set(extract_ngrams(a, word_bigrams=True))
+    grams_b = set(extract_ngrams(b, word_bigrams=True))
+    if not grams_a and not grams_b:
+        return 1.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+def pairwise_jaccard(texts: Sequence[str]) -> List[List[float]]:
+    """
+    Jaccard similarity of the n-gram sets of every pair of texts.
+
+    With numpy installed, the texts are encoded as a binary n-gram incidence
+    matrix and all intersections are computed in a single matrix product.
+
+    Args:
+        texts: The texts to compare.
+
+    Returns:
+        A symmetric matrix of similarities with ones on the diagonal.
+    """
+    gram_sets = [set(extract_ngrams(text, word_bigrams=True)) for text in texts]
+    if np is None:
+        return [
+            [
+                (len(a & b) / len(a | b) if a | b else 1.0) if i != j else 1.0
+                for j, b in enumerate(gram_sets)
+            ]
+            for i, a in enumerate(gram_sets)
+        ]
+
+    vocabulary: Dict[str, int] = {}
+    rows, columns = [], []
+    for row, grams in enumerate(gram_sets):
+        for gram in grams:
+            rows.append(row)
+            columns.append(vocabulary.setdefault(gram, len(vocabulary)))
+    incidence = np.zeros((len(texts), max(len(vocabulary), 1)), dtype=np.float32)
+    incidence[rows, columns] = 1.0
+
+    intersections = incidence @ incidence.T
+    sizes = np.diag(intersections)
+    unions = sizes[:, None] + sizes[None, :] - intersections
+    scores = np.divide(
+        intersections, unions, out=np.ones_like(unions), where=unions > 0
+    )
+    np.fill_diagonal(scores, 1.0)
+    return [[float(score) for score in row] for row in scores]
+
+
+def consensus(texts: Sequence[str]) -> Tuple[int, float]:
+    """
+    Pick the text that agrees most with all the others.
+
+    Args:
+        texts: The candidate texts.
+
+    Returns:
+        The index of the medoid text and its mean similarity to the others.
+    """
+    if len(texts) < 2:
+        return 0, 1.0
+    scores = pairwise_jaccard(texts)
+    agreement = [(sum(row) - 1.0) / (len(texts) - 1) for row in scores]
+    best = max(range(len(texts)), key=agreement.__getitem__)
+    return best, agreement[best]
+
+
+def require_numpy() -> Any:
+    """Return the numpy module, or raise if it is not installed."""
+    if np is None:
+        raise ImportError(
+            "numpy package not installed. Run: pip install 'isoprompt[semantic]'"
+        )
+    return np
+
+
+def vectorize(texts: Sequence[str], n_features: int = DEFAULT_HASHED_FEATURES) -> Any:
+    """
+    Build a dense term-frequency matrix for several texts.
+
+    Args:
+        texts: The texts to vectorize.
+        n_features: The number of hash buckets.
+
+    Returns:
+        A float32 array of shape (len(texts), n_features).
+    """
+    numpy = require_numpy()
+    matrix = numpy.zeros((len(texts), n_features), dtype=numpy.float32)
+    for row, text in enumerate(texts):
+        for bucket, weight in hash_features(text, n_features).items():
+            matrix[row, bucket] = weight
+    return matrix
+
+
+def idf_weights(document_frequency: Any, n_documents: int) -> Any:
+    """
+    Smoothed inverse document frequency weights.
+
+    Args:
+        document_frequency: Per-bucket document counts.
+        n_documents: The number of documents.
+
+    Returns:
+        A float32 array of IDF weights.
+    """
+    numpy = require_numpy()
+    return (numpy.log((1.0 + n_documents) / (1.0 + document_frequency)) + 1.0).astype(
+        numpy.float32
+    )
+
+
+def cosine_scores(queries: Any, matrix: Any, weights: Any) -> Any:
+    """
+    Weighted cosine similarity between each query row and each matrix row.
+
+    Args:
+        queries: An array of shape (q, n_features).
+        matrix: An array of shape (n, n_features).
+        weights: Per-bucket weights (e.g., IDF) of shape (n_features,).
+
+    Returns:
+        An array of shape (q, n) of similarities in [0, 1].
+    """
+    numpy = require_numpy()
+    weighted_queries = queries * weights
+    weighted_matrix = matrix * weights
+    query_norms = numpy.linalg.norm(weighted_queries, axis=1, keepdims=True)
+    matrix_norms = numpy.linalg.norm(weighted_matrix, axis=1, keepdims=True)
+    query_norms[query_norms == 0] = 1.0
+    matrix_norms[matrix_norms == 0] = 1.0
+    return (weighted_queries / query_norms) @ (weighted_matrix / matrix_norms).T
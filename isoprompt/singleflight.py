@@ -0,0 +1,215 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Single-flight coalescing of identical concurrent calls.
+
+When several callers ask for the same key at the same time, only the first
+one (the leader) runs the call; the others wait for it and share its result
+or error. Errors that belong to the leader alone, its cancellation or its
+deadline, are not shared: the followers retry, one of them as the new leader.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, TypeVar
+
+from .deadline import Deadline
+from .errors import OptimizationCancelledError, OptimizationTimeoutError
+
+T = TypeVar("T")
+
+# Errors raised by the leader's own cancel token or deadline.
+_LEADER_ERRORS = (OptimizationCancelledError, OptimizationTimeoutError)
+
+
+class _Call(Generic[T]):
+    """
+    A call in flight, shared by its leader and followers.
+    """
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key across threads.
+    """
+
+    def __init__(self) -> None:
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls: Dict[str, _Call[Any]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """
+        Run `fn` unless a call with the same key is already in flight.
+
+        Args:
+            key: The key identifying identical calls.
+            fn: The call to run.
+            timeout: Maximum seconds a follower waits for the leader.
+
+        Returns:
+            The result of the (possibly shared) call.
+        """
+        deadline = Deadline(timeout)
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if call is None:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.leaders += 1
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                break
+            if not call.done.wait(deadline.remaining()):
+                raise OptimizationTimeoutError("Optimization deadline exceeded.")
+            if call.error is None:
+                return call.result  # type: ignore[return-value]
+            if not isinstance(call.error, _LEADER_ERRORS):
+                raise call.error
+            # The leader gave up for its own reasons; this caller did not
+            # share a call after all.
+            with self._lock:
+                self.coalesced -= 1
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the leader, coalesced and in-flight counters."""
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent coroutine calls with the same key on an event loop.
+
+    The shared call runs as its own task, so a caller that is cancelled does
+    not cancel the call for the callers still waiting on it. As with
+    `SingleFlight`, followers retry when the shared call fails with the
+    leader's cancellation or deadline.
+    """
+
+    def __init__(self) -> None:
+        self.leaders = 0
+        self.coalesced = 0
+        self._tasks: Dict[str, "asyncio.Future[Any]"] = {}
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        Await `fn()` unless a call with the same key is already in flight.
+
+        Args:
+            key: The key identifying identical calls.
+            fn: A callable returning the coroutine to run.
+            timeout: Maximum seconds this caller waits for the shared call.
+
+        Returns:
+            The result of the (possibly shared) call.
+        """
+        deadline = Deadline(timeout)
+        while True:
+            task = self._tasks.get(key)
+            leader = task is None
+            if task is None:
+                task = self._start(key, fn)
+            else:
+                self.coalesced += 1
+
+            try:
+                result: T = await asyncio.wait_for(
+                    asyncio.shield(task), deadline.remaining()
+                )
+                return result
+            except (asyncio.TimeoutError, *_LEADER_ERRORS) as e:
+                # OptimizationTimeoutError is an asyncio.TimeoutError on 3.11+,
+                # so tell this caller's timeout apart from the shared call's.
+                if not task.done() or not isinstance(e, _LEADER_ERRORS):
+                    raise OptimizationTimeoutError("Optimization deadline exceeded.")
+                if leader:
+                    raise
+            # The leader gave up for its own reasons; this caller did not
+            # share a call after all.
+            self.coalesced -= 1
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def _start(self, key: str, fn: Callable[[], Awaitable[T]]) -> "asyncio.Future[T]":
+        """Start the shared call of a key as its own task."""
+        task = asyncio.ensure_future(fn())
+        self._tasks[key] = task
+        self.leaders += 1
+
+        def forget(_: "asyncio.Future[Any]") -> None:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+        task.add_done_callback(forget)
+        return task
+
+    def stats(self) -> Dict[str, int]:
+        """Return the leader, coalesced and in-flight counters."""
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._tasks),
+        }
+
+
+_sync_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+
+def get_sync_singleflight() -> SingleFlight:
+    """Get the process-wide single-flight group for sync calls."""
+    return _sync_flights
+
+
+def get_async_singleflight() -> AsyncSingleFlight:
+    """Get the process-wide single-flight group for async calls."""
+    return _async_flights
+
+
+def get_coalescing_stats() -> Dict[str, int]:
+    """
+    Get the combined coalescing counters of the sync and async paths.
+
+    Returns:
+        `upstream_calls` is the number of calls that went upstream and
+        `saved_calls` the number of callers that shared one of them instead.
+    """
+    sync_stats = _sync_flights.stats()
+    async_stats = _async_flights.stats()
+    return {
+        "upstream_calls": sync_stats["leaders"] + async_stats["leaders"],
+        "saved_calls": sync_stats["coalesced"] + async_stats["coalesced"],
+        "in_flight": sync_stats["in_flight"] + async_stats["in_flight"],
+    }
@@ -0,0 +1,370 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Result sinks for large batch outputs.
+
+A sink stores each batch result as one row, together with its prompt, mode,
+domain, model, token usage and latency, in a file that is quick to analyze:
+a SQLite database or a Parquet file. Rows are buffered and handed in bulk
+to a background writer thread, so the batch keeps optimizing while a batch
+of rows is written; a caller only waits when the writer falls several
+batches behind.
+
+`optimize_batch(..., on_result=sink.write)` streams results into a sink as
+they complete. Parquet requires pyarrow: pip install 'isoprompt[parquet]'
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from .constants import (
+    DEFAULT_SINK_BATCH_SIZE,
+    PARQUET_ROW_GROUP_SIZE,
+    RESULT_FORMATS,
+    SINK_MAX_PENDING_WRITES,
+)
+from .models import BatchItemResult, BatchRecord
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+# The columns of a result row, with their SQLite types.
+RESULT_COLUMNS = [
+    ("id", "TEXT PRIMARY KEY"),
+    ("prompt", "TEXT"),
+    ("mode", "TEXT"),
+    ("domain", "TEXT"),
+    ("model", "TEXT"),
+    ("optimized_prompt", "TEXT"),
+    ("error", "TEXT"),
+    ("error_type", "TEXT"),
+    ("duplicate_of", "TEXT"),
+    ("passes", "INTEGER"),
+    ("prompt_tokens", "INTEGER"),
+    ("completion_tokens", "INTEGER"),
+    ("latency_seconds", "REAL"),
+    ("written_at", "REAL"),
+]
+
+# Output file extensions and the result format they select.
+_EXTENSIONS = {
+    ".jsonl": "jsonl",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+    ".db": "sqlite",
+    ".parquet": "parquet",
+}
+
+Row = Tuple[Any, ...]
+
+
+def require_pyarrow() -> Any:
+    """Return the pyarrow module, or raise if it is not installed."""
+    if pyarrow is None:
+        raise ImportError(
+            "pyarrow package not installed. Run: pip install 'isoprompt[parquet]'"
+        )
+    return pyarrow
+
+
+def result_format(path: str, format: Optional[str] = None) -> str:
+    """
+    Get the format of a result file.
+
+    Args:
+        path: The output file.
+        format: An explicit format among `RESULT_FORMATS`, or None to infer
+                it from the extension, defaulting to JSONL.
+
+    Returns:
+        The format.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if format is None:
+        return _EXTENSIONS.get(os.path.splitext(path)[1].lower(), "jsonl")
+    if format not in RESULT_FORMATS:
+        raise ValueError(f"Invalid result format. Available: {RESULT_FORMATS}")
+    return format
+
+
+def result_row(result: BatchItemResult, record: Optional[BatchRecord] = None) -> Row:
+    """
+    Build the row of a result, in the order of `RESULT_COLUMNS`.
+
+    Args:
+        result: The result.
+        record: Its input record, for the prompt, mode, domain and model.
+
+    Returns:
+        The row.
+    """
+    return (
+        result.id,
+        record.prompt if record is not None else None,
+        record.mode if record is not None else None,
+        record.domain if record is not None else None,
+        record.model if record is not None else None,
+        result.optimized_prompt,
+        result.error,
+        result.error_type,
+        result.duplicate_of,
+        result.passes,
+        result.prompt_tokens,
+        result.completion_tokens,
+        result.latency_seconds,
+        time.time(),
+    )
+
+
+class ResultSink(ABC):
+    """
+    The base class of result sinks: a thread-safe buffer of rows that are
+    written in bulk on a background thread.
+
+    Subclasses implement `_write_rows`, which is only ever called from the
+    writer thread, one batch at a time, and may override `_close`.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_SINK_BATCH_SIZE,
+        records: Optional[Sequence[BatchRecord]] = None,
+    ) -> None:
+        """
+        Initialize the buffer and the writer thread.
+
+        Args:
+            batch_size: Buffered rows that trigger a write.
+            records: Optional input records, looked up by ID for results
+                     written without their record.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+        self.batch_size = batch_size
+        self.written = 0
+        self._records = {record.id: record for record in records or []}
+        self._pending: List[Row] = []
+        self._writes: "Deque[Future[None]]" = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="isoprompt-sink"
+        )
+
+    def write(
+        self, result: BatchItemResult, record: Optional[BatchRecord] = None
+    ) -> None:
+        """
+        Buffer a result, writing the buffer if it is full.
+
+        Args:
+            result: The result.
+            record: Its input record; defaults to the record of the same ID
+                    among the sink's records.
+
+        Raises:
+            ValueError: If the sink is closed.
+        """
+        row = result_row(result, record or self._records.get(result.id))
+        with self._lock:
+            if self._closed:
+                raise ValueError("The result sink is closed.")
+            self._pending.append(row)
+            should_flush = len(self._pending) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def flush(self, wait: bool = False) -> None:
+        """
+        Hand the buffered rows to the writer thread.
+
+        Args:
+            wait: Whether to wait until every row handed over is written.
+
+        Raises:
+            Exception: Whatever a previous write raised.
+        """
+        with self._lock:
+            if self._closed:
+                raise ValueError("The result sink is closed.")
+            rows, self._pending = self._pending, []
+            if rows:
+                self._writes.append(self._writer.submit(self._write_rows, rows))
+                self.written += len(rows)
+            # Wait for the oldest writes when the writer falls behind, so the
+            # buffers in flight stay bounded.
+            limit = 0 if wait else SINK_MAX_PENDING_WRITES
+            while len(self._writes) > limit or (
+                self._writes and self._writes[0].done()
+            ):
+                self._writes.popleft().result()
+
+    def close(self) -> None:
+        """Write the buffered rows, wait for the writer and close the file."""
+        if self._closed:
+            return
+        try:
+            self.flush(wait=True)
+        finally:
+            with self._lock:
+                self._closed = True
+            self._writer.shutdown(wait=True)
+            self._close()
+
+    @abstractmethod
+    def _write_rows(self, rows: List[Row]) -> None:
+        """Write a batch of rows."""
+
+    def _close(self) -> None:
+        """Close the underlying file."""
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class SqliteResultSink(ResultSink):
+    """
+    A result sink writing to a SQLite database in WAL mode, one transaction
+    per batch. Rows replace earlier rows of the same ID, so a rerun or a
+    resumed batch can write to the same database.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = DEFAULT_SINK_BATCH_SIZE,
+        records: Optional[Sequence[BatchRecord]] = None,
+        table: str = "results",
+    ) -> None:
+        """
+        Open the database, creating it and its table if needed.
+
+        Args:
+            path: The SQLite database file.
+            batch_size: Rows written per transaction.
+            records: Optional input records, looked up by ID for results
+                     written without their record.
+            table: The table of the results.
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table!r}")
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{name} {kind}" for name, kind in RESULT_COLUMNS)
+        with self._connection:
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+        placeholders = ", ".join("?" for _ in RESULT_COLUMNS)
+        self._insert = f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})"
+        super().__init__(batch_size, records)
+
+    def _write_rows(self, rows: List[Row]) -> None:
+        """Write a batch of rows in one transaction."""
+        with self._connection:
+            self._connection.executemany(self._insert, rows)
+
+    def _close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+
+class ParquetResultSink(ResultSink):
+    """
+    A result sink writing to a Parquet file, one row group per batch.
+
+    Requires pyarrow: pip install 'isoprompt[parquet]'
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = PARQUET_ROW_GROUP_SIZE,
+        records: Optional[Sequence[BatchRecord]] = None,
+    ) -> None:
+        """
+        Create the Parquet file, replacing any existing file.
+
+        Args:
+            path: The Parquet file.
+            batch_size: Rows per row group.
+            records: Optional input records, looked up by ID for results
+                     written without their record.
+        """
+        pa = require_pyarrow()
+        types = {"TEXT": pa.string(), "INTEGER": pa.int64(), "REAL": pa.float64()}
+        self._schema = pa.schema(
+            [
+                pa.field(name, types[kind.split()[0]], nullable=name != "id")
+                for name, kind in RESULT_COLUMNS
+            ]
+        )
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+        super().__init__(batch_size, records)
+
+    def _write_rows(self, rows: List[Row]) -> None:
+        """Write a batch of rows as one row group."""
+        columns = list(zip(*rows))
+        table = pyarrow.Table.from_arrays(
+            [
+                pyarrow.array(column, type=field.type)
+                for column, field in zip(columns, self._schema)
+            ],
+            schema=self._schema,
+        )
+        self._file.write_table(table)
+
+    def _close(self) -> None:
+        """Write the Parquet footer."""
+        self._file.close()
+
+
+def open_result_sink(
+    path: str,
+    format: Optional[str] = None,
+    records: Optional[Sequence[BatchRecord]] = None,
+) -> ResultSink:
+    """
+    Open the result sink of a SQLite or Parquet output file.
+
+    Args:
+        path: The output file.
+        format: "sqlite" or "parquet", or None to infer it from the extension
+                (.sqlite, .sqlite3, .db or .parquet).
+        records: Optional input records, looked up by ID for results written
+                 without their record.
+
+    Returns:
+        The sink.
+
+    Raises:
+        ValueError: If the format has no sink, e.g. JSONL.
+        ImportError: If the format needs a package that is not installed.
+    """
+    sinks: Dict[str, Any] = {
+        "sqlite": SqliteResultSink,
+        "parquet": ParquetResultSink,
+    }
+    kind = result_format(path, format)
+    if kind not in sinks:
+        raise ValueError(f"No result sink for {kind} output: {path}")
+    sink: ResultSink = sinks[kind](path, records=records)
+    return sink
@@ -4,13 +4,15 @@ Templates for IsoPrompt.
 """
 
 import os
+from functools import lru_cache
 from typing import Optional
 
-from .domains import get_available_domains, get_default_domain
-from .models import IsoPromptDomain, IsoPromptMode
-from .modes import get_available_modes, get_default_mode
+from .catalog import DomainSpec, ModeSpec
+from .domains import get_default_domain, get_domain
+from .modes import get_default_mode, get_mode
 
 
+@lru_cache(maxsize=None)
 def get_prompt_guidelines() -> str:
     """Get the prompt guidelines for prompt optimization."""
     with open(
@@ -19,30 +21,30 @@ def get_prompt_guidelines() -> str:
         return f.read()
 
 
-def construct_mode_instruction(mode: IsoPromptMode) -> str:
+def construct_mode_instruction(mode: ModeSpec) -> str:
     """Construct the instruction for a mode."""
     mode_structure = f"""
         Mode: {mode.mode}
         Description: {mode.description}
         Usage: {mode.usage}
-        Capabilities: {mode.capabilities}
+        Capabilities: {list(mode.capabilities)}
         Strictness: {mode.strictness}
         Require Citations: {mode.require_citations}
-        Output Formats: {mode.output_formats}
-        Industries: {mode.industries}
-        Topics: {mode.topics}
+        Output Formats: {list(mode.output_formats)}
+        Industries: {list(mode.industries)}
+        Topics: {list(mode.topics)}
     """
 
     return mode_structure
 
 
-def construct_domain_instruction(domain: IsoPromptDomain) -> str:
+def construct_domain_instruction(domain: DomainSpec) -> str:
     """Construct the instruction for a domain."""
     domain_structure = f"""
         Domain: {domain.domain}
         Description: {domain.description}
-        Fields: {domain.fields}
-        Applications: {domain.applications}
+        Fields: {list(domain.fields)}
+        Applications: {list(domain.applications)}
     """
 
     return domain_structure
@@ -51,9 +53,7 @@ def construct_domain_instruction(domain: IsoPromptDomain) -> str:
 def get_mode_instructions(mode: str) -> str:
     """Get mode-specific instructions for prompt optimization."""
 
-    default_mode = get_default_mode()
-    modes = get_available_modes()
-    mode_obj = next((m for m in modes if m.mode == mode), default_mode)
+    mode_obj = get_mode(mode) or get_default_mode()
 
     return construct_mode_instruction(mode_obj)
 
@@ -61,18 +61,19 @@ def get_mode_instructions(mode: str) -> str:
 def get_domain_instructions(domain: Optional[str] = None) -> str:
     """Get domain-specific instructions for prompt optimization."""
 
-    default_domain = get_default_domain()
-    if domain is None:
-        return construct_domain_instruction(default_domain)
-
-    domains = get_available_domains()
-    domain_obj = next((d for d in domains if d.domain == domain), default_domain)
+    domain_obj = get_domain(domain) or get_default_domain()
 
     return construct_domain_instruction(domain_obj)
 
 
+@lru_cache(maxsize=256)
 def get_optimization_template(mode: str, domain: Optional[str] = None) -> str:
-    """Get the main template for prompt optimization."""
+    """
+    Get the main template for prompt optimization.
+
+    Templates only depend on the mode and domain, so rendered templates are
+    cached and shared by every request in the process.
+    """
 
     mode_instructions = get_mode_instructions(mode)
     domain_instructions = get_domain_instructions(domain)
@@ -0,0 +1,60 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Token usage accounting.
+
+A `UsageMeter` is passed down to the upstream calls of an optimization and
+accumulates the token counts the API reports, including retries and hedged
+duplicates, so callers can enforce token budgets and report spend.
+"""
+
+import threading
+from typing import Any, Dict
+
+
+class UsageMeter:
+    """
+    A thread-safe accumulator of upstream token usage.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        """Prompt and completion tokens combined."""
+        return self.prompt_tokens + self.completion_tokens
+
+    def record(self, usage: Any) -> None:
+        """
+        Add the usage reported for one upstream call.
+
+        Args:
+            usage: The `usage` object of a completion, or None if the API did
+                   not report any.
+        """
+        with self._lock:
+            self.calls += 1
+            if usage is not None:
+                self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+                self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def add(self, other: "UsageMeter") -> None:
+        """Add the counters of another meter to this one."""
+        counters = other.snapshot()
+        with self._lock:
+            self.calls += counters["calls"]
+            self.prompt_tokens += counters["prompt_tokens"]
+            self.completion_tokens += counters["completion_tokens"]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return the call and token counters."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+            }
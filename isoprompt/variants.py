@@ -0,0 +1,249 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Fan-out optimization of one input under several modes and domains.
+
+Every (mode, domain) pair of the cross product is optimized concurrently, so
+comparing variants takes about as long as the slowest single call. Variants
+are scored by how much they agree with the other variants, which allows
+picking the shortest or the best-scoring one without another LLM call.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from .constants import DEFAULT_LLM_MODEL, DEFAULT_MAX_RETRIES, DEFAULT_TEMPERATURE
+from .deadline import CancelToken, Deadline
+from .models import VariantResult, VariantsResult
+from .optimizer import optimize_prompt, optimize_prompt_async
+from .similarity import pairwise_jaccard
+from .usage import UsageMeter
+
+VARIANT_SELECTIONS = ["shortest", "best"]
+
+VariantKey = Tuple[str, Optional[str]]
+
+
+def variant_keys(
+    modes: Sequence[str], domains: Optional[Sequence[Optional[str]]] = None
+) -> List[VariantKey]:
+    """
+    Build the (mode, domain) cross product, without repeated pairs.
+
+    Args:
+        modes: The modes to optimize under.
+        domains: The domains to optimize under, or None for no domain.
+
+    Returns:
+        The pairs in order of first appearance.
+    """
+    keys: List[VariantKey] = []
+    for mode in modes:
+        for domain in domains or [None]:
+            if (mode, domain) not in keys:
+                keys.append((mode, domain))
+    return keys
+
+
+def _variant(
+    key: VariantKey, started: float, usage: UsageMeter, optimized: str
+) -> VariantResult:
+    """Build a successful variant."""
+    counters = usage.snapshot()
+    return VariantResult(
+        mode=key[0],
+        domain=key[1],
+        optimized_prompt=optimized,
+        latency_seconds=time.monotonic() - started,
+        prompt_tokens=counters["prompt_tokens"],
+        completion_tokens=counters["completion_tokens"],
+    )
+
+
+def _failed_variant(key: VariantKey, started: float, error: Exception) -> VariantResult:
+    """Build a variant whose optimization failed."""
+    return VariantResult(
+        mode=key[0],
+        domain=key[1],
+        error=str(error),
+        error_type=type(error).__name__,
+        latency_seconds=time.monotonic() - started,
+    )
+
+
+def _finish(
+    variants: List[VariantResult], select: Optional[str], started: float
+) -> VariantsResult:
+    """Score the successful variants and pick one if requested."""
+    succeeded = [v for v in variants if v.optimized_prompt is not None]
+    if len(succeeded) == 1:
+        succeeded[0].score = 1.0
+    elif succeeded:
+        scores = pairwise_jaccard([v.optimized_prompt or "" for v in succeeded])
+        for variant, row in zip(succeeded, scores):
+            variant.score = round((sum(row) - 1.0) / (len(succeeded) - 1), 4)
+
+    selected = None
+    if select == "shortest" and succeeded:
+        selected = min(succeeded, key=lambda v: len(v.optimized_prompt or ""))
+    elif select == "best" and succeeded:
+        selected = max(succeeded, key=lambda v: v.score or 0.0)
+
+    return VariantsResult(
+        variants=variants,
+        selected=selected,
+        duration_seconds=time.monotonic() - started,
+    )
+
+
+def _check_selection(select: Optional[str]) -> None:
+    """Raise `ValueError` for an unknown selection."""
+    if select is not None and select not in VARIANT_SELECTIONS:
+        raise ValueError(f"Invalid selection. Available: {VARIANT_SELECTIONS}.")
+
+
+def optimize_variants(
+    user_input: str,
+    modes: Sequence[str],
+    domains: Optional[Sequence[Optional[str]]] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    select: Optional[str] = None,
+    verbose: bool = False,
+    use_cache: bool = False,
+    timeout: Optional[float] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cancel_token: Optional[CancelToken] = None,
+    ensemble_size: Optional[int] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> VariantsResult:
+    """
+    Optimize one input under every (mode, domain) pair concurrently.
+
+    Args:
+        user_input: The user's basic prompt or request
+        modes: The modes to optimize under
+        domains: The domains to optimize under, or None for no domain
+        model: OpenAI model to use for optimization
+        temperature: Temperature for generation (lower = more focused)
+        select: "shortest" or "best" to also pick one variant; "best" is the
+                variant that agrees most with the others
+        verbose: Whether to print verbose output
+        use_cache: Whether to reuse results from the shared result cache
+        timeout: Optional time budget in seconds shared by all variants
+        max_retries: Retries per variant for transient upstream failures
+        cancel_token: Optional token that aborts the variants
+        ensemble_size: Candidates generated per variant, keeping the
+                       consensus; defaults to each mode's ensemble size
+        backend: The name of the backend to use, or None to route each
+                 variant by the configured rules
+        offline_fallback: Whether variants whose upstream call times out or
+                          fails transiently get a heuristic result instead
+    Returns:
+        One result per variant with its latency and token usage. A failed
+        variant carries its error instead of a prompt.
+    """
+    _check_selection(select)
+    keys = variant_keys(modes, domains)
+    deadline = Deadline(timeout)
+    started = time.monotonic()
+
+    def run(key: VariantKey) -> VariantResult:
+        variant_started = time.monotonic()
+        usage = UsageMeter()
+        try:
+            optimized = optimize_prompt(
+                user_input=user_input,
+                mode=key[0],
+                domain=key[1],
+                model=model,
+                temperature=temperature,
+                verbose=verbose,
+                use_cache=use_cache,
+                deadline=deadline,
+                max_retries=max_retries,
+                cancel_token=cancel_token,
+                usage=usage,
+                ensemble_size=ensemble_size,
+                backend=backend,
+                offline_fallback=offline_fallback,
+            )
+            return _variant(key, variant_started, usage, optimized)
+        except Exception as e:
+            return _failed_variant(key, variant_started, e)
+
+    with ThreadPoolExecutor(max_workers=max(len(keys), 1)) as executor:
+        variants = list(executor.map(run, keys))
+    return _finish(variants, select, started)
+
+
+async def optimize_variants_async(
+    user_input: str,
+    modes: Sequence[str],
+    domains: Optional[Sequence[Optional[str]]] = None,
+    model: str = DEFAULT_LLM_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    select: Optional[str] = None,
+    verbose: bool = False,
+    use_cache: bool = False,
+    timeout: Optional[float] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    ensemble_size: Optional[int] = None,
+    backend: Optional[str] = None,
+    offline_fallback: bool = False,
+) -> VariantsResult:
+    """
+    Async version of `optimize_variants`.
+
+    Args:
+        user_input: The user's basic prompt or request
+        modes: The modes to optimize under
+        domains: The domains to optimize under, or None for no domain
+        model: OpenAI model to use for optimization
+        temperature: Temperature for generation (lower = more focused)
+        select: "shortest" or "best" to also pick one variant
+        verbose: Whether to print verbose output
+        use_cache: Whether to reuse results from the shared result cache
+        timeout: Optional time budget in seconds shared by all variants
+        max_retries: Retries per variant for transient upstream failures
+        ensemble_size: Candidates generated per variant, keeping the
+                       consensus; defaults to each mode's ensemble size
+        backend: The name of the backend to use, or None to route each
+                 variant by the configured rules
+        offline_fallback: Whether variants whose upstream call times out or
+                          fails transiently get a heuristic result instead
+    Returns:
+        One result per variant with its latency and token usage.
+    """
+    _check_selection(select)
+    keys = variant_keys(modes, domains)
+    deadline = Deadline(timeout)
+    started = time.monotonic()
+
+    async def run(key: VariantKey) -> VariantResult:
+        variant_started = time.monotonic()
+        usage = UsageMeter()
+        try:
+            optimized = await optimize_prompt_async(
+                user_input=user_input,
+                mode=key[0],
+                domain=key[1],
+                model=model,
+                temperature=temperature,
+                verbose=verbose,
+                use_cache=use_cache,
+                deadline=deadline,
+                max_retries=max_retries,
+                usage=usage,
+                ensemble_size=ensemble_size,
+                backend=backend,
+                offline_fallback=offline_fallback,
+            )
+            return _variant(key, variant_started, usage, optimized)
+        except Exception as e:
+            return _failed_variant(key, variant_started, e)
+
+    variants = await asyncio.gather(*(run(key) for key in keys))
+    return _finish(list(variants), select, started)
@@ -0,0 +1,338 @@
+"""
+IsoPrompt - AI-powered prompt optimization tool.
+Re-optimize prompt files as they change.
+
+`PromptWatcher` mirrors a directory of prompt files into an output directory
+of optimized prompts. It listens for file-system notifications when
+`watchdog` is installed (`pip install 'isoprompt[watch]'`) and otherwise
+polls modification times. Only the file that changed is re-optimized: edits
+in quick succession are debounced into one run, a run made stale by a newer
+edit is cancelled and its result discarded, and saves that leave the content
+unchanged are skipped by comparing content hashes, which are kept in the
+output directory so they also survive restarts.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .constants import (
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_LLM_MODEL,
+    DEFAULT_MODE,
+    DEFAULT_TEMPERATURE,
+    DEFAULT_WATCH_DEBOUNCE,
+    DEFAULT_WATCH_POLL_INTERVAL,
+    WATCH_EXTENSIONS,
+    WATCH_STATE_FILE,
+)
+from .deadline import CancelToken
+from .errors import OptimizationCancelledError
+from .optimizer import optimize_prompt
+
+try:
+    import watchdog.events
+    import watchdog.observers
+except ImportError:  # pragma: no cover - optional dependency
+    watchdog = None
+
+# (modification time in nanoseconds, size) of a file
+Snapshot = Tuple[int, int]
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """Write a file, replacing it atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class PromptWatcher:
+    """
+    Keeps the optimized copies of a directory of prompt files up to date.
+    """
+
+    def __init__(
+        self,
+        source_dir: str,
+        output_dir: str,
+        mode: str = DEFAULT_MODE,
+        domain: Optional[str] = None,
+        model: str = DEFAULT_LLM_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        backend: Optional[str] = None,
+        offline_fallback: bool = False,
+        timeout: Optional[float] = None,
+        debounce: float = DEFAULT_WATCH_DEBOUNCE,
+        poll_interval: float = DEFAULT_WATCH_POLL_INTERVAL,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        extensions: Sequence[str] = WATCH_EXTENSIONS,
+        use_polling: bool = False,
+    ) -> None:
+        """
+        Create a watcher.
+
+        Args:
+            source_dir: The directory of prompt files, watched recursively.
+            output_dir: Where optimized prompts are written, under the same
+                        relative paths.
+            mode: The optimization mode.
+            domain: The optional domain specialization.
+            model: The OpenAI model to use.
+            temperature: The temperature for the model.
+            backend: The name of the backend to use, or None to route by the
+                     configured rules.
+            offline_fallback: Whether to fall back to the heuristic optimizer
+                              when the API times out or is unavailable.
+            timeout: Optional time budget, in seconds, for each file.
+            debounce: Seconds without further edits before a file is
+                      optimized.
+            poll_interval: Seconds between scans when polling.
+            max_concurrency: The maximum files optimized at once.
+            extensions: The file extensions to optimize.
+            use_polling: Whether to poll even if notifications are available.
+        """
+        self.source_dir = os.path.abspath(source_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.mode = mode
+        self.domain = domain
+        self.model = model
+        self.temperature = temperature
+        self.backend = backend
+        self.offline_fallback = offline_fallback
+        self.timeout = timeout
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.use_polling = use_polling or watchdog is None
+
+        self.state_path = os.path.join(self.output_dir, WATCH_STATE_FILE)
+        self._hashes: Dict[str, str] = self._load_state()
+        self._in_flight: Dict[str, str] = {}
+        self._tokens: Dict[str, CancelToken] = {}
+        self._generations: Dict[str, int] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+
+    def _load_state(self) -> Dict[str, str]:
+        """Load the content hashes of the last run, ignoring a corrupt file."""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return {str(k): str(v) for k, v in state["hashes"].items()}
+        except (OSError, ValueError, KeyError, AttributeError):
+            return {}
+
+    def _save_state(self) -> None:
+        """Persist the content hashes; call with the lock held."""
+        _write_atomic(self.state_path, json.dumps({"hashes": self._hashes}))
+
+    def _relative(self, path: str) -> Optional[str]:
+        """The path of a watched prompt file relative to the source, or None."""
+        path = os.path.abspath(path)
+        if path == self.output_dir or path.startswith(self.output_dir + os.sep):
+            return None  # The output directory may live inside the source.
+        relative = os.path.relpath(path, self.source_dir)
+        if relative.startswith(os.pardir) or any(
+            part.startswith(".") for part in relative.split(os.sep)
+        ):
+            return None
+        if not relative.lower().endswith(self.extensions):
+            return None
+        return relative
+
+    def _digest(self, content: bytes) -> str:
+        """Hash a file's content together with the optimization options."""
+        options = [self.mode, self.domain, self.model, self.temperature, self.backend]
+        digest = hashlib.sha256(json.dumps(options).encode())
+        digest.update(content)
+        return digest.hexdigest()
+
+    def notify(self, path: str) -> None:
+        """
+        Report that a file changed. The file is optimized once it has not
+        changed for `debounce` seconds.
+
+        Args:
+            path: The changed file.
+        """
+        relative = self._relative(path)
+        if relative is None or self._stop.is_set():
+            return
+        with self._lock:
+            timer = self._timers.get(relative)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(self.debounce, self._dispatch, [relative])
+            timer.daemon = True
+            self._timers[relative] = timer
+            timer.start()
+
+    def _dispatch(self, relative: str) -> Optional["Future[None]"]:
+        """Start optimizing a file unless its content is already optimized."""
+        source = os.path.join(self.source_dir, relative)
+        try:
+            with open(source, "rb") as f:
+                content = f.read()
+        except OSError:
+            return None  # Deleted or replaced since the event.
+        digest = self._digest(content)
+        output = os.path.join(self.output_dir, relative)
+
+        with self._lock:
+            self._timers.pop(relative, None)
+            if self._stop.is_set() or self._in_flight.get(relative) == digest:
+                return None
+            if self._hashes.get(relative) == digest and os.path.exists(output):
+                return None
+            stale = self._tokens.get(relative)
+            if stale is not None:
+                stale.cancel()
+            token = CancelToken()
+            generation = self._generations.get(relative, 0) + 1
+            self._tokens[relative] = token
+            self._generations[relative] = generation
+            self._in_flight[relative] = digest
+
+        return self._executor.submit(
+            self._optimize, relative, content, digest, generation, token
+        )
+
+    def _optimize(
+        self,
+        relative: str,
+        content: bytes,
+        digest: str,
+        generation: int,
+        token: CancelToken,
+    ) -> None:
+        """Optimize one file and write its output if it is still current."""
+        try:
+            optimized = optimize_prompt(
+                user_input=content.decode("utf-8"),
+                mode=self.mode,
+                domain=self.domain,
+                model=self.model,
+                temperature=self.temperature,
+                timeout=self.timeout,
+                cancel_token=token,
+                backend=self.backend,
+                offline_fallback=self.offline_fallback,
+            )
+            error: Optional[Exception] = None
+        except OptimizationCancelledError:
+            return
+        except Exception as e:
+            error = e
+
+        with self._lock:
+            if self._generations.get(relative) != generation:
+                return  # A newer edit superseded this run.
+            self._in_flight.pop(relative, None)
+            self._tokens.pop(relative, None)
+            if error is not None:
+                print(f"Error: {relative}: {error}", file=sys.stderr)
+                return
+            _write_atomic(os.path.join(self.output_dir, relative), optimized)
+            self._hashes[relative] = digest
+            self._save_state()
+        print(f"✓ Optimized {relative}")
+
+    def _scan(self) -> Dict[str, Snapshot]:
+        """List the watched files with their modification time and size."""
+        snapshot: Dict[str, Snapshot] = {}
+        for root, dirs, files in os.walk(self.source_dir):
+            dirs[:] = [
+                d
+                for d in dirs
+                if not d.startswith(".") and os.path.join(root, d) != self.output_dir
+            ]
+            for name in files:
+                path = os.path.join(root, name)
+                relative = self._relative(path)
+                if relative is None:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[relative] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def sync(self) -> int:
+        """
+        Optimize every file whose content changed since it was last
+        optimized, and wait for them.
+
+        Returns:
+            The number of files that were optimized or failed.
+        """
+        futures = [self._dispatch(relative) for relative in self._scan()]
+        started = [f for f in futures if f is not None]
+        wait(started)
+        for future in started:
+            future.result()
+        return len(started)
+
+    def run(self) -> None:
+        """Sync, then watch for changes until `stop` is called."""
+        self.sync()
+        if self.use_polling:
+            self._poll()
+            return
+
+        watcher = self
+
+        class Handler(watchdog.events.FileSystemEventHandler):
+            def on_any_event(self, event: Any) -> None:
+                if event.is_directory:
+                    return
+                for path in (event.src_path, getattr(event, "dest_path", "")):
+                    if path and os.path.isfile(path):
+                        watcher.notify(path)
+
+        observer = watchdog.observers.Observer()
+        observer.schedule(Handler(), self.source_dir, recursive=True)
+        observer.start()
+        try:
+            self._stop.wait()
+        finally:
+            observer.stop()
+            observer.join()
+
+    def _poll(self) -> None:
+        """Watch for changes by comparing periodic scans."""
+        previous = self._scan()
+        while not self._stop.wait(self.poll_interval):
+            current = self._scan()
+            for relative, snapshot in current.items():
+                if previous.get(relative) != snapshot:
+                    self.notify(os.path.join(self.source_dir, relative))
+            previous = current
+
+    def stop(self) -> None:
+        """Stop watching and cancel pending work."""
+        self._stop.set()
+        with self._lock:
+            timers: List[threading.Timer] = list(self._timers.values())
+            tokens = list(self._tokens.values())
+            self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+        for token in tokens:
+            token.cancel()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,21 @@
+"""Shared fixtures for the IsoPrompt tests."""
+
+import pytest
+
+from isoprompt.backends import configure_backends
+from isoprompt.cache import get_result_cache
+from isoprompt.constants import BACKENDS_CONFIG_ENV, JOURNAL_ENV, MODEL_HISTORY_ENV
+
+
+@pytest.fixture(autouse=True)
+def isolated_environment(tmp_path, monkeypatch):
+    """Keep each test away from the user's journal, history and API key."""
+    monkeypatch.setenv(JOURNAL_ENV, "")
+    monkeypatch.setenv(MODEL_HISTORY_ENV, str(tmp_path / "model_history.json"))
+    monkeypatch.delenv(BACKENDS_CONFIG_ENV, raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    configure_backends()
+    get_result_cache().clear()
+    yield
+    configure_backends()
+    get_result_cache().clear()
@@ -0,0 +1,27 @@
+"""Tests for the token-compact encoding of prompt data."""
+
+from isoprompt.ado import encode_data, prepare_data
+from isoprompt.models import DataOptions
+
+
+def test_data_is_kept_as_given_when_no_encoding_is_smaller():
+    encoded = prepare_data("a,b\n1,2\n", True)
+
+    assert encoded.format == "text"
+    assert encoded.text == "a,b\n1,2"
+    assert encoded.tokens == encoded.original_tokens
+
+
+def test_smaller_encoding_replaces_the_data():
+    rows = [{"name": f"user {i}", "team": "core", "note": None} for i in range(20)]
+
+    encoded = encode_data(rows, DataOptions())
+
+    assert encoded.format in ("csv", "json", "kv")
+    assert encoded.tokens < encoded.original_tokens
+    assert "note" not in encoded.text
+
+
+def test_summary_counts_rows():
+    assert encode_data("a,b\n1,2\n").summary.startswith("text data, 1 row with")
+    assert "2 rows with" in encode_data("a,b\n1,2\n3,4\n").summary
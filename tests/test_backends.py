@@ -0,0 +1,91 @@
+"""Tests for backends and their concurrency slots."""
+
+import threading
+import time
+
+import pytest
+
+import isoprompt.optimizer as optimizer
+from isoprompt.backends import configure_backends
+from isoprompt.deadline import CancelToken, Deadline
+from isoprompt.errors import OptimizationCancelledError, OptimizationTimeoutError
+from isoprompt.models import BackendConfig, BackendsConfig
+
+
+@pytest.fixture
+def backend():
+    config = BackendConfig(
+        name="local",
+        base_url="http://127.0.0.1:1/v1",
+        api_key_env=None,
+        max_concurrency=1,
+    )
+    return configure_backends(BackendsConfig(backends=[config])).get("local")
+
+
+@pytest.fixture
+def busy(backend):
+    """Hold the backend's only slot for a second."""
+    held = threading.Event()
+
+    def hold():
+        with backend.slot():
+            held.set()
+            time.sleep(1.0)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait(5)
+    yield
+    thread.join()
+
+
+def test_slot_wait_is_bounded_by_the_deadline(backend, busy):
+    started = time.monotonic()
+
+    with pytest.raises(OptimizationTimeoutError):
+        with backend.slot(Deadline(0.1)):
+            pass
+
+    assert time.monotonic() - started < 0.5
+
+
+def test_slot_wait_is_aborted_by_cancellation(backend, busy):
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+
+    with pytest.raises(OptimizationCancelledError):
+        with backend.slot(cancel_token=token):
+            pass
+
+    assert time.monotonic() - started < 0.5
+
+
+def test_request_is_not_sent_after_the_slot_wait_times_out(backend, busy):
+    sent = []
+    client = backend.client()
+    client.chat.completions.create = lambda **kwargs: sent.append(kwargs)
+
+    with pytest.raises(OptimizationTimeoutError):
+        optimizer._request_optimization(
+            "Explain recursion",
+            "simple",
+            None,
+            "gpt-4.1",
+            0.3,
+            False,
+            Deadline(0.2),
+            2,
+            None,
+            backend=backend,
+        )
+
+    assert sent == []
+
+
+def test_free_slot_is_released_after_use(backend):
+    with backend.slot(Deadline(0.1)):
+        pass
+    with backend.slot(Deadline(0.1)):
+        pass
@@ -0,0 +1,31 @@
+"""Tests for batch and streaming optimization."""
+
+import isoprompt.batch as batch
+from isoprompt.batch import optimize_stream
+from isoprompt.constants import HEURISTIC_BACKEND
+from isoprompt.models import BatchRecord
+
+
+def test_stream_yields_results_in_input_order():
+    records = [BatchRecord(id=str(i), prompt=f"Explain topic {i}") for i in range(5)]
+
+    results = list(optimize_stream(records, max_in_flight=2, backend=HEURISTIC_BACKEND))
+
+    assert [r.id for r in results] == ["0", "1", "2", "3", "4"]
+    assert all(r.optimized_prompt for r in results)
+
+
+def test_stream_forwards_retries_and_ensemble_size(monkeypatch):
+    calls = []
+
+    def fake_optimize_prompt(**kwargs):
+        calls.append((kwargs["max_retries"], kwargs["ensemble_size"]))
+        return "optimized"
+
+    monkeypatch.setattr(batch, "optimize_prompt", fake_optimize_prompt)
+    records = [BatchRecord(id="1", prompt="Explain recursion")]
+
+    results = list(optimize_stream(records, max_retries=5, ensemble_size=3))
+
+    assert calls == [(5, 3)]
+    assert results[0].optimized_prompt == "optimized"
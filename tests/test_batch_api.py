@@ -0,0 +1,96 @@
+"""Tests for jobs run through the OpenAI Batch API."""
+
+import contextlib
+import json
+from types import SimpleNamespace
+
+from isoprompt.batch_api import (
+    iter_batch_api_results,
+    prepare_batch_api_state,
+    submit_batch_api_jobs,
+    wait_for_batch_api_jobs,
+)
+from isoprompt.models import BatchRecord
+
+
+class FakeBatchClient:
+    """A client whose batches are created with a fixed status."""
+
+    def __init__(self, batch, files=None):
+        self.batch = batch
+        self.files_content = files or {}
+        self.retrieved = 0
+        self.files = SimpleNamespace(
+            create=lambda **kwargs: SimpleNamespace(id="file-input"),
+            with_streaming_response=SimpleNamespace(content=self._content),
+        )
+        self.batches = SimpleNamespace(
+            create=lambda **kwargs: self.batch, retrieve=self._retrieve
+        )
+
+    def _retrieve(self, batch_id):
+        self.retrieved += 1
+        return self.batch
+
+    @contextlib.contextmanager
+    def _content(self, file_id):
+        lines = [json.dumps(line) for line in self.files_content[file_id]]
+        yield SimpleNamespace(iter_lines=lambda: iter(lines))
+
+
+def _batch(status, output_file_id=None, errors=None):
+    return SimpleNamespace(
+        id="batch-1",
+        status=status,
+        output_file_id=output_file_id,
+        error_file_id=None,
+        errors=SimpleNamespace(data=errors or []),
+    )
+
+
+def _records():
+    return [
+        BatchRecord(id="a", prompt="Explain recursion", mode="simple"),
+        BatchRecord(id="b", prompt="explain recursion.", mode="simple"),
+    ]
+
+
+def test_batch_completed_at_creation_keeps_its_output(tmp_path):
+    output = {
+        "custom_id": "0",
+        "response": {
+            "status_code": 200,
+            "body": {"choices": [{"message": {"content": "Optimized"}}]},
+        },
+    }
+    client = FakeBatchClient(
+        _batch("completed", output_file_id="file-output"),
+        files={"file-output": [output]},
+    )
+    state, lines = prepare_batch_api_state(_records())
+    state_path = str(tmp_path / "state.json")
+
+    submit_batch_api_jobs(client, state, lines, state_path)
+    wait_for_batch_api_jobs(client, state, state_path, poll_interval=0.01)
+    results = list(iter_batch_api_results(client, state))
+
+    assert state.jobs[0].output_file_id == "file-output"
+    assert [(r.id, r.optimized_prompt, r.duplicate_of) for r in results] == [
+        ("a", "Optimized", None),
+        ("b", "Optimized", "a"),
+    ]
+
+
+def test_batch_failed_at_creation_reports_its_errors(tmp_path):
+    errors = [SimpleNamespace(message="Invalid model in line 1")]
+    client = FakeBatchClient(_batch("failed", errors=errors))
+    state, lines = prepare_batch_api_state(_records())
+    state_path = str(tmp_path / "state.json")
+
+    submit_batch_api_jobs(client, state, lines, state_path)
+    wait_for_batch_api_jobs(client, state, state_path, poll_interval=0.01)
+    results = list(iter_batch_api_results(client, state))
+
+    assert client.retrieved == 0
+    assert [r.id for r in results] == ["a", "b"]
+    assert all("Invalid model in line 1" in r.error for r in results)
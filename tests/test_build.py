@@ -0,0 +1,102 @@
+"""Tests for incremental builds from a manifest."""
+
+import json
+import os
+
+import pytest
+
+from isoprompt.build import run_build
+from isoprompt.constants import HEURISTIC_BACKEND
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    """A manifest of three entries, two of which list `style.md`."""
+    files = {
+        "prompts/a.txt": "Summarize the quarterly report",
+        "prompts/b.txt": "Write release notes for version 2",
+        "prompts/c.txt": "Explain the deployment process",
+        "style.md": "Use short sentences.",
+        "tone.md": "Be friendly.",
+    }
+    for name, text in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    entries = [
+        {"source": "prompts/a.txt", "output": "out/a.md", "guidelines": ["style.md"]},
+        {
+            "source": "prompts/b.txt",
+            "output": "out/b.md",
+            "guidelines": ["style.md", "tone.md"],
+        },
+        {"source": "prompts/c.txt", "output": "out/c.md", "guidelines": ["tone.md"]},
+    ]
+    path = tmp_path / "isoprompt.json"
+    path.write_text(json.dumps({"entries": entries}), encoding="utf-8")
+    return str(path)
+
+
+def _build(manifest, **kwargs):
+    return run_build(manifest, backend=HEURISTIC_BACKEND, **kwargs)
+
+
+def test_first_build_builds_every_entry(manifest):
+    report = _build(manifest)
+
+    assert report.built == 3
+    assert report.failed == 0
+    base = os.path.dirname(manifest)
+    assert all(
+        os.path.exists(os.path.join(base, "out", f"{name}.md")) for name in "abc"
+    )
+
+
+def test_unchanged_manifest_rebuilds_nothing(manifest):
+    _build(manifest)
+
+    report = _build(manifest)
+
+    assert report.built == 0
+    assert report.up_to_date == 3
+    assert report.stale == {}
+
+
+def test_editing_a_guideline_rebuilds_exactly_the_entries_listing_it(manifest):
+    _build(manifest)
+    with open(os.path.join(os.path.dirname(manifest), "style.md"), "a") as f:
+        f.write("\nAvoid jargon.")
+
+    report = _build(manifest)
+
+    assert sorted(report.stale) == ["out/a.md", "out/b.md"]
+    assert report.stale["out/a.md"] == "changed: guidelines style.md"
+    assert report.built == 2
+    assert report.up_to_date == 1
+
+
+def test_force_rebuilds_every_entry(manifest):
+    _build(manifest)
+
+    report = _build(manifest, force=True)
+
+    assert report.built == 3
+    assert set(report.stale.values()) == {"forced"}
+
+
+def test_missing_output_rebuilds_only_that_entry(manifest):
+    _build(manifest)
+    os.remove(os.path.join(os.path.dirname(manifest), "out", "c.md"))
+
+    report = _build(manifest)
+
+    assert report.stale == {"out/c.md": "output missing"}
+    assert report.built == 1
+
+
+def test_dry_run_reports_without_building(manifest):
+    report = _build(manifest, dry_run=True)
+
+    assert len(report.stale) == 3
+    assert report.built == 0
+    assert not os.path.exists(os.path.join(os.path.dirname(manifest), "out"))
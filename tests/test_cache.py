@@ -0,0 +1,85 @@
+"""Tests for the result cache and its keys."""
+
+import pytest
+
+import isoprompt.optimizer as optimizer
+from isoprompt.backends import configure_backends
+from isoprompt.cache import make_cache_key
+from isoprompt.models import BackendConfig, BackendsConfig
+from isoprompt.optimizer import optimize_prompt
+from isoprompt.semantic_cache import SemanticCache
+
+PROMPT = "Write a haiku about the sea"
+
+
+def test_cache_key_depends_on_ensemble_size():
+    single = make_cache_key(PROMPT, "simple", None, "gpt-4.1", 0.3, 1)
+    ensemble = make_cache_key(PROMPT, "simple", None, "gpt-4.1", 0.3, 3)
+
+    assert single != ensemble
+    assert single == make_cache_key(PROMPT, "simple", None, "gpt-4.1", 0.3)
+
+
+def test_cached_result_is_not_reused_for_another_ensemble_size(monkeypatch):
+    calls = []
+
+    def fake_request(*args, **kwargs):
+        n_candidates = args[10]
+        calls.append(n_candidates)
+        return f"optimized with {n_candidates}"
+
+    monkeypatch.setattr(optimizer, "_request_optimization", fake_request)
+
+    first = optimize_prompt(PROMPT, "simple", use_cache=True, ensemble_size=1)
+    second = optimize_prompt(PROMPT, "simple", use_cache=True, ensemble_size=3)
+    again = optimize_prompt(PROMPT, "simple", use_cache=True, ensemble_size=3)
+
+    assert calls == [1, 3]
+    assert (first, second, again) == (
+        "optimized with 1",
+        "optimized with 3",
+        "optimized with 3",
+    )
+
+
+def test_cache_key_depends_on_backend():
+    default = make_cache_key(PROMPT, "simple", None, "gpt-4.1", 0.3, 1)
+    local = make_cache_key(PROMPT, "simple", None, "gpt-4.1", 0.3, 1, "local")
+
+    assert default != local
+    assert default == make_cache_key(
+        PROMPT, "simple", None, "gpt-4.1", 0.3, 1, "openai"
+    )
+
+
+def test_cached_result_is_not_reused_for_another_backend(monkeypatch):
+    configure_backends(
+        BackendsConfig(
+            backends=[BackendConfig(name="local", base_url="http://127.0.0.1:1/v1")]
+        )
+    )
+    calls = []
+
+    def fake_request(*args, **kwargs):
+        backend = args[11]
+        calls.append(backend.name)
+        return f"optimized by {backend.name}"
+
+    monkeypatch.setattr(optimizer, "_request_optimization", fake_request)
+
+    first = optimize_prompt(PROMPT, "simple", use_cache=True, backend="openai")
+    second = optimize_prompt(PROMPT, "simple", use_cache=True, backend="local")
+
+    assert calls == ["openai", "local"]
+    assert (first, second) == ("optimized by openai", "optimized by local")
+
+
+def test_semantic_cache_is_partitioned_by_backend():
+    pytest.importorskip("numpy")
+    cache = SemanticCache(threshold=0.9)
+    cache.add(PROMPT, "simple", None, "gpt-4.1", "optimized by local", "local")
+
+    assert cache.lookup(PROMPT, "simple", None, "gpt-4.1", "openai") is None
+    assert cache.lookup(PROMPT, "simple", None, "gpt-4.1", "local") == (
+        "optimized by local"
+    )
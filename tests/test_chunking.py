@@ -0,0 +1,88 @@
+"""Tests for splitting long inputs and assembling their sections."""
+
+import pytest
+
+import isoprompt.chunking as chunking
+from isoprompt.chunking import SECTIONS_MARKER, assemble_sections, split_input
+
+
+def _words(text, model=None):
+    return len(text.split())
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # One token per word keeps the counts exact and needs no tokenizer data.
+    monkeypatch.setattr(chunking, "count_tokens", _words)
+
+
+def _paragraph(label, words):
+    return " ".join(f"{label}{i}" for i in range(words)) + "."
+
+
+def test_input_that_fits_is_one_chunk():
+    assert split_input("Explain recursion.", 10) == ["Explain recursion."]
+
+
+def test_chunks_respect_max_tokens():
+    text = "\n\n".join(_paragraph(f"p{n}w", 7) for n in range(9))
+
+    chunks = split_input(text, 20)
+
+    assert all(_words(chunk) <= 20 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_text_without_boundaries_is_cut_within_budget():
+    text = "x" * 400
+
+    chunks = split_input(text, 1)
+
+    assert "".join(chunks) == text
+
+
+def test_splits_on_headings_before_paragraphs():
+    first = "# Setup\n\n" + "\n\n".join(_paragraph("a", 4) for _ in range(3))
+    second = "# Usage\n\n" + "\n\n".join(_paragraph("b", 4) for _ in range(3))
+
+    chunks = split_input(f"{first}\n\n{second}", 16)
+
+    assert chunks == [first, second]
+
+
+def test_chunks_are_balanced():
+    # 10 paragraphs of 5 words fit in 3 chunks of at most 20 tokens; greedy
+    # filling would leave a 10-token straggler after two full chunks.
+    text = "\n\n".join(_paragraph(f"p{n}w", 5) for n in range(10))
+
+    sizes = [_words(chunk) for chunk in split_input(text, 20)]
+
+    assert len(sizes) == 3
+    assert max(sizes) - min(sizes) <= 5
+
+
+def test_max_tokens_must_be_positive():
+    with pytest.raises(ValueError):
+        split_input("Explain recursion.", 0)
+
+
+def test_assemble_puts_sections_between_opening_and_closing():
+    reduced = f"You are a tutor.\n{SECTIONS_MARKER}\nAnswer in Markdown."
+
+    prompt = assemble_sections(reduced, [" Part one. ", "Part two."])
+
+    assert prompt == (
+        "You are a tutor.\n\nPart one.\n\nPart two.\n\nAnswer in Markdown."
+    )
+
+
+def test_assemble_without_marker_treats_answer_as_opening():
+    prompt = assemble_sections("You are a tutor.", ["Part one.", "Part two."])
+
+    assert prompt == "You are a tutor.\n\nPart one.\n\nPart two."
+
+
+def test_assemble_skips_empty_parts():
+    prompt = assemble_sections(f"{SECTIONS_MARKER}\n", ["Part one.", "  "])
+
+    assert prompt == "Part one."
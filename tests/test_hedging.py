@@ -0,0 +1,54 @@
+"""Tests for hedged calls."""
+
+import asyncio
+
+from isoprompt.hedging import HedgePolicy
+
+
+async def _stream(items, delay=0.0):
+    for item in items:
+        await asyncio.sleep(delay)
+        yield item
+
+
+def test_stream_records_only_time_to_first_item():
+    policy = HedgePolicy()
+
+    async def consume_slowly():
+        items = []
+        async for item in policy.stream_async(lambda: _stream(["a", "b", "c"])):
+            items.append(item)
+            await asyncio.sleep(0.05)  # A slow client reading the stream.
+        return items
+
+    assert asyncio.run(consume_slowly()) == ["a", "b", "c"]
+    assert len(policy.first_token_latency) == 1
+    assert len(policy.latency) == 0
+
+
+def test_full_calls_record_their_latency():
+    policy = HedgePolicy()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        return "result"
+
+    assert asyncio.run(policy.run_async(call)) == "result"
+    assert policy.run(lambda: "result") == "result"
+    assert len(policy.latency) == 2
+
+
+def test_slow_call_is_hedged_once_warmed_up():
+    policy = HedgePolicy(budget=1.0, min_samples=3, min_delay=0.01)
+    for _ in range(3):
+        policy.latency.record(0.01)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        await asyncio.sleep(0.5 if len(attempts) == 1 else 0.0)
+        return len(attempts)
+
+    assert asyncio.run(policy.run_async(call)) == 2
+    assert policy.stats()["hedges"] == 1
+    assert policy.stats()["hedge_wins"] == 1
@@ -0,0 +1,154 @@
+"""Tests for incremental re-optimization of edited prompts."""
+
+import pytest
+
+import isoprompt.optimizer as optimizer
+from isoprompt.backends import configure_backends
+from isoprompt.incremental import apply_edits, diff_inputs, parse_edits
+from isoprompt.models import BackendConfig, BackendsConfig
+
+PREVIOUS = "Explain recursion. Use a simple example. Keep it short."
+PREVIOUS_OUTPUT = "You are a teacher. Explain recursion with a simple example."
+
+
+@pytest.fixture(autouse=True)
+def local_backend():
+    config = BackendConfig(
+        name="local", base_url="http://127.0.0.1:1/v1", api_key_env=None
+    )
+    configure_backends(BackendsConfig(backends=[config]))
+
+
+# --- Pure functions ---
+
+
+def test_diff_of_identical_inputs_is_empty():
+    assert diff_inputs(PREVIOUS, PREVIOUS) == ("", 0.0)
+
+
+def test_diff_lists_changed_sentences_and_their_share():
+    current = "Explain recursion. Use a factorial example. Keep it short."
+
+    diff, ratio = diff_inputs(PREVIOUS, current)
+
+    assert diff == "- Use a simple example.\n+ Use a factorial example."
+    changed = len("Use a simple example.") + len("Use a factorial example.")
+    unchanged = len("Explain recursion.") + len("Keep it short.")
+    total = changed + 2 * unchanged
+    assert ratio == pytest.approx(changed / total)
+    assert 0.0 < ratio < 1.0
+
+
+def test_diff_of_a_rewrite_is_a_full_change():
+    _, ratio = diff_inputs(PREVIOUS, "Write a poem about the sea.")
+
+    assert ratio == 1.0
+
+
+def test_parse_edits_accepts_code_fenced_json():
+    content = '```json\n{"edits": [{"find": "teacher", "replace": "tutor"}]}\n```'
+
+    assert parse_edits(content) == [("teacher", "tutor")]
+
+
+@pytest.mark.parametrize(
+    "content",
+    ["not json", '["edits"]', '{"edits": "none"}', '{"edits": [{"find": 1}]}'],
+)
+def test_parse_edits_rejects_invalid_answers(content):
+    with pytest.raises(ValueError):
+        parse_edits(content)
+
+
+def test_apply_edits_replaces_the_first_occurrence():
+    text = apply_edits("a b a", [("a", "c")])
+
+    assert text == "c b a"
+
+
+def test_apply_edits_with_a_missing_target_raises():
+    with pytest.raises(ValueError, match="not found"):
+        apply_edits(PREVIOUS_OUTPUT, [("astronomer", "tutor")])
+
+
+def test_apply_edits_with_an_empty_find_appends():
+    text = apply_edits(PREVIOUS_OUTPUT, [("", "  Answer in French.  ")])
+
+    assert text == PREVIOUS_OUTPUT + "\n\nAnswer in French."
+
+
+# --- reoptimize_prompt ---
+
+
+def _reoptimize(current, max_change_ratio):
+    return optimizer.reoptimize_prompt(
+        PREVIOUS,
+        PREVIOUS_OUTPUT,
+        current,
+        model="gpt-4.1",
+        max_change_ratio=max_change_ratio,
+        backend="local",
+    )
+
+
+def test_small_change_is_patched(monkeypatch):
+    monkeypatch.setattr(
+        optimizer,
+        "_request_optimization",
+        lambda *args, **kwargs: '{"edits": [{"find": "simple", "replace": "factorial"}]}',
+    )
+    monkeypatch.setattr(
+        optimizer, "optimize_prompt", lambda *args, **kwargs: pytest.fail("full")
+    )
+
+    result = _reoptimize(
+        "Explain recursion. Use a factorial example. Keep it short.", 0.9
+    )
+
+    assert result.strategy == "patch"
+    assert result.edits == 1
+    assert result.optimized_prompt == PREVIOUS_OUTPUT.replace("simple", "factorial")
+
+
+def test_change_above_max_ratio_is_optimized_from_scratch(monkeypatch):
+    monkeypatch.setattr(
+        optimizer,
+        "_request_optimization",
+        lambda *args, **kwargs: pytest.fail("patch requested"),
+    )
+    monkeypatch.setattr(
+        optimizer, "optimize_prompt", lambda *args, **kwargs: "Full prompt."
+    )
+
+    result = _reoptimize(
+        "Explain recursion. Use a factorial example. Keep it short.", 0.1
+    )
+
+    assert result.strategy == "full"
+    assert result.change_ratio > 0.1
+    assert result.optimized_prompt == "Full prompt."
+
+
+def test_unusable_patch_is_optimized_from_scratch(monkeypatch):
+    monkeypatch.setattr(
+        optimizer,
+        "_request_optimization",
+        lambda *args, **kwargs: '{"edits": [{"find": "absent", "replace": "x"}]}',
+    )
+    monkeypatch.setattr(
+        optimizer, "optimize_prompt", lambda *args, **kwargs: "Full prompt."
+    )
+
+    result = _reoptimize(
+        "Explain recursion. Use a factorial example. Keep it short.", 0.9
+    )
+
+    assert result.strategy == "full"
+    assert result.optimized_prompt == "Full prompt."
+
+
+def test_unchanged_input_reuses_the_previous_prompt():
+    result = _reoptimize(PREVIOUS, 0.9)
+
+    assert result.strategy == "unchanged"
+    assert result.optimized_prompt == PREVIOUS_OUTPUT
@@ -0,0 +1,41 @@
+"""Tests for the run journal and its summaries."""
+
+import pytest
+
+from isoprompt.journal import RunJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.sqlite3"), retention_days=None)
+    yield journal
+    journal.close()
+
+
+def _append(journal, timestamp, outcome="ok"):
+    journal.append(
+        "gpt-4.1", "simple", None, "openai", 10, 5, 0.5, False, outcome, timestamp
+    )
+
+
+def test_runs_per_minute_spans_first_to_last_run(journal):
+    # Ten runs over two minutes, inside a window of a whole day.
+    for i in range(10):
+        _append(journal, 1_000_000.0 + i * 120.0 / 9)
+
+    (summary,) = journal.summarize(since=1_000_000.0 - 43_200, until=1_043_200.0)
+
+    assert summary.runs == 10
+    assert summary.runs_per_minute == pytest.approx(5.0)
+
+
+def test_summary_counts_errors_and_tokens(journal):
+    _append(journal, 1_000_000.0)
+    _append(journal, 1_000_001.0, outcome="UpstreamError")
+
+    (summary,) = journal.summarize(since=0.0, until=2_000_000.0)
+
+    assert summary.errors == 1
+    assert summary.error_rate == 0.5
+    assert summary.prompt_tokens == 20
+    assert summary.runs_per_minute == pytest.approx(2.0)
@@ -0,0 +1,96 @@
+"""Tests for multi-pass refinement."""
+
+import asyncio
+
+import isoprompt.refine as refine
+from isoprompt.models import RefinementOptions
+from isoprompt.refine import refine_prompt, refine_prompt_async
+
+PROMPT = "Write a function that parses dates"
+
+
+def _fake_passes(monkeypatch, name):
+    """Replace the optimizer of each pass, recording its arguments."""
+    calls = []
+
+    def record(**kwargs):
+        calls.append(kwargs)
+        return f"{kwargs['user_input']} refined"
+
+    async def record_async(**kwargs):
+        return record(**kwargs)
+
+    fake = record_async if name.endswith("_async") else record
+    monkeypatch.setattr(refine, name, fake)
+    return calls
+
+
+def test_refine_forwards_ensemble_size_and_offline_fallback(monkeypatch):
+    calls = _fake_passes(monkeypatch, "optimize_prompt")
+
+    result = refine_prompt(
+        PROMPT,
+        options=RefinementOptions(passes=2, convergence_threshold=1.0),
+        ensemble_size=3,
+        offline_fallback=True,
+    )
+
+    assert result.passes == 2
+    assert [(c["ensemble_size"], c["offline_fallback"]) for c in calls] == [
+        (3, True),
+        (3, True),
+    ]
+
+
+def test_async_refine_forwards_ensemble_size_and_offline_fallback(monkeypatch):
+    calls = _fake_passes(monkeypatch, "optimize_prompt_async")
+
+    asyncio.run(
+        refine_prompt_async(
+            PROMPT,
+            options=RefinementOptions(passes=2, convergence_threshold=1.0),
+            ensemble_size=3,
+            offline_fallback=True,
+        )
+    )
+
+    assert [(c["ensemble_size"], c["offline_fallback"]) for c in calls] == [
+        (3, True),
+        (3, True),
+    ]
+
+
+def test_auto_mode_and_domain_are_routed_once_on_the_request(monkeypatch):
+    calls = _fake_passes(monkeypatch, "optimize_prompt")
+    routed = []
+
+    def fake_resolve_auto(user_input, mode, domain):
+        routed.append(user_input)
+        return "analytical", "software"
+
+    monkeypatch.setattr(refine, "resolve_auto", fake_resolve_auto)
+
+    refine_prompt(
+        PROMPT,
+        mode="auto",
+        domain="auto",
+        options=RefinementOptions(passes=3, convergence_threshold=1.0),
+    )
+
+    assert routed == [PROMPT]
+    assert [(c["mode"], c["domain"]) for c in calls] == [("analytical", "software")] * 3
+
+
+def test_async_auto_mode_is_routed_once_on_the_request(monkeypatch):
+    calls = _fake_passes(monkeypatch, "optimize_prompt_async")
+    monkeypatch.setattr(refine, "resolve_auto", lambda u, m, d: ("simple", None))
+
+    asyncio.run(
+        refine_prompt_async(
+            PROMPT,
+            mode="auto",
+            options=RefinementOptions(passes=2, convergence_threshold=1.0),
+        )
+    )
+
+    assert [c["mode"] for c in calls] == ["simple", "simple"]
@@ -0,0 +1,248 @@
+"""Tests for deadlines, cancellation, retries and error translation."""
+
+import asyncio
+import importlib
+import threading
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+import isoprompt.optimizer as optimizer
+from isoprompt.backends import configure_backends
+from isoprompt.deadline import CancelToken, Deadline
+from isoprompt.errors import (
+    OptimizationCancelledError,
+    OptimizationTimeoutError,
+    RateLimitedError,
+    UpstreamError,
+)
+from isoprompt.models import BackendConfig, BackendsConfig
+from isoprompt.optimizer import _plan_retry, _retry_delay, translate_error
+
+# The HTTP library the SDK is built on.
+http = importlib.import_module(
+    openai.DefaultHttpxClient.__mro__[1].__module__.split(".")[0]
+)
+REQUEST = http.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def _response(status, headers=None):
+    return http.Response(status, headers=headers or {}, request=REQUEST)
+
+
+def _rate_limit(retry_after=None):
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    return openai.RateLimitError(
+        "Rate limited", response=_response(429, headers), body=None
+    )
+
+
+def _status_error(status):
+    return openai.APIStatusError("Failed", response=_response(status), body=None)
+
+
+# --- Error translation ---
+
+
+def test_rate_limit_keeps_retry_after():
+    error = translate_error(_rate_limit(retry_after=3))
+
+    assert isinstance(error, RateLimitedError)
+    assert error.retry_after == 3.0
+    assert error.retryable
+
+
+def test_rate_limit_without_retry_after():
+    assert translate_error(_rate_limit()).retry_after is None
+
+
+@pytest.mark.parametrize(
+    "status, retryable", [(400, False), (404, False), (408, True), (500, True)]
+)
+def test_status_errors_are_retryable_only_when_transient(status, retryable):
+    error = translate_error(_status_error(status))
+
+    assert isinstance(error, UpstreamError)
+    assert error.status_code == status
+    assert error.retryable is retryable
+
+
+def test_connection_errors_are_retryable():
+    error = translate_error(openai.APIConnectionError(request=REQUEST))
+
+    assert isinstance(error, UpstreamError)
+    assert error.retryable
+
+
+@pytest.mark.parametrize(
+    "error", [openai.APITimeoutError(request=REQUEST), asyncio.TimeoutError()]
+)
+def test_timeouts_become_optimization_timeouts(error):
+    assert isinstance(translate_error(error), OptimizationTimeoutError)
+
+
+def test_typed_errors_pass_through():
+    error = RateLimitedError("Slow down.", retry_after=1.0)
+
+    assert translate_error(error) is error
+
+
+# --- Retry planning ---
+
+
+def test_retry_delay_honors_retry_after():
+    error = RateLimitedError("Slow down.", retry_after=4.0)
+
+    assert _retry_delay(error, attempt=0) == 4.0
+    assert _retry_delay(error, attempt=5) == 4.0
+
+
+def test_retry_delay_backs_off_exponentially():
+    error = UpstreamError("Unavailable.", retryable=True)
+
+    first = _retry_delay(error, attempt=0)
+    third = _retry_delay(error, attempt=2)
+
+    assert 0.25 <= first <= 0.5
+    assert 1.0 <= third <= 2.0
+
+
+def test_no_retry_that_would_overrun_the_deadline():
+    error = RateLimitedError("Slow down.", retry_after=5.0)
+
+    assert _plan_retry(error, 0, 3, Deadline(1.0)) is None
+    assert _plan_retry(error, 0, 3, Deadline(10.0)) == 5.0
+
+
+def test_no_retry_past_max_retries_or_for_permanent_errors():
+    transient = UpstreamError("Unavailable.", retryable=True)
+    permanent = UpstreamError("Bad request.", status_code=400)
+
+    assert _plan_retry(transient, 2, 2, Deadline(None)) is None
+    assert _plan_retry(permanent, 0, 2, Deadline(None)) is None
+
+
+@pytest.fixture
+def backend():
+    config = BackendConfig(
+        name="local", base_url="http://127.0.0.1:1/v1", api_key_env=None
+    )
+    return configure_backends(BackendsConfig(backends=[config])).get("local")
+
+
+def _request(backend, deadline, cancel_token=None):
+    return optimizer._request_optimization(
+        "Explain recursion",
+        "simple",
+        None,
+        "gpt-4.1",
+        0.3,
+        False,
+        deadline,
+        3,
+        cancel_token,
+        backend=backend,
+    )
+
+
+def test_request_never_sleeps_past_the_deadline(backend):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        raise _rate_limit(retry_after=10)
+
+    backend.client().chat.completions.create = create
+    started = time.monotonic()
+
+    with pytest.raises(RateLimitedError):
+        _request(backend, Deadline(0.5))
+
+    assert time.monotonic() - started < 0.5
+    assert len(calls) == 1
+
+
+def test_request_retries_after_retry_after(backend):
+    attempts = []
+
+    response = SimpleNamespace(
+        usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content="OK"))]
+    )
+
+    def create(**kwargs):
+        attempts.append(kwargs["timeout"])
+        if len(attempts) == 1:
+            raise _rate_limit(retry_after=0.01)
+        return response
+
+    backend.client().chat.completions.create = create
+
+    assert _request(backend, Deadline(5.0)) == "OK"
+    assert len(attempts) == 2
+    # Each attempt's HTTP timeout is what is left of the deadline.
+    assert attempts[1] < attempts[0] <= 5.0
+
+
+def test_request_retry_wait_is_aborted_by_cancellation(backend):
+    def create(**kwargs):
+        raise _rate_limit(retry_after=2)
+
+    backend.client().chat.completions.create = create
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+
+    with pytest.raises(OptimizationCancelledError):
+        _request(backend, Deadline(10.0), token)
+
+    assert time.monotonic() - started < 1.0
+
+
+# --- Deadlines and cancellation ---
+
+
+def test_deadline_resolves_to_the_earlier_limit():
+    later = Deadline(100.0)
+
+    assert Deadline.resolve(later, 1.0).remaining() <= 1.0
+    assert Deadline.resolve(Deadline(1.0), 100.0).remaining() <= 1.0
+    assert Deadline.resolve(None, None).remaining() is None
+
+
+def test_expired_deadline_raises():
+    deadline = Deadline(0.0)
+
+    assert deadline.expired()
+    with pytest.raises(OptimizationTimeoutError):
+        deadline.check()
+
+
+def test_cancel_token_sleep_wakes_on_cancellation():
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+    started = time.monotonic()
+
+    with pytest.raises(OptimizationCancelledError):
+        token.sleep(5.0)
+
+    assert time.monotonic() - started < 1.0
+
+
+def test_cancel_token_sleep_returns_without_cancellation():
+    CancelToken().sleep(0.01)
+
+
+def test_cancel_token_runs_callbacks_once():
+    token = CancelToken()
+    calls = []
+    token.add_callback(lambda: calls.append("registered"))
+
+    token.cancel()
+    token.cancel()
+    token.add_callback(lambda: calls.append("late"))
+
+    assert calls == ["registered", "late"]
+    with pytest.raises(OptimizationCancelledError):
+        token.check()
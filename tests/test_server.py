@@ -0,0 +1,62 @@
+"""Tests for the HTTP server's mapping of optimization errors to statuses."""
+
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+from isoprompt.errors import (
+    EmptyResponseError,
+    OptimizationTimeoutError,
+    RateLimitedError,
+    UpstreamError,
+)
+from isoprompt.server import HTTPError, IsoPromptServer
+
+
+def _status_of(error):
+    """Fail a queued job with `error` and return the HTTP error it becomes."""
+
+    async def run():
+        server = IsoPromptServer()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        future.set_exception(error)
+        with pytest.raises(HTTPError) as raised:
+            await server._await_job(future, loop.time() + 5)
+        return raised.value
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "error, status",
+    [
+        (OptimizationTimeoutError("Deadline exceeded."), HTTPStatus.GATEWAY_TIMEOUT),
+        (RateLimitedError("Slow down."), HTTPStatus.TOO_MANY_REQUESTS),
+        (UpstreamError("Bad request.", status_code=400), HTTPStatus.BAD_REQUEST),
+        (UpstreamError("Unavailable.", status_code=503), HTTPStatus.BAD_GATEWAY),
+        (UpstreamError("Connection reset."), HTTPStatus.BAD_GATEWAY),
+        (EmptyResponseError("No content."), HTTPStatus.BAD_GATEWAY),
+        (ValueError("Invalid mode."), HTTPStatus.BAD_REQUEST),
+    ],
+)
+def test_errors_map_to_statuses(error, status):
+    assert _status_of(error).status == status
+
+
+def test_rate_limit_forwards_retry_after():
+    error = _status_of(RateLimitedError("Slow down.", retry_after=2.5))
+
+    assert error.headers == {"Retry-After": "2"}
+
+
+def test_job_past_its_deadline_is_a_gateway_timeout():
+    async def run():
+        server = IsoPromptServer()
+        loop = asyncio.get_running_loop()
+        with pytest.raises(HTTPError) as raised:
+            await server._await_job(loop.create_future(), loop.time() + 0.01)
+        return raised.value
+
+    assert asyncio.run(run()).status == HTTPStatus.GATEWAY_TIMEOUT
@@ -0,0 +1,121 @@
+"""Tests for sharded, resumable batch runs."""
+
+import json
+
+import pytest
+
+from isoprompt.models import BatchItemResult, BatchRecord
+from isoprompt.sharding import (
+    ShardCheckpoint,
+    merge_batch_results,
+    parse_shard,
+    select_shard,
+    shard_of,
+)
+
+IDS = [f"record-{i}" for i in range(200)]
+
+
+def _write(path, results):
+    path.write_text(
+        "".join(r.model_dump_json(exclude_none=True) + "\n" for r in results),
+        encoding="utf-8",
+    )
+
+
+def _ok(record_id, prompt="Optimized."):
+    return BatchItemResult(id=record_id, optimized_prompt=prompt)
+
+
+def _failed(record_id):
+    return BatchItemResult(id=record_id, error="Timed out.", error_type="timeout")
+
+
+# --- Shard assignment ---
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    for spec in ["4/4", "-1/4", "0/0", "1", "a/b"]:
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_shards_partition_ids_disjointly_and_completely():
+    records = [BatchRecord(id=i, prompt="Explain recursion.") for i in IDS]
+
+    shards = [select_shard(records, index, 4) for index in range(4)]
+
+    ids = [record.id for shard in shards for record in shard]
+    assert sorted(ids) == sorted(IDS)
+    assert len(set(ids)) == len(IDS)
+    assert all(shard for shard in shards)
+    for shard in shards:
+        assert [r.id for r in shard] == sorted((r.id for r in shard), key=IDS.index)
+
+
+def test_shard_of_is_stable():
+    assert [shard_of(i, 4) for i in IDS] == [shard_of(i, 4) for i in IDS]
+    assert all(0 <= shard_of(i, 3) < 3 for i in IDS)
+
+
+# --- Checkpoint ---
+
+
+def test_checkpoint_records_only_successes(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = ShardCheckpoint(str(path))
+    checkpoint.record(_ok("a"))
+    checkpoint.record(_failed("b"))
+    checkpoint.record(_ok("a", "Again."))
+    checkpoint.close()
+
+    assert list(ShardCheckpoint(str(path)).completed) == ["a"]
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_checkpoint_skips_truncated_line_and_appends_on_new_line(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    truncated = _ok("b").model_dump_json()[:12]
+    path.write_text(_ok("a").model_dump_json() + "\n" + truncated, encoding="utf-8")
+
+    checkpoint = ShardCheckpoint(str(path))
+    assert list(checkpoint.completed) == ["a"]
+    checkpoint.record(_ok("c"))
+    checkpoint.close()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[1] == truncated
+    assert json.loads(lines[2])["id"] == "c"
+    assert list(ShardCheckpoint(str(path)).completed) == ["a", "c"]
+
+
+# --- Merge ---
+
+
+def test_merge_prefers_success_over_failure(tmp_path):
+    first, second = tmp_path / "0.jsonl", tmp_path / "1.jsonl"
+    _write(first, [_failed("a"), _ok("b", "First.")])
+    _write(second, [_ok("a"), _failed("b"), _ok("b", "Second.")])
+
+    results = merge_batch_results(
+        [str(first), str(second)], str(tmp_path / "merged.jsonl")
+    )
+
+    by_id = {r.id: r for r in results}
+    assert by_id["a"].error is None
+    assert by_id["b"].optimized_prompt == "First."
+
+
+def test_merge_keeps_input_order(tmp_path):
+    first, second = tmp_path / "0.jsonl", tmp_path / "1.jsonl"
+    _write(first, [_ok("c"), _ok("x")])
+    _write(second, [_ok("b"), _ok("a")])
+    records = [BatchRecord(id=i, prompt="Explain recursion.") for i in "abc"]
+    output = tmp_path / "merged.jsonl"
+
+    results = merge_batch_results([str(first), str(second)], str(output), records)
+
+    assert [r.id for r in results] == ["a", "b", "c", "x"]
+    written = [json.loads(line)["id"] for line in output.read_text().splitlines()]
+    assert written == ["a", "b", "c", "x"]
@@ -0,0 +1,164 @@
+"""Tests for single-flight coalescing."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from isoprompt.errors import (
+    OptimizationCancelledError,
+    OptimizationTimeoutError,
+    UpstreamError,
+)
+from isoprompt.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def _lead_and_follow(flights, leader_fn, follower_fn):
+    """Run a leader and a follower on the same key; return both outcomes."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def leader():
+        started.set()
+        release.wait(5)
+        return leader_fn()
+
+    def follower():
+        return follower_fn()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        lead = executor.submit(flights.do, "key", leader)
+        started.wait(5)
+        follow = executor.submit(flights.do, "key", follower, 5)
+        while flights.coalesced == 0:
+            time.sleep(0.001)  # Wait until the follower joins the leader's call.
+        release.set()
+        return lead, follow
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        OptimizationCancelledError("Optimization cancelled."),
+        OptimizationTimeoutError("Optimization deadline exceeded."),
+    ],
+)
+def test_follower_retries_when_leader_is_cancelled_or_times_out(error):
+    flights = SingleFlight()
+    follower_calls = []
+
+    def fail():
+        raise error
+
+    def succeed():
+        follower_calls.append(1)
+        return "result"
+
+    lead, follow = _lead_and_follow(flights, fail, succeed)
+
+    with pytest.raises(type(error)):
+        lead.result()
+    assert follow.result() == "result"
+    assert follower_calls == [1]
+    assert flights.stats() == {"leaders": 2, "coalesced": 0, "in_flight": 0}
+
+
+def test_follower_shares_upstream_errors():
+    flights = SingleFlight()
+
+    def fail():
+        raise UpstreamError("Service unavailable", status_code=503)
+
+    def never():
+        raise AssertionError("The follower should share the leader's call.")
+
+    lead, follow = _lead_and_follow(flights, fail, never)
+
+    with pytest.raises(UpstreamError):
+        lead.result()
+    with pytest.raises(UpstreamError):
+        follow.result()
+    assert flights.stats() == {"leaders": 1, "coalesced": 1, "in_flight": 0}
+
+
+def test_follower_shares_the_result():
+    flights = SingleFlight()
+
+    lead, follow = _lead_and_follow(flights, lambda: "shared", lambda: "own")
+
+    assert lead.result() == "shared"
+    assert follow.result() == "shared"
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        OptimizationCancelledError("Optimization cancelled."),
+        OptimizationTimeoutError("Optimization deadline exceeded."),
+    ],
+)
+def test_async_follower_retries_when_leader_is_cancelled_or_times_out(error):
+    flights = AsyncSingleFlight()
+    follower_calls = []
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise error
+
+    async def succeed():
+        follower_calls.append(1)
+        return "result"
+
+    async def run():
+        lead = asyncio.ensure_future(flights.do("key", fail, 1))
+        await asyncio.sleep(0)
+        follow = asyncio.ensure_future(flights.do("key", succeed, 5))
+        return await asyncio.gather(lead, follow, return_exceptions=True)
+
+    lead, follow = asyncio.run(run())
+
+    assert isinstance(lead, type(error))
+    assert follow == "result"
+    assert follower_calls == [1]
+    assert flights.stats() == {"leaders": 2, "coalesced": 0, "in_flight": 0}
+
+
+def test_async_follower_outlives_a_leader_with_a_short_timeout():
+    flights = AsyncSingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "result"
+
+    async def run():
+        lead = asyncio.ensure_future(flights.do("key", slow, 0.05))
+        await asyncio.sleep(0)
+        follow = asyncio.ensure_future(flights.do("key", slow, 5))
+        return await asyncio.gather(lead, follow, return_exceptions=True)
+
+    lead, follow = asyncio.run(run())
+
+    assert isinstance(lead, OptimizationTimeoutError)
+    assert follow == "result"
+
+
+def test_async_follower_shares_upstream_errors():
+    flights = AsyncSingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise UpstreamError("Service unavailable", status_code=503)
+
+    async def run():
+        lead = asyncio.ensure_future(flights.do("key", fail))
+        await asyncio.sleep(0)
+        follow = asyncio.ensure_future(flights.do("key", fail))
+        return await asyncio.gather(lead, follow, return_exceptions=True)
+
+    lead, follow = asyncio.run(run())
+
+    assert isinstance(lead, UpstreamError)
+    assert isinstance(follow, UpstreamError)
+    assert flights.stats()["leaders"] == 1
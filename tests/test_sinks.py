@@ -0,0 +1,37 @@
+"""Tests for the result sinks of batch outputs."""
+
+import sqlite3
+
+import pytest
+
+from isoprompt.models import BatchItemResult, BatchRecord
+from isoprompt.sinks import ResultSink, SqliteResultSink
+
+
+def test_result_sink_is_abstract():
+    with pytest.raises(TypeError):
+        ResultSink()
+
+
+def test_sqlite_sink_writes_rows_with_their_records(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    records = [BatchRecord(id=str(i), prompt=f"Prompt {i}") for i in range(5)]
+
+    with SqliteResultSink(path, batch_size=2, records=records) as sink:
+        for i in range(5):
+            sink.write(BatchItemResult(id=str(i), optimized_prompt=f"Optimized {i}"))
+
+    connection = sqlite3.connect(path)
+    rows = connection.execute(
+        "SELECT id, prompt, optimized_prompt FROM results ORDER BY id"
+    ).fetchall()
+    connection.close()
+    assert rows == [(str(i), f"Prompt {i}", f"Optimized {i}") for i in range(5)]
+
+
+def test_closed_sink_rejects_writes(tmp_path):
+    sink = SqliteResultSink(str(tmp_path / "results.sqlite"))
+    sink.close()
+
+    with pytest.raises(ValueError):
+        sink.write(BatchItemResult(id="1", optimized_prompt="Optimized"))
@@ -0,0 +1,52 @@
+"""Tests for the fan-out optimization of variants."""
+
+import asyncio
+
+import isoprompt.variants as variants
+from isoprompt.constants import HEURISTIC_BACKEND
+from isoprompt.variants import optimize_variants, optimize_variants_async
+
+PROMPT = "Explain how TCP handshakes work"
+
+
+def test_offline_variants_need_no_api_key():
+    result = optimize_variants(
+        PROMPT, ["simple", "analytical"], backend=HEURISTIC_BACKEND
+    )
+
+    assert [v.mode for v in result.variants] == ["simple", "analytical"]
+    assert all(v.error is None for v in result.variants)
+    assert all(v.optimized_prompt for v in result.variants)
+
+
+def test_offline_async_variants_need_no_api_key():
+    result = asyncio.run(
+        optimize_variants_async(
+            PROMPT, ["simple"], ["software"], backend=HEURISTIC_BACKEND
+        )
+    )
+
+    assert len(result.variants) == 1
+    assert result.variants[0].error is None
+    assert result.variants[0].domain == "software"
+
+
+def test_variants_without_backend_fail_without_api_key():
+    result = optimize_variants(PROMPT, ["simple"])
+
+    assert result.variants[0].optimized_prompt is None
+    assert result.variants[0].error
+
+
+def test_variants_forward_ensemble_size(monkeypatch):
+    sizes = []
+
+    def fake_optimize_prompt(**kwargs):
+        sizes.append(kwargs["ensemble_size"])
+        return "optimized"
+
+    monkeypatch.setattr(variants, "optimize_prompt", fake_optimize_prompt)
+    result = optimize_variants(PROMPT, ["simple", "analytical"], ensemble_size=4)
+
+    assert sizes == [4, 4]
+    assert all(v.optimized_prompt == "optimized" for v in result.variants)